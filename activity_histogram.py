@@ -0,0 +1,148 @@
+"""
+Activity histogram
+Per-day commit counts of the configured author on the checked-out branch, from
+one streamed `git log --format=%at` pass. The counts are cached in the git
+directory together with the HEAD they describe: when HEAD has moved forward
+only the new commits are read (`git log <cached>..HEAD`), so refreshing costs
+time in proportion to new commits rather than to the whole history. A branch
+that was reset or rewritten is counted again from scratch.
+"""
+
+import os
+import json
+import time
+import subprocess
+from collections import Counter
+
+from commit_plan import fill_deficit
+
+CACHE_FILE = 'automation-histogram.json'
+CACHE_VERSION = 1
+READ_SIZE = 1 << 20
+
+
+def wall_day(timestamp, offsets):
+    """Local wall-clock day number of a Unix timestamp (to_wall_seconds() // 86400).
+
+    UTC offsets are looked up once per hour of time and kept in `offsets`, so
+    a long history does not pay for a time zone conversion per commit.
+    """
+    hour = timestamp // 3600
+    offset = offsets.get(hour)
+    if offset is None:
+        offset = offsets[hour] = time.localtime(timestamp).tm_gmtoff
+    return (timestamp + offset) // 86400
+
+
+class ActivityHistogram:
+    """Commits per local day for one author, cached against HEAD.
+
+    `counts()` returns {day number: commits}; `mode` then says whether the
+    cache was used as is ('cached'), extended ('incremental') or rebuilt
+    ('full'), and `read` how many commits git streamed for it. Without an
+    author (no user.email) every commit is counted. A read-only histogram
+    never writes its cache.
+    """
+
+    def __init__(self, git, author=None, read_only=False):
+        self.git = git
+        self.author = author if author is not None else self._configured_author()
+        self.read_only = read_only
+        self.path = os.path.join(git.git_dir(), CACHE_FILE)
+        self.mode = None
+        self.read = 0
+
+    def _configured_author(self):
+        ident = self.git.identity('AUTHOR')
+        if not ident or '<' not in ident:
+            return ''
+        return ident[ident.rfind('<') + 1:-1]
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('version') != CACHE_VERSION or cached.get('author') != self.author:
+            return None
+        return cached
+
+    def _save(self, head, counts):
+        if self.read_only:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'version': CACHE_VERSION, 'author': self.author, 'head': head,
+                           'days': {str(day): count for day, count in counts.items()}}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # the cache is only an optimisation
+
+    def _stream(self, revisions, counts):
+        """Add the author's commits in `revisions` to counts, one streamed git log"""
+        args = ['git', 'log', '--format=%at']
+        if self.author:
+            # Fixed-string match on the bracketed address, as git prints it in the ident
+            args += ['--fixed-strings', f"--author=<{self.author}>"]
+        self.git.metrics.count('subprocesses')
+        process = subprocess.Popen(args + revisions + ['--'], cwd=self.git.repo_path,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        offsets = {}
+        carry = b''
+        try:
+            for chunk in iter(lambda: process.stdout.read(READ_SIZE), b''):
+                lines = (carry + chunk).split(b'\n')
+                carry = lines.pop()
+                for line in lines:
+                    counts[wall_day(int(line), offsets)] += 1
+                self.read += len(lines)
+            if carry.strip():
+                counts[wall_day(int(carry), offsets)] += 1
+                self.read += 1
+        finally:
+            process.stdout.close()
+            process.wait()
+        return process.returncode == 0
+
+    def counts(self):
+        """{day number: commits} on HEAD's history, refreshed from the cache where possible"""
+        self.read = 0
+        head = self.git.resolve('HEAD^{commit}')
+        if head is None:
+            self.mode = 'full'
+            return {}
+        cached = self._load()
+        with self.git.metrics.timer('activity_histogram'):
+            if cached and cached['head'] == head:
+                self.mode = 'cached'
+                return {int(day): count for day, count in cached['days'].items()}
+            counts = Counter()
+            if cached and self.git.run(['merge-base', '--is-ancestor', cached['head'], head],
+                                       quiet=True)[0]:
+                self.mode = 'incremental'
+                counts.update({int(day): count for day, count in cached['days'].items()})
+                complete = self._stream([head, f"^{cached['head']}"], counts)
+            else:
+                self.mode = 'full'
+                complete = self._stream([head], counts)
+        self.git.metrics.count('commits_counted', self.read)
+        if complete:
+            self._save(head, counts)
+        return dict(counts)
+
+    def describe(self):
+        """One line on how the last counts() was obtained"""
+        who = self.author or 'every author'
+        if self.mode == 'cached':
+            return f"Existing activity of {who}: from the cache"
+        if self.mode == 'incremental':
+            return f"Existing activity of {who}: cache updated with {self.read} new commits"
+        return f"Existing activity of {who}: counted {self.read} commits"
+
+
+def deficit_plan(git, plan, read_only=False):
+    """(plan trimmed to what each day is missing, histogram) for the repository `git` runs in"""
+    histogram = ActivityHistogram(git, read_only=read_only)
+    return fill_deficit(plan, histogram.counts()), histogram
@@ -0,0 +1,358 @@
+"""
+GitHub Commit Async Runner
+Runs generation and removal jobs for many repositories from a single process,
+overlapping git and disk waits with asyncio subprocesses instead of a process pool.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime
+from functools import partial
+
+from activity_histogram import deficit_plan
+from batch_runner import load_jobs, group_by_repository, summarize, batch_metrics
+from commit_plan import build_plan
+from content_generator import load_pack
+from create_commits import GitCommitCreator
+from fast_import import commit_record
+from git_plumbing import format_raw_date, repository_at
+from instrumentation import add_instrumentation_args, export_metrics
+from job_queue import DEFAULT_WAIT, JobQueue, job_label
+from maintenance import RepositoryMaintenance
+from remove_commits import GitCommitRemover
+from repo_lock import POLL_INTERVAL, RepositoryLock
+
+
+def default_concurrency():
+    """Repositories in flight at once; git waits dominate, so go past the core count"""
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+class AsyncGit:
+    """asyncio counterpart of GitExecutor.run for one repository"""
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+
+    async def run(self, args):
+        """Run `git <args>`; returns (success, output)"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'git', *args, cwd=self.repo_path, stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except OSError as e:
+            return False, str(e)
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            return False, stderr.decode(errors='replace')
+        return True, stdout.decode(errors='replace')
+
+    async def resolve(self, rev):
+        """Resolve a revision to an object name, or None"""
+        success, output = await self.run(['rev-parse', '-q', '--verify', rev])
+        return output.strip() if success else None
+
+    async def identity(self, kind):
+        """Return the 'Name <email>' part of git's configured ident"""
+        success, output = await self.run(['var', f'GIT_{kind}_IDENT'])
+        if not success:
+            return None
+        ident = output.strip()
+        return ident[:ident.rfind('>') + 1]
+
+
+async def generate(repo_path, job):
+    """Stream one job's plan into git fast-import; returns the automation log"""
+    # Calls into the synchronous creator run git through subprocess.run, so
+    # they go to the executor to keep the other repositories moving
+    loop = asyncio.get_running_loop()
+    pack = load_pack(job['template_pack']) if job.get('template_pack') else None
+    creator = await loop.run_in_executor(None, partial(
+        GitCommitCreator, repo_path, job['target_file'], backend='fast-import',
+        content_strategy=job['content_strategy'], template_pack=pack))
+    start_date = datetime.strptime(job['start_date'], '%Y-%m-%d')
+    end_date = datetime.strptime(job['end_date'], '%Y-%m-%d')
+    plan = build_plan(start_date, end_date, seed=job.get('seed'),
+                      message_count=len(creator.commit_messages),
+                      template_count=len(creator.generator.templates))
+    if job['planner'] == 'deficit':
+        plan, _ = await loop.run_in_executor(None, deficit_plan, creator.git, plan)
+    creator.generator.seed = plan.seed
+    git = AsyncGit(repo_path)
+    strategy = creator.strategy
+
+    (has_branch, ref), author, committer, parent = await asyncio.gather(
+        git.run(['symbolic-ref', '-q', 'HEAD']), git.identity('AUTHOR'),
+        git.identity('COMMITTER'), git.resolve('HEAD^{commit}'))
+    if not has_branch:
+        raise RuntimeError("needs a checked-out branch (detached HEAD)")
+    if not author or not committer:
+        raise RuntimeError("git user.name/user.email are not configured")
+    branch_ref = ref.strip()
+
+    file_modes = {}
+    if parent:
+        success, output = await git.run(['ls-tree', parent, '--'] + strategy.paths())
+        for entry in output.splitlines() if success else []:
+            meta, path = entry.split('\t', 1)
+            file_modes[path] = meta.split()[0]
+    await loop.run_in_executor(None, strategy.load, creator.git.read_base_file)
+
+    streaming = time.perf_counter()
+    with tempfile.TemporaryFile() as stderr:
+        creator.metrics.count('subprocesses')
+        process = await asyncio.create_subprocess_exec(
+            'git', 'fast-import', '--quiet', '--date-format=raw', '--done',
+            cwd=repo_path, stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL, stderr=stderr)
+        written = 0
+        try:
+            for position, batch_date, rows in plan.batches():
+                date_str = batch_date.strftime('%Y-%m-%d')
+                lines, messages = creator.generator.batch(rows, date_str, position)
+                for (commit_time, _, _, _), line, message in zip(rows, lines, messages):
+                    path, content = strategy.apply(line)
+                    written += 1
+                    process.stdin.write(commit_record(
+                        branch_ref, written, author, committer, format_raw_date(commit_time),
+                        message, path, file_modes.get(path, '100644'), content,
+                        parent if written == 1 else None))
+                # Let fast-import catch up and give the other repositories a turn
+                await process.stdin.drain()
+                await asyncio.sleep(0)
+            process.stdin.write(b"done\n")
+            await process.stdin.drain()
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except BaseException:
+            # --done means a stream without "done" never moves the branch
+            process.kill()
+            await process.wait()
+            raise
+        if await process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError("git fast-import failed: " +
+                               stderr.read().decode(errors='replace').strip())
+    creator.metrics.add_time('fast_import_stream', time.perf_counter() - streaming)
+    creator.metrics.count('commits_attempted', written)
+    creator.metrics.count('commits_succeeded', written)
+
+    if written and await loop.run_in_executor(None, creator.git.has_worktree):
+        # Same as GitExecutor.sync_checkout, with the index refresh awaited
+        for path, content in strategy.contents.items():
+            file_path = os.path.join(repo_path, path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.write(content)
+        await git.run(['reset', '-q', '--'] + sorted(strategy.contents))
+
+    end_commit = await git.resolve('HEAD^{commit}')
+    await loop.run_in_executor(None, creator.save_automation_log, parent, end_commit, written,
+                               f"{job['start_date']} to {job['end_date']}")
+    if job['maintenance'] != 'never':
+        maintenance = RepositoryMaintenance(creator.git, job['maintenance'])
+        await loop.run_in_executor(None, maintenance.finalize, written)
+    with open(creator.commit_log_file, 'r') as f:
+        return json.load(f), creator.metrics.summary()
+
+
+async def remove(repo_path, job):
+    """Reset a repository to its logged start commit; returns the number of commits removed"""
+    loop = asyncio.get_running_loop()
+    remover = await loop.run_in_executor(None, GitCommitRemover, repo_path)
+    remover.maintenance = job['maintenance']
+    if not os.path.exists(remover.commit_log_file):
+        raise RuntimeError("no automation log to remove")
+    with open(remover.commit_log_file, 'r') as f:
+        log_data = json.load(f)
+    start_commit = log_data.get('start_commit')
+    git = AsyncGit(repo_path)
+    if job['mode'] == 'surgical':
+        success, before = await git.run(['rev-list', '--count', 'HEAD'])
+        # One fast-export | fast-import pipeline; run it off the event loop
+        if not await loop.run_in_executor(None, remover.remove_automation_commits_surgical,
+                                          log_data):
+            raise RuntimeError("surgical rewrite failed")
+        success, after = await git.run(['rev-list', '--count', 'HEAD'])
+        await loop.run_in_executor(None, remover.remove_automation_log)
+        await loop.run_in_executor(None, remover.maintain_after_removal, False)
+        return int(before) - int(after)
+    if not start_commit:
+        raise RuntimeError("no start commit found in log data")
+    if await git.resolve(f"{start_commit}^{{commit}}") is None:
+        raise RuntimeError(f"commit not found in this repository: {start_commit}")
+
+    success, output = await git.run(['rev-list', '--count', f"{start_commit}..HEAD"])
+    removed = int(output.strip()) if success else 0
+    hard = job['mode'] == 'hard'
+    worktree = await loop.run_in_executor(None, remover.git.has_worktree)
+    if removed:
+        if worktree:
+            success, output = await git.run(['reset', '--hard' if hard else '--soft', start_commit])
+        else:
+            # No checkout to reset: only the branch moves
+            has_branch, ref = await git.run(['symbolic-ref', '-q', 'HEAD'])
+            success, output = await git.run(['update-ref', '-m', f"reset: moving to {start_commit}",
+                                             ref.strip() if has_branch else 'HEAD', start_commit])
+        if not success:
+            raise RuntimeError(f"reset failed: {output.strip()}")
+    if not hard and worktree:
+        # File cleanup is local disk work plus at most one git call
+        await loop.run_in_executor(None, remover.clean_target_file, log_data)
+    await loop.run_in_executor(None, remover.remove_automation_log)
+    remover.metrics.count('commits_removed', removed)
+    await loop.run_in_executor(None, remover.maintain_after_removal, False)
+    return removed
+
+
+async def run_job(repo_path, job):
+    """Run one job; returns a result dict shaped like batch_runner's"""
+    result = {
+        'repo': repo_path,
+        'target_file': job['target_file'],
+        'date_range': job_label(job),
+        'action': job['action'],
+        'success': False,
+    }
+    started = time.monotonic()
+    try:
+        if job['action'] == 'remove':
+            result['removed_commits'] = await remove(repo_path, job)
+        else:
+            result['automation_log'], result['metrics'] = await generate(repo_path, job)
+            result['total_commits'] = result['automation_log']['total_commits']
+        result['success'] = True
+    except (RuntimeError, OSError, ValueError) as e:
+        result['error'] = str(e)
+    result['elapsed'] = round(time.monotonic() - started, 3)
+    return result
+
+
+async def run_serialised(repo_path, jobs, wait=DEFAULT_WAIT):
+    """job_queue.run_serialised for the event loop; returns the jobs' results in order.
+
+    Waiting for a repository another runner has locked sleeps on the loop, so
+    the other repositories keep going.
+    """
+    success, output = await AsyncGit(repo_path).run(['rev-parse', '--absolute-git-dir'])
+    git_dir = output.strip() if success else os.path.join(repo_path, '.git')
+    queue = JobQueue(git_dir)
+    lock = RepositoryLock(git_dir, 'async_runner')
+    ids = queue.submit(jobs)
+    results = queue.results
+    deadline = time.monotonic() + wait
+    while True:
+        results.update(queue.collect([job_id for job_id in ids if job_id not in results]))
+        if len(results) == len(ids):
+            break
+        if lock.acquire():
+            try:
+                queue.recover()
+                entry = queue.next_job()
+                while entry is not None:
+                    queue.finish(*entry, await run_job(repo_path, entry[1]))
+                    entry = queue.next_job()
+            finally:
+                lock.release()
+            continue
+        if time.monotonic() >= deadline:
+            remaining = [job_id for job_id in ids if job_id not in results]
+            results.update(queue.give_up(remaining, lock.busy_message()))
+            break
+        await asyncio.sleep(POLL_INTERVAL)
+    return [results[job_id] for job_id in ids]
+
+
+async def run_repository(repo_path, jobs, semaphore, lock_wait=DEFAULT_WAIT):
+    """Run all jobs for one repository in order, through its job queue, while holding a
+    semaphore slot"""
+    async with semaphore:
+        found = await asyncio.get_running_loop().run_in_executor(None, repository_at, repo_path)
+        if found is None:
+            results = [{'repo': repo_path, 'success': False, 'error': 'not a git repository',
+                        'date_range': job_label(job)} for job in jobs]
+        else:
+            results = await run_serialised(repo_path, jobs, lock_wait)
+    for result in results:
+        status = "✓" if result['success'] else "✗"
+        if 'coalesced_into' in result:
+            detail = f"merged into {result['coalesced_into']}"
+        elif 'note' in result:
+            detail = result['note']
+        elif result.get('action') == 'remove':
+            detail = f"{result.get('removed_commits', 0)} commits removed"
+        else:
+            detail = f"{result.get('total_commits', 0)} commits"
+        print(f"  {status} {result['repo']} ({result['date_range']}): "
+              f"{result.get('error', detail)}")
+    return results
+
+
+async def run_async(jobs, concurrency=None, lock_wait=DEFAULT_WAIT):
+    """Run every job with at most `concurrency` repositories in flight"""
+    concurrency = max(1, concurrency or default_concurrency())
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.monotonic()
+    groups = group_by_repository(jobs)
+    repo_results = await asyncio.gather(*(run_repository(repo, repo_jobs, semaphore, lock_wait)
+                                          for repo, repo_jobs in groups.items()))
+    results = [result for group in repo_results for result in group]
+    summary = summarize(jobs, results, time.monotonic() - started)
+    summary['concurrency'] = concurrency
+    return summary
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(
+        description="Generate or remove commits for many repositories from one process.",
+        epilog='Jobs use the batch_runner.py format; add "action": "remove" (with '
+               '"mode": "soft", "hard" or "surgical") to undo a repository\'s last run.')
+    parser.add_argument('job_file', help="JSON list or JSON-lines file of jobs")
+    parser.add_argument('-c', '--concurrency', type=int, default=None,
+                        help=f"repositories in flight (default: {default_concurrency()})")
+    parser.add_argument('--summary', metavar='PATH', help="write the JSON summary to PATH")
+    parser.add_argument('--lock-wait', type=float, default=DEFAULT_WAIT, metavar='SECONDS',
+                        help="how long to wait for a repository another run has locked "
+                             f"(default: {DEFAULT_WAIT:g})")
+    add_instrumentation_args(parser, profile=False)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("🚀 GitHub Commit Async Runner")
+    print("=" * 50)
+
+    try:
+        jobs = load_jobs(args.job_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read job file: {e}")
+        return 1
+
+    print(f"📋 {len(jobs)} jobs across {len(group_by_repository(jobs))} repositories")
+    summary = asyncio.run(run_async(jobs, args.concurrency, args.lock_wait))
+
+    print(f"\n📊 Summary:")
+    print(f"Jobs succeeded: {summary['succeeded']}/{summary['jobs']}")
+    print(f"Total commits created: {summary['total_commits']}")
+    print(f"Throughput: {summary['commits_per_second']} commits/sec "
+          f"with {summary['concurrency']} repositories in flight")
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"📝 Batch summary saved to: {args.summary}")
+    export_metrics(batch_metrics(summary), args, {'script': 'async_runner'})
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Automation API
+Configuration and result types for driving both scripts as a library.
+`create_commits.create(config)` and `remove_commits.remove(config)` take one of
+the configs below and return a result; nothing is printed or asked unless the
+caller passes a progress callback or a confirm callback, so a long-lived worker
+can run any number of jobs without a subprocess per repository.
+"""
+
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+REMOVAL_MODES = ('soft', 'hard', 'surgical', 'clean')
+
+# Confirmations the terminal asks for by typing a word rather than y/N
+TYPED_CONFIRMATIONS = {'hard_reset': 'DELETE', 'force_push': 'FORCE PUSH'}
+
+
+@dataclass
+class CreateConfig:
+    """One generation run; the fields mirror create_commits.py's options.
+
+    Without a `plan`, one is built from the dates and `seed`. With `resume`,
+    the interrupted run in the repository's journal is continued and its own
+    target file, backend, content strategy and template pack are used.
+    With `incremental`, only the days after the last logged run up to
+    `end_date` (default today) are planned, with that run's target file,
+    backend, content strategy and template pack (or `template_pack` when
+    given); once the log reaches that day the call returns at once without
+    touching git. `planner` applies to the new days as usual.
+    planner='deficit' only adds what each day of the plan is missing next to
+    the configured author's existing commits.
+    push_mode='pipelined' pushes every month of the schedule (or every
+    `push_chunk` commits) in the background as the run goes. The run holds
+    the repository lock; `lock_wait` is how long to wait if another run has it.
+    """
+    repo_path: str
+    target_file: str = None
+    start_date: datetime = None
+    end_date: datetime = None
+    backend: str = 'worktree'
+    content_strategy: str = 'append'
+    shards: int = 8
+    ring_slots: int = 64
+    template_pack: str = None
+    seed: int = None
+    plan: object = None
+    planner: str = 'random'
+    resume: bool = False
+    incremental: bool = False
+    push: bool = False
+    push_mode: str = 'end'
+    push_chunk: object = 'month'
+    maintenance: str = 'auto'
+    large_repo: str = 'auto'
+    tune_repo: bool = False
+    lock_wait: float = 0
+
+
+@dataclass
+class CreateResult:
+    success: bool
+    repo_path: str
+    start_commit: str = None
+    end_commit: str = None
+    commits: int = 0
+    days: int = 0
+    run_id: int = None
+    pushed: bool = False
+    error: str = None
+    seconds: float = 0.0
+    automation_log: dict = None
+    metrics: dict = field(default_factory=dict)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class RemoveConfig:
+    """One removal; `mode` is 'soft', 'hard', 'surgical' or 'clean' (target file only).
+
+    `run_id` removes back to the start of that ledger run instead of the
+    latest one. `scan` first rebuilds runs from the branch history into the
+    ledger. `push` force-pushes the result. `lock_wait` is how long to wait
+    for the repository lock if another run holds it.
+    """
+    repo_path: str
+    mode: str = 'soft'
+    run_id: int = None
+    scan: bool = False
+    maintenance: str = 'auto'
+    expire_reflog: bool = False
+    push: bool = False
+    lock_wait: float = 0
+
+
+@dataclass
+class RemoveResult:
+    success: bool
+    repo_path: str
+    mode: str
+    run_id: int = None
+    old_head: str = None
+    new_head: str = None
+    removed: int = 0
+    replayed: int = 0
+    marker_lines_removed: int = 0
+    pushed: bool = False
+    error: str = None
+    seconds: float = 0.0
+    metrics: dict = field(default_factory=dict)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class Progress:
+    """One progress event: 'message', 'error', 'commit' or 'day', with its details in `data`"""
+    event: str
+    message: str = None
+    data: dict = field(default_factory=dict)
+
+
+def progress_reporter(callback):
+    """Adapt a callback taking Progress objects to the engines' report(event, message, **data)"""
+    if callback is None:
+        return lambda event, message=None, **data: None
+
+    def report(event, message=None, **data):
+        callback(Progress(event, message, data))
+    return report
+
+
+class ProgressReporting:
+    """report/say/fail for the engines: events go to `self.progress`, or are printed without one"""
+
+    progress = None
+    error = None
+
+    def report(self, event, message=None, **data):
+        if self.progress is not None:
+            self.progress(event, message, **data)
+        elif message is not None:
+            print(message)
+
+    def say(self, message):
+        self.report('message', message)
+
+    def fail(self, message):
+        """Report an error and keep it for the result; returns False"""
+        self.error = message
+        self.report('error', message)
+        return False
+
+
+def print_progress(progress):
+    """The scripts' own progress callback: print each event's message"""
+    if progress.message is not None:
+        print(progress.message)
+
+
+def terminal_confirm(key, prompt):
+    """The scripts' own confirm callback: ask on the terminal"""
+    answer = input(prompt)
+    if key in TYPED_CONFIRMATIONS:
+        return answer == TYPED_CONFIRMATIONS[key]
+    return answer.strip().lower() == 'y'
@@ -0,0 +1,307 @@
+"""
+Automation ledger
+Append-only record of every generation run and the commits it created, kept in
+the git directory, with an on-disk hash index for "is this commit automated?"
+lookups and per-run time spans to prune date range queries.
+"""
+
+import os
+import json
+import mmap
+import struct
+from datetime import datetime
+
+LEDGER_FILE = 'automation-ledger.jsonl'
+INDEX_FILE = 'automation-ledger.idx'
+INDEX_MAGIC = b'GGLIDX1\n'
+
+# Header: magic, slot count, entries, ledger size the index was built from
+INDEX_HEADER = struct.Struct('<8sQQQ')
+# Slot: binary commit name, run id, commit timestamp; an all-zero name is empty
+INDEX_SLOT = struct.Struct('<20sIq')
+MIN_SLOTS = 1024
+COMMITS_PER_RECORD = 1000
+
+
+class AutomationLedger:
+    """Runs and their commits as JSON lines, plus an open-addressing hash index.
+
+    `run` records hold what the automation log holds plus a run id and the
+    earliest and latest commit timestamps; `commits` records list [sha, timestamp]
+    pairs in commit order; `removed` records retire runs until `compact()`
+    drops them from the file.
+    """
+
+    def __init__(self, git_dir):
+        self.path = os.path.join(git_dir, LEDGER_FILE)
+        self.index_path = os.path.join(git_dir, INDEX_FILE)
+
+    def _records(self, kinds):
+        """Yield parsed records of the given types, skipping the rest unparsed.
+
+        A line that does not parse (torn by an interrupted write, then followed by
+        later appends) is skipped rather than ending the read.
+        """
+        if not os.path.exists(self.path):
+            return
+        prefixes = tuple(f'{{"type": "{kind}"'.encode() for kind in kinds)
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.startswith(prefixes):
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def runs(self, include_removed=False):
+        """All recorded runs in order, oldest first"""
+        runs = {}
+        removed = set()
+        for record in self._records(('run', 'removed')):
+            if record['type'] == 'run':
+                runs[record['run_id']] = record
+            else:
+                removed.add(record['run_id'])
+        return [dict(run, removed=run_id in removed) for run_id, run in sorted(runs.items())
+                if include_removed or run_id not in removed]
+
+    def latest_run(self):
+        """The most recent run that has not been removed, or None"""
+        runs = self.runs()
+        return runs[-1] if runs else None
+
+    def run_commits(self, run_id):
+        """[sha, timestamp] pairs of one run, in commit order"""
+        commits = []
+        for record in self._records(('commits',)):
+            if record['run_id'] == run_id:
+                commits.extend(record['commits'])
+        return commits
+
+    def _end_torn_line(self):
+        """Terminate a final line left without its newline, so appends start on a line of their own"""
+        if not self._ledger_size():
+            return
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def _append(self, records):
+        self._end_torn_line()
+        with open(self.path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def next_run_id(self):
+        previous = self.runs(include_removed=True)
+        return previous[-1]['run_id'] + 1 if previous else 1
+
+    def add_run(self, log_data, commits, run_id=None):
+        """Record a run and its [sha, timestamp] commits; returns the new run id.
+
+        `commits` may also be an iterator, such as a scanned run's: its records
+        are then written as they come, ahead of the run record, so the run is
+        never held in memory, and the index is left for the next lookup to rebuild.
+        Callers adding many runs pass consecutive `run_id`s from next_run_id().
+        """
+        if run_id is None:
+            run_id = self.next_run_id()
+        record = {'type': 'run', 'run_id': run_id}
+        record.update(log_data)
+        if not isinstance(commits, list):
+            first = last = None
+            self._end_torn_line()
+            with open(self.path, 'a') as f:
+                chunk = []
+                for commit in commits:
+                    chunk.append(commit)
+                    first = commit[1] if first is None else min(first, commit[1])
+                    last = commit[1] if last is None else max(last, commit[1])
+                    if len(chunk) == COMMITS_PER_RECORD:
+                        f.write(json.dumps({'type': 'commits', 'run_id': run_id,
+                                            'commits': chunk}) + '\n')
+                        chunk = []
+                if chunk:
+                    f.write(json.dumps({'type': 'commits', 'run_id': run_id,
+                                        'commits': chunk}) + '\n')
+                record.update(first_timestamp=first, last_timestamp=last)
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            return run_id
+        timestamps = [timestamp for sha, timestamp in commits]
+        record['first_timestamp'] = min(timestamps) if timestamps else None
+        record['last_timestamp'] = max(timestamps) if timestamps else None
+        records = [record]
+        for i in range(0, len(commits), COMMITS_PER_RECORD):
+            records.append({'type': 'commits', 'run_id': run_id,
+                            'commits': commits[i:i + COMMITS_PER_RECORD]})
+        self._end_torn_line()
+        previous_size = self._ledger_size()
+        self._append(records)
+        self._index_add(run_id, commits, previous_size)
+        return run_id
+
+    def mark_removed(self, run_ids):
+        """Retire runs; their commits stop matching lookups"""
+        if not run_ids:
+            return
+        self._append([{'type': 'removed', 'run_id': run_id,
+                       'removed_at': datetime.now().isoformat()} for run_id in run_ids])
+        self.rebuild_index()
+
+    def compact(self):
+        """Rewrite the ledger without removed runs and rebuild the index"""
+        if not os.path.exists(self.path):
+            return
+        removed = {run['run_id'] for run in self.runs(include_removed=True) if run['removed']}
+        if not removed:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(self.path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for line in src:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # drop torn lines
+                if record.get('run_id') not in removed:
+                    dst.write(line)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+        self.rebuild_index()
+
+    # Hash index ---------------------------------------------------------
+
+    def _ledger_size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _slot_of(self, sha, slots):
+        return int.from_bytes(sha[:8], 'big') & (slots - 1)
+
+    def _write_index(self, entries, count):
+        """Write `count` (sha, run_id, timestamp) entries into a file-backed table"""
+        slots = MIN_SLOTS
+        while slots < count * 2:
+            slots *= 2
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w+b') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, slots, count, self._ledger_size()))
+            f.truncate(INDEX_HEADER.size + INDEX_SLOT.size * slots)
+            # The table is filled through a mapping of the file, not built in memory
+            with mmap.mmap(f.fileno(), 0) as table:
+                for sha, run_id, timestamp in entries:
+                    slot = self._slot_of(sha, slots)
+                    while True:
+                        offset = INDEX_HEADER.size + slot * INDEX_SLOT.size
+                        if table[offset:offset + 20] == bytes(20):
+                            break
+                        slot = (slot + 1) & (slots - 1)
+                    INDEX_SLOT.pack_into(table, offset, sha, run_id, timestamp)
+                table.flush()
+        os.replace(tmp_path, self.index_path)
+
+    def rebuild_index(self):
+        """Build the index from the ledger's active runs, streaming the ledger twice"""
+        active = {run['run_id'] for run in self.runs()}
+        count = sum(len(record['commits']) for record in self._records(('commits',))
+                    if record['run_id'] in active)
+        entries = ((bytes.fromhex(sha), record['run_id'], timestamp)
+                   for record in self._records(('commits',)) if record['run_id'] in active
+                   for sha, timestamp in record['commits'])
+        self._write_index(entries, count)
+
+    def _read_header(self, f):
+        header = f.read(INDEX_HEADER.size)
+        if len(header) != INDEX_HEADER.size:
+            return None
+        magic, slots, count, ledger_size = INDEX_HEADER.unpack(header)
+        if magic != INDEX_MAGIC or ledger_size != self._ledger_size():
+            return None
+        return slots, count
+
+    def _index_add(self, run_id, commits, previous_size):
+        """Insert new commits in place, or rebuild if the index is stale or too full"""
+        header = None
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                header = f.read(INDEX_HEADER.size)
+        if not header or len(header) != INDEX_HEADER.size:
+            self.rebuild_index()
+            return
+        magic, slots, count, ledger_size = INDEX_HEADER.unpack(header)
+        if (magic != INDEX_MAGIC or ledger_size != previous_size or
+                (count + len(commits)) * 2 > slots):
+            self.rebuild_index()
+            return
+        with open(self.index_path, 'r+b') as f:
+            for sha_hex, timestamp in commits:
+                sha = bytes.fromhex(sha_hex)
+                slot = self._slot_of(sha, slots)
+                while True:
+                    f.seek(INDEX_HEADER.size + slot * INDEX_SLOT.size)
+                    existing = f.read(20)
+                    if existing == bytes(20) or existing == sha:
+                        break
+                    slot = (slot + 1) & (slots - 1)
+                if existing != sha:
+                    count += 1
+                f.seek(INDEX_HEADER.size + slot * INDEX_SLOT.size)
+                f.write(INDEX_SLOT.pack(sha, run_id, timestamp))
+            f.seek(0)
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, slots, count, self._ledger_size()))
+
+    def _index_current(self):
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, 'rb') as f:
+            return self._read_header(f) is not None
+
+    def lookup_many(self, shas):
+        """Map each automated commit name in `shas` to (run_id, timestamp)"""
+        if not os.path.exists(self.path):
+            return {}
+        if not self._index_current():
+            self.rebuild_index()
+        found = {}
+        with open(self.index_path, 'rb') as f:
+            slots, count = self._read_header(f)
+            for sha_hex in shas:
+                sha = bytes.fromhex(sha_hex)
+                slot = self._slot_of(sha, slots)
+                while True:
+                    f.seek(INDEX_HEADER.size + slot * INDEX_SLOT.size)
+                    name, run_id, timestamp = INDEX_SLOT.unpack(f.read(INDEX_SLOT.size))
+                    if name == sha:
+                        found[sha_hex] = (run_id, timestamp)
+                        break
+                    if name == bytes(20):
+                        break
+                    slot = (slot + 1) & (slots - 1)
+        return found
+
+    def lookup(self, sha):
+        """(run_id, timestamp) if the commit was created by automation, else None"""
+        return self.lookup_many([sha]).get(sha)
+
+    def is_automated(self, sha):
+        return self.lookup(sha) is not None
+
+    def commits_between(self, start, end):
+        """[sha, timestamp, run_id] for active runs' commits dated within [start, end]"""
+        low = int(start.timestamp())
+        high = int(end.timestamp())
+        selected = {run['run_id'] for run in self.runs()
+                    if run['first_timestamp'] is not None and
+                    run['first_timestamp'] <= high and run['last_timestamp'] >= low}
+        commits = []
+        for record in self._records(('commits',)):
+            if record['run_id'] in selected:
+                commits.extend([sha, timestamp, record['run_id']]
+                               for sha, timestamp in record['commits']
+                               if low <= timestamp <= high)
+        commits.sort(key=lambda commit: commit[1])
+        return commits
@@ -0,0 +1,337 @@
+"""
+GitHub Commit Batch Runner
+Runs commit generation for many repositories from a job file, fanning the
+repositories out over a process pool.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import zlib
+import argparse
+import contextlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from create_commits import BACKENDS, create
+from commit_plan import PLANNERS, build_plan
+from activity_histogram import deficit_plan
+from remove_commits import remove
+from automation_api import CreateConfig, RemoveConfig, print_progress
+from content_strategy import STRATEGIES
+from instrumentation import Metrics, add_instrumentation_args, export_metrics
+from maintenance import POLICIES
+from large_repo import MODES as LARGE_REPO_MODES
+from push_pipeline import PUSH_MODES
+from git_plumbing import GitExecutor, repository_at
+from job_queue import DEFAULT_WAIT, coalesce, job_label, run_serialised
+from content_generator import ContentGenerator, load_pack
+from estimator import Calibration, estimate, format_bytes, format_seconds
+
+DEFAULT_TARGET_FILE = "automation_target.txt"
+ACTIONS = ('create', 'remove')
+REMOVE_MODES = ('soft', 'hard', 'surgical')
+
+
+def load_jobs(job_file):
+    """Read jobs from a JSON list or a JSON-lines file.
+    
+    Relative repository paths are resolved against the job file's directory.
+    """
+    with open(job_file, 'r') as f:
+        text = f.read().strip()
+    if text.startswith('['):
+        jobs = json.loads(text)
+    else:
+        jobs = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for number, job in enumerate(jobs, 1):
+        job.setdefault('action', 'create')
+        if job['action'] not in ACTIONS:
+            raise ValueError(f"Job {number} has unknown action '{job['action']}'")
+        required = ('repo', 'start_date', 'end_date') if job['action'] == 'create' else ('repo',)
+        for key in required:
+            if key not in job:
+                raise ValueError(f"Job {number} is missing '{key}'")
+        job['repo'] = os.path.join(os.path.dirname(os.path.abspath(job_file)),
+                                   os.path.expanduser(job['repo']))
+        if job.get('template_pack'):
+            job['template_pack'] = os.path.join(os.path.dirname(os.path.abspath(job_file)),
+                                                os.path.expanduser(job['template_pack']))
+        job.setdefault('target_file', DEFAULT_TARGET_FILE)
+        job.setdefault('backend', 'fast-import')
+        job.setdefault('content_strategy', 'append')
+        job.setdefault('mode', 'soft')
+        job.setdefault('maintenance', 'auto')
+        job.setdefault('large_repo', 'auto')
+        job.setdefault('push_mode', 'end')
+        job.setdefault('push_chunk', 'month')
+        job.setdefault('planner', 'random')
+        if job['planner'] not in PLANNERS:
+            raise ValueError(f"Job {number} has unknown planner '{job['planner']}'")
+        if job['push_mode'] not in PUSH_MODES:
+            raise ValueError(f"Job {number} has unknown push mode '{job['push_mode']}'")
+        if job['push_chunk'] != 'month' and not (isinstance(job['push_chunk'], int) and
+                                                 job['push_chunk'] > 0):
+            raise ValueError(f"Job {number} has invalid push_chunk '{job['push_chunk']}'")
+        if job['large_repo'] not in LARGE_REPO_MODES:
+            raise ValueError(f"Job {number} has unknown large-repo mode '{job['large_repo']}'")
+        if job['maintenance'] not in POLICIES:
+            raise ValueError(f"Job {number} has unknown maintenance policy '{job['maintenance']}'")
+        if job['mode'] not in REMOVE_MODES:
+            raise ValueError(f"Job {number} has unknown removal mode '{job['mode']}'")
+        if job['backend'] not in BACKENDS:
+            raise ValueError(f"Job {number} has unknown backend '{job['backend']}'")
+        if job['content_strategy'] not in STRATEGIES:
+            raise ValueError(f"Job {number} has unknown content strategy "
+                             f"'{job['content_strategy']}'")
+    return jobs
+
+
+def group_by_repository(jobs):
+    """Group jobs per repository so no two workers ever share a repo"""
+    groups = {}
+    for job in jobs:
+        repo = os.path.realpath(job['repo'])
+        groups.setdefault(repo, []).append(job)
+    return groups
+
+
+def run_job(repo_path, job):
+    """Run one job through the library API; returns a result dict"""
+    result = {
+        'repo': repo_path,
+        'target_file': job['target_file'],
+        'date_range': job_label(job),
+        'backend': job['backend'],
+        'success': False,
+    }
+    started = time.monotonic()
+    if job['action'] == 'remove':
+        outcome = remove(RemoveConfig(repo_path, job['mode'], maintenance=job['maintenance']),
+                         progress=print_progress)
+        result.update(success=outcome.success, removed_commits=outcome.removed,
+                      metrics=outcome.metrics)
+    else:
+        try:
+            start_date = datetime.strptime(job['start_date'], '%Y-%m-%d')
+            end_date = datetime.strptime(job['end_date'], '%Y-%m-%d')
+        except ValueError as e:
+            result['error'] = str(e)
+            return result
+        outcome = create(CreateConfig(repo_path, job['target_file'], start_date, end_date,
+                                      backend=job['backend'],
+                                      content_strategy=job['content_strategy'],
+                                      template_pack=job.get('template_pack'),
+                                      seed=job.get('seed'), planner=job['planner'],
+                                      push=job.get('push', False),
+                                      push_mode=job['push_mode'], push_chunk=job['push_chunk'],
+                                      maintenance=job['maintenance'],
+                                      large_repo=job['large_repo']),
+                         progress=print_progress)
+        result.update(success=outcome.success, metrics=outcome.metrics)
+        if outcome.success and outcome.automation_log:
+            result['automation_log'] = outcome.automation_log
+            result['total_commits'] = outcome.commits
+    if outcome.error:
+        result['error'] = outcome.error
+    result['elapsed'] = round(time.monotonic() - started, 3)
+    return result
+
+
+def run_repository(repo_path, jobs, log_dir=None, lock_wait=DEFAULT_WAIT):
+    """Worker entry point: run all jobs for one repository in order, through its job queue"""
+    output = io.StringIO()
+    results = []
+    with contextlib.redirect_stdout(output):
+        if repository_at(repo_path) is None:
+            print(f"❌ Not a git repository: {repo_path}")
+            results = [{'repo': repo_path, 'success': False, 'error': 'not a git repository',
+                        'date_range': job_label(job)}
+                       for job in jobs]
+        else:
+            results = run_serialised(GitExecutor(repo_path).git_dir(), jobs,
+                                     lambda job: run_job(repo_path, job), wait=lock_wait)
+
+    if log_dir:
+        name = os.path.basename(repo_path.rstrip(os.sep)) or 'repo'
+        log_path = os.path.join(log_dir, f"{name}-{zlib.crc32(repo_path.encode()):08x}.log")
+        with open(log_path, 'w') as f:
+            f.write(output.getvalue())
+        for result in results:
+            result['log_file'] = log_path
+    return results
+
+
+def run_batch(jobs, workers=None, log_dir=None, lock_wait=DEFAULT_WAIT):
+    """Run jobs across a process pool and return the aggregated summary"""
+    groups = group_by_repository(jobs)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(groups)))
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    started = time.monotonic()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_repository, repo, repo_jobs, log_dir, lock_wait): repo
+                   for repo, repo_jobs in groups.items()}
+        for future in as_completed(futures):
+            repo = futures[future]
+            try:
+                repo_results = future.result()
+            except Exception as e:
+                repo_results = [{'repo': repo, 'success': False, 'error': str(e)}]
+            for result in repo_results:
+                status = "✓" if result['success'] else "✗"
+                if 'coalesced_into' in result:
+                    detail = f"merged into {result['coalesced_into']}"
+                elif 'note' in result:
+                    detail = result['note']
+                elif 'removed_commits' in result:
+                    detail = f"{result['removed_commits']} commits removed"
+                else:
+                    detail = f"{result.get('total_commits', 0)} commits"
+                print(f"  {status} {result['repo']} ({result.get('date_range', '')}): "
+                      f"{result.get('error', detail)}")
+            results.extend(repo_results)
+
+    summary = summarize(jobs, results, time.monotonic() - started)
+    summary['workers'] = workers
+    return summary
+
+
+def summarize(jobs, results, elapsed):
+    """Aggregate per-job results into the batch summary"""
+    total_commits = sum(r.get('total_commits', 0) for r in results)
+    return {
+        'created_at': datetime.now().isoformat(),
+        'repositories': len(group_by_repository(jobs)),
+        'jobs': len(jobs),
+        'succeeded': sum(1 for r in results if r['success']),
+        'failed': sum(1 for r in results if not r['success']),
+        'total_commits': total_commits,
+        'elapsed': round(elapsed, 3),
+        'commits_per_second': round(total_commits / elapsed, 1) if elapsed > 0 else 0,
+        'results': sorted(results, key=lambda r: (r['repo'], r.get('date_range', ''))),
+    }
+
+
+def batch_metrics(summary):
+    """Every job's metrics merged, plus job counters, for the whole batch"""
+    metrics = Metrics(started=time.monotonic() - summary['elapsed'])
+    for result in summary['results']:
+        metrics.merge(result.get('metrics', {}))
+    metrics.count('jobs_succeeded', summary['succeeded'])
+    metrics.count('jobs_failed', summary['failed'])
+    return metrics
+
+
+def estimate_jobs(jobs, calibration):
+    """Size the create runs the job queue would make, without touching the repositories.
+
+    Returns (estimates, totals); overlapping jobs are estimated merged, as they would run.
+    """
+    estimates = []
+    totals = {'commits': 0.0, 'seconds': 0.0, 'git_growth_bytes': 0}
+    for repo, repo_jobs in group_by_repository(jobs).items():
+        for members, job in coalesce(list(enumerate(repo_jobs))):
+            if job['action'] != 'create':
+                continue
+            start_date = datetime.strptime(job['start_date'], '%Y-%m-%d')
+            end_date = datetime.strptime(job['end_date'], '%Y-%m-%d')
+            pack = load_pack(job['template_pack']) if job.get('template_pack') else None
+            plan = None
+            if job.get('seed') is not None:
+                generator = ContentGenerator(job['target_file'], pack)
+                plan = build_plan(start_date, end_date, seed=job['seed'],
+                                  message_count=len(generator.messages),
+                                  template_count=len(generator.templates))
+                if job['planner'] == 'deficit':
+                    plan, _ = deficit_plan(GitExecutor(repo), plan, read_only=True)
+            result = estimate(repo, job['target_file'], start_date, end_date,
+                              backend=job['backend'], content_strategy=job['content_strategy'],
+                              pack=pack, plan=plan, calibration=calibration)
+            result.update(repo=repo, date_range=job_label(job), jobs=len(members))
+            estimates.append(result)
+            totals['commits'] += result.get('planned', result['commits']['mean'])
+            totals['seconds'] += result['seconds']['expected']
+            totals['git_growth_bytes'] += result['git_growth_bytes']['expected']
+    return estimates, totals
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(
+        description="Generate commits for many repositories from a job file.",
+        epilog='Each job: {"repo": PATH, "target_file": FILE, "start_date": "YYYY-MM-DD", '
+               '"end_date": "YYYY-MM-DD", "seed": N, "backend": NAME}')
+    parser.add_argument('job_file', help="JSON list or JSON-lines file of jobs")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--summary', metavar='PATH', help="write the JSON summary to PATH")
+    parser.add_argument('--log-dir', metavar='DIR', help="keep each repository's output in DIR")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="estimate each job's commits, wall time and .git growth "
+                             "without running anything")
+    parser.add_argument('--lock-wait', type=float, default=DEFAULT_WAIT, metavar='SECONDS',
+                        help="how long to wait for a repository another run has locked "
+                             f"(default: {DEFAULT_WAIT:g})")
+    add_instrumentation_args(parser, profile=False)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("🚀 GitHub Commit Batch Runner")
+    print("=" * 50)
+
+    try:
+        jobs = load_jobs(args.job_file)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read job file: {e}")
+        return 1
+
+    print(f"📋 {len(jobs)} jobs across {len(group_by_repository(jobs))} repositories")
+    if args.dry_run:
+        try:
+            estimates, totals = estimate_jobs(jobs, Calibration())
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not estimate jobs: {e}")
+            return 1
+        for result in estimates:
+            merged = f", {result['jobs']} jobs merged" if result['jobs'] > 1 else ""
+            print(f"  {result['repo']} ({result['date_range']}{merged}): "
+                  f"~{result.get('planned', result['commits']['mean']):.0f} commits, "
+                  f"~{format_seconds(result['seconds']['expected'])}, "
+                  f"~{format_bytes(result['git_growth_bytes']['expected'])}")
+        print(f"\n🔎 Dry run total: ~{totals['commits']:.0f} commits, "
+              f"~{format_seconds(totals['seconds'])} of generation (before spreading over "
+              f"workers), ~{format_bytes(totals['git_growth_bytes'])} of .git growth")
+        if args.summary:
+            with open(args.summary, 'w') as f:
+                json.dump({'estimates': estimates, 'totals': totals}, f, indent=2)
+            print(f"📝 Estimates saved to: {args.summary}")
+        return 0
+    summary = run_batch(jobs, workers=args.workers, log_dir=args.log_dir,
+                        lock_wait=args.lock_wait)
+
+    print(f"\n📊 Summary:")
+    print(f"Jobs succeeded: {summary['succeeded']}/{summary['jobs']}")
+    print(f"Total commits created: {summary['total_commits']}")
+    print(f"Throughput: {summary['commits_per_second']} commits/sec "
+          f"with {summary['workers']} workers")
+
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"📝 Batch summary saved to: {args.summary}")
+    export_metrics(batch_metrics(summary), args, {'script': 'batch_runner'})
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+"""
+GitHub Commit Benchmark
+Measures creation and removal throughput on throwaway local repositories, with
+fixed seeds and a local bare repository standing in for the remote, and writes
+machine-readable results that can be compared across versions.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import statistics
+from datetime import datetime, timedelta
+
+from commit_plan import build_plan
+from content_generator import ContentGenerator
+from create_commits import GitCommitCreator
+from remove_commits import GitCommitRemover
+from markers import TEMPLATES, template_values
+from maintenance import RepositoryMaintenance
+from push_pipeline import PUSH_MODES
+
+SCHEMA_VERSION = 1
+START_DATE = datetime(2020, 1, 1)
+TARGET_FILE = 'bench_target.py'
+REPO_FILES = {'small': 10, 'large': 100000}
+
+SUITES = {
+    'quick': {'repos': ('small',), 'days': (30,), 'date_commits': 10, 'clean_mib': 16,
+              'backends': ('worktree', 'fast-import', 'plumbing', 'pack')},
+    'full': {'repos': ('small', 'large'), 'days': (30, 365, 3650), 'date_commits': 50,
+             'clean_mib': 256, 'backends': ('worktree', 'fast-import', 'plumbing', 'pack')},
+}
+# The worktree backend pauses between commits, so long ranges would take hours
+WORKTREE_MAX_DAYS = 31
+
+
+def git(args, cwd, stdin=None):
+    """Run git quietly for fixture setup; raises on failure"""
+    subprocess.run(['git'] + args, cwd=cwd, input=stdin, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def build_template(path, files, seed):
+    """A repository with `files` tracked files plus the target file, in one fast-import"""
+    os.makedirs(path)
+    git(['init', '-q', '-b', 'main'], path)
+    rng = random.Random(seed)
+    stream = io.BytesIO()
+    stream.write(b'commit refs/heads/main\ncommitter Bench <bench@example.com> 1577836800 +0000\n'
+                 b'data 15\nInitial commit\n')
+    entries = [(TARGET_FILE, b'def main():\n    pass\n')]
+    entries += [(f"src/{i % 100:02d}/module_{i}.py", f"VALUE = {rng.randint(0, 1 << 30)}\n".encode())
+                for i in range(files)]
+    for name, content in entries:
+        stream.write(b'M 100644 inline ' + name.encode() + b'\ndata %d\n' % len(content) + content)
+    stream.write(b'\ndone\n')
+    git(['fast-import', '--quiet', '--done'], path, stdin=stream.getvalue())
+
+
+class Fixture:
+    """Fresh working repositories cloned from per-size templates.
+
+    Each checkout gets its own bare remote, so pushes never see another run's commits.
+    """
+
+    def __init__(self, root, seed):
+        self.root = root
+        self.seed = seed
+        self.templates = {}
+        self.count = 0
+
+    def checkout(self, size):
+        if size not in self.templates:
+            template = os.path.join(self.root, f"template-{size}")
+            build_template(template, REPO_FILES[size], self.seed)
+            self.templates[size] = template
+        self.count += 1
+        remote = os.path.join(self.root, f"remote-{self.count}.git")
+        work = os.path.join(self.root, f"work-{self.count}")
+        git(['clone', '-q', '--bare', self.templates[size], remote], self.root)
+        git(['clone', '-q', remote, work], self.root)
+        git(['config', 'user.name', 'Bench'], work)
+        git(['config', 'user.email', 'bench@example.com'], work)
+        return work
+
+    def discard(self, work):
+        shutil.rmtree(work, ignore_errors=True)
+        shutil.rmtree(work.replace('work-', 'remote-') + '.git', ignore_errors=True)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Keep the scripts' progress output out of the benchmark output"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def timed(fn, *args, **kwargs):
+    """Return (seconds, result) for one call"""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def generate(work, backend, days, seed):
+    """Run one seeded generation; returns (seconds, commits)"""
+    random.seed(seed)
+    creator = GitCommitCreator(work, TARGET_FILE, backend=backend)
+    end_date = START_DATE + timedelta(days=days - 1)
+    plan = build_plan(START_DATE, end_date, seed=seed, engine='python',
+                      message_count=len(creator.commit_messages))
+    with quiet():
+        seconds, success = timed(creator.generate_commits_for_period, START_DATE, end_date,
+                                 plan=plan, push=False, maintenance='never')
+    if not success:
+        raise RuntimeError(f"generation failed ({backend}, {days} days)")
+    return seconds, creator.total_commits
+
+
+# Benchmarks: each yields (params, sample) for one fresh repository
+
+def bench_create_commits_for_date(fixture, config, seed):
+    for size in config['repos']:
+        for large_repo in ('off', 'on'):
+            work = fixture.checkout(size)
+            random.seed(seed)
+            creator = GitCommitCreator(work, TARGET_FILE, large_repo=large_repo)
+            with quiet():
+                seconds, commits = timed(creator.create_commits_for_date, START_DATE,
+                                         config['date_commits'])
+            fixture.discard(work)
+            yield {'repo': size, 'large_repo': large_repo}, {'seconds': seconds, 'commits': commits}
+
+
+def bench_generate_commits_for_period(fixture, config, seed):
+    for size in config['repos']:
+        for backend in config['backends']:
+            for days in config['days']:
+                if backend == 'worktree' and days > WORKTREE_MAX_DAYS:
+                    continue
+                work = fixture.checkout(size)
+                seconds, commits = generate(work, backend, days, seed)
+                fixture.discard(work)
+                yield ({'repo': size, 'backend': backend, 'days': days},
+                       {'seconds': seconds, 'commits': commits})
+
+
+def bench_push(fixture, config, seed):
+    for size in config['repos']:
+        days = max(config['days'])
+        work = fixture.checkout(size)
+        commits = generate(work, 'fast-import', days, seed)[1]
+        seconds, (success, output) = timed(GitCommitCreator(work, TARGET_FILE).run_git_command,
+                                           ['push', '-q', 'origin', 'main'])
+        fixture.discard(work)
+        if not success:
+            raise RuntimeError(f"push to the local remote failed: {output}")
+        yield {'repo': size, 'days': days}, {'seconds': seconds, 'commits': commits}
+
+
+def bench_generate_and_push(fixture, config, seed):
+    """Generation plus push to the local remote: pushed at the end, or in chunks while generating"""
+    for size in config['repos']:
+        days = max(config['days'])
+        for push_mode in PUSH_MODES:
+            work = fixture.checkout(size)
+            random.seed(seed)
+            creator = GitCommitCreator(work, TARGET_FILE, backend='fast-import')
+            end_date = START_DATE + timedelta(days=days - 1)
+            plan = build_plan(START_DATE, end_date, seed=seed, engine='python',
+                              message_count=len(creator.commit_messages))
+            with quiet():
+                seconds, success = timed(creator.generate_commits_for_period, START_DATE, end_date,
+                                         plan=plan, push=True, maintenance='never',
+                                         push_mode=push_mode)
+            fixture.discard(work)
+            if not success or not creator.pushed:
+                raise RuntimeError(f"generation with {push_mode} push failed")
+            yield ({'repo': size, 'days': days, 'push_mode': push_mode},
+                   {'seconds': seconds, 'commits': creator.total_commits})
+
+
+def bench_generate_content(fixture, config, seed):
+    days = max(config['days'])
+    plan = build_plan(START_DATE, START_DATE + timedelta(days=days - 1), seed=seed,
+                      engine='python')
+    generator = ContentGenerator(TARGET_FILE, seed=seed)
+    started = time.perf_counter()
+    for position, batch_date, rows in plan.batches():
+        generator.batch(rows, batch_date.strftime('%Y-%m-%d'), position)
+    yield {'days': days}, {'seconds': time.perf_counter() - started, 'lines': len(plan)}
+
+
+def write_marked_file(path, mib, seed):
+    """About `mib` MiB of code with an automation line after every few lines"""
+    rng = random.Random(seed)
+    markers = 0
+    with open(path, 'w') as f:
+        while f.tell() < mib << 20:
+            for _ in range(rng.randint(1, 8)):
+                f.write(f"value_{rng.randint(0, 99999)} = compute({rng.random():.6f})\n")
+            values = template_values(rng.randint(1, 50), '2020-01-01', '#', rng)
+            f.write("\n" + rng.choice(TEMPLATES).format(**values) + "\n")
+            markers += 1
+    return markers
+
+
+def bench_clean_target_file(fixture, config, seed):
+    work = fixture.checkout('small')
+    markers = write_marked_file(os.path.join(work, TARGET_FILE), config['clean_mib'], seed)
+    size = os.path.getsize(os.path.join(work, TARGET_FILE))
+    remover = GitCommitRemover(work)
+    with quiet():
+        seconds, success = timed(remover.clean_target_file, {'target_file': TARGET_FILE})
+    fixture.discard(work)
+    if not success:
+        raise RuntimeError("clean_target_file failed")
+    yield {'mib': config['clean_mib']}, {'seconds': seconds, 'bytes': size, 'markers': markers}
+
+
+def bench_removal(fixture, config, seed):
+    days = max(config['days'])
+    for size in config['repos']:
+        for mode in ('soft', 'hard', 'surgical'):
+            work = fixture.checkout(size)
+            commits = generate(work, 'fast-import', days, seed)[1]
+            remover = GitCommitRemover(work)
+            with quiet():
+                log_data = remover.load_automation_log()
+                if mode == 'soft':
+                    seconds, success = timed(remover.remove_automation_commits_safe, log_data)
+                elif mode == 'hard':
+                    seconds, success = timed(remover.reset_to_commit, log_data['start_commit'],
+                                             hard_reset=True)
+                else:
+                    seconds, success = timed(remover.remove_automation_commits_surgical, log_data)
+            fixture.discard(work)
+            if not success:
+                raise RuntimeError(f"{mode} removal failed")
+            yield ({'repo': size, 'mode': mode, 'days': days},
+                   {'seconds': seconds, 'commits': commits})
+
+
+def bench_maintenance(fixture, config, seed):
+    days = max(config['days'])
+    for size in config['repos']:
+        work = fixture.checkout(size)
+        # The plumbing backend leaves every object loose, like the worktree backend
+        commits = generate(work, 'plumbing', days, seed)[1]
+        git = GitCommitCreator(work, TARGET_FILE).git
+        with quiet():
+            seconds, report = timed(RepositoryMaintenance(git, 'always').finalize, commits)
+        fixture.discard(work)
+        yield ({'repo': size, 'days': days},
+               {'seconds': seconds, 'commits': commits,
+                'loose_objects': report['before'].get('count', 0)})
+
+
+BENCHMARKS = {
+    'create_commits_for_date': bench_create_commits_for_date,
+    'generate_commits_for_period': bench_generate_commits_for_period,
+    'push': bench_push,
+    'generate_and_push': bench_generate_and_push,
+    'generate_content': bench_generate_content,
+    'clean_target_file': bench_clean_target_file,
+    'removal': bench_removal,
+    'maintenance': bench_maintenance,
+}
+
+
+def result_key(result):
+    return result['name'] + json.dumps(result['params'], sort_keys=True)
+
+
+def summarize_samples(name, params, samples):
+    """One result record from the repeated samples of a benchmark case"""
+    seconds = [sample['seconds'] for sample in samples]
+    result = {'name': name, 'params': params, 'seconds': round(statistics.median(seconds), 6),
+              'min_seconds': round(min(seconds), 6), 'samples': [round(s, 6) for s in seconds]}
+    first = samples[0]
+    if 'commits' in first:
+        result['commits'] = first['commits']
+        result['commits_per_second'] = round(first['commits'] / result['seconds'], 1) if result['seconds'] else None
+    if 'bytes' in first:
+        result['bytes'] = first['bytes']
+        result['markers'] = first['markers']
+        result['mib_per_second'] = round(first['bytes'] / (1 << 20) / result['seconds'], 1)
+    return result
+
+
+def environment():
+    """What the numbers depend on besides the code"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    revision = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=here,
+                              capture_output=True, text=True).stdout.strip()
+    git_version = subprocess.run(['git', '--version'], capture_output=True,
+                                 text=True).stdout.strip()
+    return {
+        'revision': revision or None,
+        'git': git_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'created_at': datetime.now().isoformat(),
+    }
+
+
+def run_benchmarks(suite='quick', seed=42, repeat=1, only=None, workdir=None):
+    """Run a suite and return the results document"""
+    config = SUITES[suite]
+    root = tempfile.mkdtemp(prefix='commit-bench-', dir=workdir)
+    results = []
+    try:
+        fixture = Fixture(root, seed)
+        for name, bench in BENCHMARKS.items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            print(f"⏱  {name}")
+            cases = {}
+            for _ in range(repeat):
+                for params, sample in bench(fixture, config, seed):
+                    cases.setdefault(json.dumps(params, sort_keys=True), (params, []))[1].append(sample)
+            for params, samples in cases.values():
+                result = summarize_samples(name, params, samples)
+                results.append(result)
+                rate = (f", {result['commits_per_second']} commits/sec"
+                        if result.get('commits_per_second') else
+                        f", {result['mib_per_second']} MiB/sec" if 'mib_per_second' in result else "")
+                print(f"  {json.dumps(params, sort_keys=True)}: {result['seconds']:.3f}s{rate}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {'schema': SCHEMA_VERSION, 'suite': suite, 'seed': seed, 'repeat': repeat,
+            'environment': environment(), 'results': results}
+
+
+def compare(baseline, current, threshold):
+    """Print time ratios against a baseline; returns the regressed result keys"""
+    previous = {result_key(result): result for result in baseline['results']}
+    regressions = []
+    print(f"\n📈 Compared with {baseline['environment'].get('revision') or 'baseline'}:")
+    for result in current['results']:
+        before = previous.get(result_key(result))
+        if not before or not before['seconds']:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        flag = "⚠️ " if ratio > threshold else "  "
+        print(f"{flag}{result['name']} {json.dumps(result['params'], sort_keys=True)}: "
+              f"{before['seconds']:.3f}s → {result['seconds']:.3f}s ({ratio:.2f}x)")
+        if ratio > threshold:
+            regressions.append(result_key(result))
+    return regressions
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(
+        description="Benchmark commit creation and removal on throwaway local repositories.")
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick',
+                        help="quick: small repo, 30 days; full: adds a 100k-file repo and "
+                             "365/3650-day ranges (default: quick)")
+    parser.add_argument('--seed', type=int, default=42, help="seed for plans and file contents")
+    parser.add_argument('--repeat', type=int, default=1, help="samples per case (median is reported)")
+    parser.add_argument('--only', action='append', metavar='NAME',
+                        help=f"run benchmarks whose name contains NAME ({', '.join(BENCHMARKS)})")
+    parser.add_argument('-o', '--output', default='benchmark-results.json',
+                        help="where to write the JSON results (default: benchmark-results.json)")
+    parser.add_argument('--compare', metavar='PATH', help="baseline results to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="slowdown ratio that counts as a regression (default: 1.25)")
+    parser.add_argument('--workdir', help="directory for the throwaway repositories")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("🏁 GitHub Commit Benchmark")
+    print("=" * 50)
+    print(f"Suite: {args.suite}, seed {args.seed}, {args.repeat} sample(s) per case")
+
+    document = run_benchmarks(args.suite, args.seed, max(1, args.repeat), args.only, args.workdir)
+    with open(args.output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\n📝 Results saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, document, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} case(s) slower than {args.threshold}x the baseline")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Commit plan
+Precomputes the whole commit schedule for a date range as compact columns, so
+scheduling is separate from git I/O and plans can be saved, reviewed and reused.
+"""
+
+import json
+import random
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional; the array fallback produces the same shape
+    numpy = None
+
+EPOCH = datetime(1970, 1, 1)
+PLAN_MAGIC = b'GGPLAN1\n'
+
+# Schedule parameters, mirroring the original per-day dice rolls
+ACTIVE_DAY_CHANCE = 0.65
+WEEKDAY_COMMITS = (1, 8)
+WEEKEND_COMMITS = (1, 4)
+BUSY_DAY_CHANCE = 0.05
+BUSY_DAY_EXTRA = (5, 12)
+FIRST_SECOND = 9 * 3600  # 09:00:00
+LAST_SECOND = 24 * 3600 - 1  # 23:59:59
+
+# 'deficit' only plans what each day is missing next to the author's existing commits
+PLANNERS = ('random', 'deficit')
+
+MESSAGE_COUNT = 20
+TEMPLATE_COUNT = 7
+
+COLUMNS = (
+    ('timestamps', 'q'),
+    ('commit_numbers', 'H'),
+    ('message_indices', 'B'),
+    ('template_indices', 'B'),
+)
+
+
+def to_wall_seconds(moment):
+    """Naive local datetime -> wall-clock seconds (timezone independent)"""
+    delta = moment - EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+def from_wall_seconds(seconds):
+    """Wall-clock seconds -> naive local datetime"""
+    return EPOCH + timedelta(seconds=int(seconds))
+
+
+class CommitPlan:
+    """A commit schedule stored as parallel typed arrays.
+
+    `timestamps` are local wall-clock seconds since 1970-01-01, so a plan means
+    the same calendar times on any machine. `commit_numbers` restart at 1 for
+    each batch of a day; a second batch on the same day is a busy-day burst.
+    """
+
+    def __init__(self, start_date, end_date, seed=None, engine='python', columns=None,
+                 message_count=MESSAGE_COUNT, template_count=TEMPLATE_COUNT):
+        self.start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.end_date = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.seed = seed
+        self.engine = engine
+        self.message_count = message_count
+        self.template_count = template_count
+        columns = columns or {}
+        for name, typecode in COLUMNS:
+            setattr(self, name, columns.get(name, array(typecode)))
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def rows(self, start=0):
+        """Yield (commit_time, commit_num, message_index, template_index) from a position"""
+        for i in range(start, len(self)):
+            yield (from_wall_seconds(self.timestamps[i]), self.commit_numbers[i],
+                   self.message_indices[i], self.template_indices[i])
+
+    def batches(self, start=0):
+        """Yield (position, date, rows) groups of commits that share a day and batch"""
+        position = start
+        batch = []
+        batch_start = start
+        for row in self.rows(start):
+            if batch and (row[1] == 1 or row[0].date() != batch[-1][0].date()):
+                yield batch_start, batch[0][0].replace(hour=0, minute=0, second=0), batch
+                batch_start = position
+                batch = []
+            batch.append(row)
+            position += 1
+        if batch:
+            yield batch_start, batch[0][0].replace(hour=0, minute=0, second=0), batch
+
+    def active_days(self):
+        """Number of distinct days with at least one planned commit"""
+        days = set(ts // 86400 for ts in self.timestamps)
+        return len(days)
+
+    def header(self):
+        """Metadata stored in front of the columns"""
+        return {
+            'start_date': self.start_date.strftime('%Y-%m-%d'),
+            'end_date': self.end_date.strftime('%Y-%m-%d'),
+            'seed': self.seed,
+            'engine': self.engine,
+            'commits': len(self),
+            'message_count': self.message_count,
+            'template_count': self.template_count,
+        }
+
+    def save(self, path):
+        """Write the plan as a JSON header line followed by little-endian columns"""
+        with open(path, 'wb') as f:
+            f.write(PLAN_MAGIC)
+            f.write(json.dumps(self.header(), sort_keys=True).encode() + b'\n')
+            for name, _ in COLUMNS:
+                column = getattr(self, name)
+                if sys.byteorder != 'little':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Read a plan written by save()"""
+        with open(path, 'rb') as f:
+            if f.read(len(PLAN_MAGIC)) != PLAN_MAGIC:
+                raise ValueError(f"{path} is not a commit plan file")
+            header = json.loads(f.readline().decode())
+            columns = {}
+            for name, typecode in COLUMNS:
+                column = array(typecode)
+                column.fromfile(f, header['commits'])
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                columns[name] = column
+        return cls(datetime.strptime(header['start_date'], '%Y-%m-%d'),
+                   datetime.strptime(header['end_date'], '%Y-%m-%d'),
+                   seed=header['seed'], engine=header['engine'], columns=columns,
+                   message_count=header['message_count'],
+                   template_count=header['template_count'])
+
+    def dump_text(self, stream):
+        """Write one tab-separated line per commit, for review and diffing"""
+        for commit_time, commit_num, message_index, template_index in self.rows():
+            stream.write(f"{commit_time.strftime('%Y-%m-%d %H:%M:%S')}\t{commit_num}\t"
+                         f"{message_index}\t{template_index}\n")
+
+
+def fill_deficit(plan, existing):
+    """A copy of `plan` that only adds what each day is missing.
+
+    The plan's own count for a day is its target; `existing` maps wall-clock
+    day numbers (to_wall_seconds() // 86400) to commits already on that day.
+    Each day keeps its first `target - existing` planned commits, or none.
+    """
+    target = {}
+    for timestamp in plan.timestamps:
+        day = timestamp // 86400
+        target[day] = target.get(day, 0) + 1
+    missing = {day: count - existing.get(day, 0) for day, count in target.items()}
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    for i, timestamp in enumerate(plan.timestamps):
+        day = timestamp // 86400
+        if missing[day] <= 0:
+            continue
+        missing[day] -= 1
+        for name, _ in COLUMNS:
+            columns[name].append(getattr(plan, name)[i])
+    return CommitPlan(plan.start_date, plan.end_date, seed=plan.seed, engine=plan.engine,
+                      columns=columns, message_count=plan.message_count,
+                      template_count=plan.template_count)
+
+
+def _build_numpy(plan, days, seed):
+    rng = numpy.random.default_rng(seed)
+    first_day = to_wall_seconds(plan.start_date) // 86400
+    day_numbers = numpy.arange(first_day, first_day + days, dtype=numpy.int64)
+    weekend = ((day_numbers + 3) % 7) >= 5  # 1970-01-01 was a Thursday
+
+    active = rng.random(days) < ACTIVE_DAY_CHANCE
+    weekday_counts = rng.integers(WEEKDAY_COMMITS[0], WEEKDAY_COMMITS[1] + 1, days)
+    weekend_counts = rng.integers(WEEKEND_COMMITS[0], WEEKEND_COMMITS[1] + 1, days)
+    base = numpy.where(active, numpy.where(weekend, weekend_counts, weekday_counts), 0)
+    busy = active & (rng.random(days) < BUSY_DAY_CHANCE)
+    extra = numpy.where(busy, rng.integers(BUSY_DAY_EXTRA[0], BUSY_DAY_EXTRA[1] + 1, days), 0)
+
+    per_day = base + extra
+    total = int(per_day.sum())
+    day_index = numpy.repeat(numpy.arange(days), per_day)
+    day_start = numpy.cumsum(per_day) - per_day
+    position = numpy.arange(total) - day_start[day_index]
+    base_rows = base[day_index]
+    commit_numbers = numpy.where(position < base_rows, position + 1, position - base_rows + 1)
+
+    seconds = rng.integers(FIRST_SECOND, LAST_SECOND + 1, total)
+    timestamps = day_numbers[day_index] * 86400 + seconds
+    messages = rng.integers(0, plan.message_count, total)
+    templates = rng.integers(0, plan.template_count, total)
+
+    plan.timestamps = array('q', timestamps.tolist())
+    plan.commit_numbers = array('H', commit_numbers.astype(numpy.uint16).tolist())
+    plan.message_indices = array('B', messages.astype(numpy.uint8).tolist())
+    plan.template_indices = array('B', templates.astype(numpy.uint8).tolist())
+
+
+def _build_python(plan, days, seed):
+    rng = random.Random(seed)
+    first_day = to_wall_seconds(plan.start_date) // 86400
+    timestamps = plan.timestamps
+    commit_numbers = plan.commit_numbers
+    messages = plan.message_indices
+    templates = plan.template_indices
+    for day in range(first_day, first_day + days):
+        if rng.random() >= ACTIVE_DAY_CHANCE:
+            continue
+        weekend = (day + 3) % 7 >= 5
+        low, high = WEEKEND_COMMITS if weekend else WEEKDAY_COMMITS
+        batches = [rng.randint(low, high)]
+        if rng.random() < BUSY_DAY_CHANCE:
+            batches.append(rng.randint(*BUSY_DAY_EXTRA))
+        midnight = day * 86400
+        for count in batches:
+            timestamps.extend(midnight + rng.randint(FIRST_SECOND, LAST_SECOND)
+                              for _ in range(count))
+            commit_numbers.extend(range(1, count + 1))
+            messages.extend(rng.randrange(plan.message_count) for _ in range(count))
+            templates.extend(rng.randrange(plan.template_count) for _ in range(count))
+
+
+def build_plan(start_date, end_date, seed=None, engine=None,
+               message_count=MESSAGE_COUNT, template_count=TEMPLATE_COUNT):
+    """Plan every commit between two dates (inclusive).
+
+    Uses NumPy when it is installed and the pure `array` path otherwise; pass
+    engine='python' or engine='numpy' to pin one. A given seed reproduces the
+    same plan on the same engine.
+    """
+    if engine is None:
+        engine = 'numpy' if numpy is not None else 'python'
+    if engine == 'numpy' and numpy is None:
+        raise ValueError("NumPy is not installed")
+    plan = CommitPlan(start_date, end_date, seed=seed, engine=engine,
+                      message_count=message_count, template_count=template_count)
+    days = (plan.end_date - plan.start_date).days + 1
+    if days > 0:
+        if engine == 'numpy':
+            _build_numpy(plan, days, seed)
+        else:
+            _build_python(plan, days, seed)
+    return plan
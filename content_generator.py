@@ -0,0 +1,151 @@
+"""
+Content generator
+Turns planned rows into automation lines and commit messages. The comment
+syntax is resolved once per target file and each template is compiled once,
+with the comment prefix and suffix already in place, so a line costs one
+format call plus the random draws its own template needs. A seeded generator
+reseeds at every batch from the plan position, so seeded and resumed runs
+write the same bytes. Template packs (JSON) replace the templates, the commit
+messages or the comment syntax per extension.
+"""
+
+import os
+import json
+import random
+
+from markers import (COMMIT_MESSAGES, FEATURE_KINDS, TEMPLATES, UPDATE_KINDS, comment_style,
+                     template_fields)
+
+# Plans store message and template indices as single bytes
+PACK_LIMIT = 256
+
+
+def _between(low, high):
+    span = high - low + 1
+    return lambda rng: low + int(rng.random() * span)
+
+
+def _one_of(choices):
+    return lambda rng: choices[int(rng.random() * len(choices))]
+
+
+# Random fields, with the same ranges template_values() draws from
+FIELD_DRAWS = {
+    'comment_id': _between(1000, 9999),
+    'update': _one_of(UPDATE_KINDS),
+    'major': _between(1, 100),
+    'minor': _between(0, 9),
+    'build': _between(1000, 9999),
+    'feature': _one_of(FEATURE_KINDS),
+    'automation_id': _between(100, 999),
+}
+
+
+def load_pack(path):
+    """Read and check a template pack; raises ValueError for anything the remover could not undo.
+
+    A pack is a JSON object with any of "templates" (format strings starting
+    with {prefix}, using the fields of markers.TEMPLATES), "messages" and
+    "comment_styles" ({".ext": [prefix, suffix]}).
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("a template pack must be a JSON object")
+    unknown = set(data) - {'name', 'templates', 'messages', 'comment_styles'}
+    if unknown:
+        raise ValueError(f"unknown template pack keys: {', '.join(sorted(unknown))}")
+    pack = {'name': str(data.get('name') or os.path.splitext(os.path.basename(path))[0])}
+    for key in ('templates', 'messages'):
+        if key not in data:
+            continue
+        values = data[key]
+        if (not isinstance(values, list) or not values or len(values) > PACK_LIMIT or
+                not all(isinstance(value, str) and value.strip() for value in values)):
+            raise ValueError(f"'{key}' must be a list of 1-{PACK_LIMIT} non-empty strings")
+        pack[key] = values
+    for template in pack.get('templates', ()):
+        template_fields(template)
+        if not template.startswith('{prefix} ') or '\n' in template:
+            raise ValueError(f"templates must be one line starting with '{{prefix}} ': "
+                             f"{template!r}")
+    styles = {}
+    for ext, style in (data.get('comment_styles') or {}).items():
+        if isinstance(style, str):
+            style = [style, '']
+        if (not ext.startswith('.') or not isinstance(style, list) or len(style) != 2 or
+                not style[0] or not all(isinstance(part, str) for part in style)):
+            raise ValueError(f"comment style for '{ext}' must be \"prefix\" or [prefix, suffix]")
+        styles[ext.lower()] = style
+    if styles:
+        pack['comment_styles'] = styles
+    return pack
+
+
+class ContentGenerator:
+    """Lines and commit messages for one target file.
+
+    `batch(rows, date_str, position)` does a whole day batch at once; rows are
+    the plan's (commit_time, commit_num, message_index, template_index).
+    """
+
+    def __init__(self, target_file, pack=None, seed=None):
+        self.pack = pack
+        pack = pack or {}
+        self.prefix, self.suffix = comment_style(target_file, pack.get('comment_styles'))
+        self.templates = list(pack.get('templates', TEMPLATES))
+        self.messages = list(pack.get('messages', COMMIT_MESSAGES))
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self._compiled = [self._compile(template) for template in self.templates]
+
+    def _compile(self, template):
+        """Bind the comment syntax into a template; returns (format, random draws)"""
+        prefix = self.prefix.replace('{', '{{').replace('}', '}}')
+        text = template.replace('{prefix}', prefix)
+        if self.suffix:
+            text += ' ' + self.suffix.replace('{', '{{').replace('}', '}}')
+        draws = tuple((field, FIELD_DRAWS[field])
+                      for field in dict.fromkeys(template_fields(template)) if field in FIELD_DRAWS)
+        return text.format, draws
+
+    def line(self, commit_num, date_str, template_index=None):
+        """One automation line; without a template index the template is drawn too"""
+        rng = self.rng
+        if template_index is None:
+            template_index = int(rng.random() * len(self._compiled))
+        render, draws = self._compiled[template_index % len(self._compiled)]
+        return render(date=date_str, commit_num=commit_num,
+                      **{field: draw(rng) for field, draw in draws})
+
+    def message(self, message_index=None):
+        """One commit message, the planned one or a random draw"""
+        if message_index is None:
+            message_index = int(self.rng.random() * len(self.messages))
+        return self.messages[message_index % len(self.messages)]
+
+    def batch(self, rows, date_str, position=None):
+        """(lines, messages) for a batch; a seeded generator restarts its RNG at `position`"""
+        if self.seed is not None and position is not None:
+            self.rng.seed(self.seed * 1000003 + position)
+        line = self.line
+        lines = [line(commit_num, date_str, template_index)
+                 for _, commit_num, _, template_index in rows]
+        messages = [self.message(message_index) for _, _, message_index, _ in rows]
+        return lines, messages
+
+    def metadata(self):
+        """What the remover needs to match these lines, for the automation log"""
+        data = {'comment_style': [self.prefix, self.suffix]}
+        if self.pack:
+            data['pack'] = self.pack
+        return data
+
+
+def pack_matchers(metadata):
+    """(templates, comment styles, messages) a logged run's template pack added to the registry's"""
+    pack = (metadata or {}).get('pack')
+    if not pack:
+        return (), [], ()
+    styles = [tuple(style) for style in (pack.get('comment_styles') or {}).values()]
+    return tuple(pack.get('templates', ())), styles, tuple(pack.get('messages', ()))
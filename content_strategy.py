@@ -0,0 +1,287 @@
+"""
+Content strategies
+Decide where each automation line goes. `append` grows a single target file
+(the original behaviour); `shard` rotates across N capped files and `ring`
+rewrites fixed-width slots in place, so per-commit blob size stays flat.
+"""
+
+import os
+import re
+
+TARGET_FILE_HEADER = ("{prefix} Automation Target File{suffix}\n"
+                      "{prefix} Created for commit automation{suffix}\n\n")
+
+STRATEGIES = ('append', 'shard', 'ring')
+RING_PATTERN = re.compile(rb'automation ring (\d+)x(\d+) next=(\d+) >>>')
+
+
+class ContentStrategy:
+    """Base class: keeps the current bytes of every file the strategy writes.
+
+    In-memory backends call `load()` once and `apply(line)` per commit; the
+    worktree backend calls `write(repo_path, line)` and stages the returned path.
+    """
+
+    name = None
+
+    def __init__(self, target_file, comment_prefix='#', comment_suffix=''):
+        self.target_file = target_file.replace(os.sep, '/')
+        self.comment_prefix = comment_prefix
+        self.comment_suffix = comment_suffix
+        self.contents = {}
+        self.created_files = []
+        self.say = print
+        self._on_disk = set()
+
+    def paths(self):
+        """Repository paths this strategy may write"""
+        return [self.target_file]
+
+    def initial_content(self, path):
+        """Content for a file that does not exist yet"""
+        suffix = f" {self.comment_suffix}" if self.comment_suffix else ''
+        return TARGET_FILE_HEADER.format(prefix=self.comment_prefix, suffix=suffix).encode()
+
+    def load(self, read):
+        """Seed the in-memory contents; read(path) returns bytes or None"""
+        for path in self.paths():
+            data = read(path)
+            if data is None:
+                self.say(f"📄 Creating target file: {path}")
+                if path not in self.created_files:
+                    self.created_files.append(path)
+                data = self.initial_content(path)
+            self.contents[path] = data
+
+    def apply(self, line):
+        """Apply one line in memory; returns (path, new content)"""
+        raise NotImplementedError
+
+    def write(self, repo_path, line):
+        """Apply one line to the working tree; returns the path to stage"""
+        raise NotImplementedError
+
+    def _create_on_disk(self, repo_path, path):
+        """Path of a file to write, creating it on first use; checked once per run"""
+        file_path = os.path.join(repo_path, path)
+        if path not in self._on_disk:
+            if not os.path.exists(file_path):
+                self.say(f"📄 Creating target file: {path}")
+                self.created_files.append(path)
+                with open(file_path, 'wb') as f:
+                    f.write(self.initial_content(path))
+            self._on_disk.add(path)
+        return file_path
+
+    def metadata(self):
+        """What the remover needs to know to undo this strategy"""
+        return {'name': self.name, 'paths': self.paths(), 'created_files': self.created_files}
+
+    def state(self):
+        """Progress that is not visible in the file contents, for the run journal"""
+        return {'created_files': list(self.created_files)}
+
+    def restore(self, state):
+        """Pick up from a state() snapshot when a run is resumed"""
+        self.created_files = list(state.get('created_files', []))
+
+
+class AppendStrategy(ContentStrategy):
+    """Append every line to the target file"""
+
+    name = 'append'
+
+    def apply(self, line):
+        content = self.contents[self.target_file] + f"\n{line}\n".encode()
+        self.contents[self.target_file] = content
+        return self.target_file, content
+
+    def write(self, repo_path, line):
+        file_path = self._create_on_disk(repo_path, self.target_file)
+        with open(file_path, 'ab') as f:
+            f.write(f"\n{line}\n".encode())
+        return self.target_file
+
+
+class ShardStrategy(ContentStrategy):
+    """Rotate lines across N shard files next to the target.
+
+    A shard that reaches `max_lines` automation lines starts over from its
+    header, so no file grows without bound.
+    """
+
+    name = 'shard'
+
+    def __init__(self, target_file, comment_prefix='#', comment_suffix='', shards=8,
+                 max_lines=256):
+        super().__init__(target_file, comment_prefix, comment_suffix)
+        self.shards = max(1, shards)
+        self.max_lines = max(1, max_lines)
+        stem, ext = os.path.splitext(self.target_file)
+        self._paths = [f"{stem}.shard{i}{ext}" for i in range(self.shards)]
+        self._lines = [0] * self.shards
+        self._next = 0
+
+    def paths(self):
+        return list(self._paths)
+
+    def _advance(self):
+        index = self._next
+        self._next = (index + 1) % self.shards
+        restart = self._lines[index] >= self.max_lines
+        self._lines[index] = 1 if restart else self._lines[index] + 1
+        return self._paths[index], restart
+
+    def apply(self, line):
+        path, restart = self._advance()
+        base = self.initial_content(path) if restart else self.contents[path]
+        content = base + f"\n{line}\n".encode()
+        self.contents[path] = content
+        return path, content
+
+    def write(self, repo_path, line):
+        path, restart = self._advance()
+        file_path = self._create_on_disk(repo_path, path)
+        # Bytes, like the other strategies: text mode would translate newlines
+        # on Windows and the file would no longer match the in-memory backends
+        with open(file_path, 'wb' if restart else 'ab') as f:
+            if restart:
+                f.write(self.initial_content(path))
+            f.write(f"\n{line}\n".encode())
+        return path
+
+    def metadata(self):
+        data = super().metadata()
+        data.update({'shards': self.shards, 'max_lines': self.max_lines})
+        return data
+
+    def state(self):
+        data = super().state()
+        data.update({'next': self._next, 'lines': list(self._lines)})
+        return data
+
+    def restore(self, state):
+        super().restore(state)
+        self._next = state.get('next', 0)
+        self._lines = list(state.get('lines', self._lines))
+
+
+class RingStrategy(ContentStrategy):
+    """Rewrite one fixed-width slot of a ring region inside the target file.
+
+    The region sits between a begin marker (which also records the next slot)
+    and an end marker, so every commit changes the same number of bytes.
+    """
+
+    name = 'ring'
+
+    def __init__(self, target_file, comment_prefix='#', comment_suffix='', slots=64, width=72):
+        super().__init__(target_file, comment_prefix, comment_suffix)
+        self.slots = max(1, slots)
+        self.width = width
+        self.next_slot = 0
+        self._region = None  # byte offset of the begin marker
+
+    def _closed(self, text):
+        return f"{text} {self.comment_suffix}" if self.comment_suffix else text
+
+    def _begin_line(self):
+        line = (f"{self.comment_prefix} >>> automation ring "
+                f"{self.slots}x{self.width} next={self.next_slot:06d} >>>")
+        return self._closed(line).encode()
+
+    def _end_line(self):
+        return self._closed(f"{self.comment_prefix} <<< automation ring <<<").encode()
+
+    def _region_bytes(self):
+        blank = self._slot_bytes(self.comment_prefix)
+        return (self._begin_line() + b'\n' + (blank + b'\n') * self.slots +
+                self._end_line() + b'\n')
+
+    def _locate(self, content):
+        """Find (or append) the ring region; returns the content that holds it"""
+        match = RING_PATTERN.search(content)
+        if match:
+            self.slots, self.width, self.next_slot = (int(g) for g in match.groups())
+            self._region = content.rfind(b'\n', 0, match.start()) + 1
+            return content
+        if content and not content.endswith(b'\n'):
+            content += b'\n'
+        self._region = len(content) + 1
+        return content + b'\n' + self._region_bytes()
+
+    def _slot_bytes(self, line):
+        """A line cut or padded to the slot width, keeping the comment suffix at the end"""
+        if not self.comment_suffix:
+            return line.encode()[:self.width].ljust(self.width)
+        suffix = f" {self.comment_suffix}".encode()
+        if line.endswith(suffix.decode()):
+            line = line[:-len(suffix)]
+        body = line.encode()[:self.width - len(suffix)].ljust(self.width - len(suffix))
+        return body + suffix
+
+    def _slot(self, line):
+        slot = self._slot_bytes(line)
+        offset = self._region + len(self._begin_line()) + 1 + self.next_slot * (self.width + 1)
+        self.next_slot = (self.next_slot + 1) % self.slots
+        return offset, slot
+
+    def apply(self, line):
+        content = self.contents[self.target_file]
+        if self._region is None:
+            content = self._locate(content)
+        offset, slot = self._slot(line)
+        begin = self._begin_line()
+        content = (content[:self._region] + begin + content[self._region + len(begin):offset] +
+                   slot + content[offset + self.width:])
+        self.contents[self.target_file] = content
+        return self.target_file, content
+
+    def write(self, repo_path, line):
+        file_path = self._create_on_disk(repo_path, self.target_file)
+        if self._region is None:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            located = self._locate(content)
+            if located is not content:
+                with open(file_path, 'ab') as f:
+                    f.write(located[len(content):])
+        offset, slot = self._slot(line)
+        with open(file_path, 'r+b') as f:
+            f.seek(offset)
+            f.write(slot)
+            f.seek(self._region)
+            f.write(self._begin_line())
+        return self.target_file
+
+    def metadata(self):
+        data = super().metadata()
+        data.update({'slots': self.slots, 'width': self.width})
+        return data
+
+
+def make_strategy(name, target_file, comment_prefix='#', shards=8, ring_slots=64,
+                  comment_suffix=''):
+    """Build a content strategy by name"""
+    if name == 'shard':
+        return ShardStrategy(target_file, comment_prefix, comment_suffix, shards=shards)
+    if name == 'ring':
+        return RingStrategy(target_file, comment_prefix, comment_suffix, slots=ring_slots)
+    return AppendStrategy(target_file, comment_prefix, comment_suffix)
+
+
+def strip_ring_region(content):
+    """Remove a ring region (begin marker through end marker) from file content"""
+    match = RING_PATTERN.search(content)
+    if not match:
+        return content
+    start = content.rfind(b'\n', 0, match.start()) + 1
+    end = content.find(b'<<< automation ring <<<', match.end())
+    if end < 0:
+        return content
+    end = content.find(b'\n', end)
+    end = len(content) if end < 0 else end + 1
+    # Drop the blank separator line that was added in front of the region
+    if start >= 2 and content[start - 2:start] == b'\n\n':
+        start -= 1
+    return content[:start] + content[end:]
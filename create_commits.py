@@ -5,66 +5,89 @@ Creates automated commits for a specified date range to fill GitHub contribution
 
 import os
 import random
-import subprocess
+import shlex
 from datetime import datetime, timedelta
 import time
 import json
+import argparse
+import sys
+from functools import partial
 
-class GitCommitCreator:
-    def __init__(self, repo_path, target_file):
+from fast_import import FastImportBackend
+from git_plumbing import GitExecutor, PlumbingBackend, repository_at
+from content_strategy import STRATEGIES, make_strategy
+from pack_writer import PackBackend
+from commit_plan import PLANNERS, CommitPlan, build_plan
+from activity_histogram import deficit_plan
+from run_journal import RunJournal
+from automation_ledger import AutomationLedger
+from content_generator import ContentGenerator, load_pack
+from file_discovery import CANDIDATE_EXTENSIONS, RANKINGS, FileDiscovery
+from instrumentation import Metrics, add_instrumentation_args, run_instrumented
+from maintenance import POLICIES, RepositoryMaintenance
+from automation_api import (CreateConfig, CreateResult, ProgressReporting, print_progress,
+                            progress_reporter, terminal_confirm)
+from push_pipeline import PUSH_MODES, PushPipeline, push_commit, upstream
+from repo_lock import RepositoryLock
+from estimator import Calibration, describe, estimate
+from large_repo import LARGE_REPO_FILES, MODES as LARGE_REPO_MODES, index_entries, is_large, tune_repository
+
+BACKENDS = ('worktree', 'fast-import', 'plumbing', 'pack')
+LOG_FILE = '.commit_automation_log.json'
+
+class GitCommitCreator(ProgressReporting):
+    def __init__(self, repo_path, target_file, backend='worktree', content_strategy='append',
+                 shards=8, ring_slots=64, large_repo='auto', tune_repo=False,
+                 progress=None, confirm=None, metrics=None, template_pack=None):
         self.repo_path = repo_path
+        # progress(event, message, **data) receives what would otherwise be printed;
+        # confirm(key, prompt) answers questions such as whether to push
+        self.progress = progress
+        self.confirm = confirm
         self.target_file = target_file
-        self.commit_log_file = os.path.join(repo_path, '.commit_automation_log.json')
-        self.commit_messages = [
-            "Update code structure",
-            "Fix minor issues", 
-            "Refactor code",
-            "Add improvements",
-            "Update documentation",
-            "Optimize performance",
-            "Fix bugs",
-            "Clean up code",
-            "Add new features",
-            "Update comments",
-            "Improve UI",
-            "Fix styling",
-            "Update methods",
-            "Add error handling",
-            "Improve logic",
-            "Code cleanup",
-            "Minor updates",
-            "Performance improvements",
-            "Bug fixes",
-            "Feature updates"
-        ]
+        self.backend = backend
+        self.shards = shards
+        self.ring_slots = ring_slots
+        # Comment syntax, templates and messages are settled once for the target file
+        self.generator = ContentGenerator(target_file, template_pack)
+        self.strategy = make_strategy(content_strategy, target_file, self.generator.prefix,
+                                      shards=shards, ring_slots=ring_slots,
+                                      comment_suffix=self.generator.suffix)
+        self.strategy.say = self.say
+        self.metrics = metrics or Metrics()
+        self.git = GitExecutor(repo_path, self.metrics)
+        self.git.say = self.say
+        self._engine = None
+        self._journal = None
+        self.total_commits = 0
+        self.total_days = 0
+        self.last_day = None
+        self.start_commit = None
+        self.end_commit = None
+        self.run_id = None
+        self.automation_log = None
+        self.pushed = False
+        self.error = None
+        self.commit_log_file = os.path.join(repo_path, LOG_FILE)
+        self.commit_messages = self.generator.messages
+        # 'auto' is settled once the repository is known to exist
+        self.large_repo = large_repo
+        self.tune_repo = tune_repo
+        self.large = large_repo == 'on'
         
     def run_git_command(self, command, date_str=None):
-        """Run git command with optional date"""
-        try:
-            if date_str:
-                env = os.environ.copy()
-                env['GIT_AUTHOR_DATE'] = date_str
-                env['GIT_COMMITTER_DATE'] = date_str
-                result = subprocess.run(command, shell=True, cwd=self.repo_path, 
-                                      capture_output=True, text=True, env=env)
-            else:
-                result = subprocess.run(command, shell=True, cwd=self.repo_path,
-                                      capture_output=True, text=True)
-            if result.returncode != 0:
-                print(f"Error running command: {command}")
-                print(f"Error: {result.stderr}")
-                return False, result.stderr
-            return True, result.stdout
-        except Exception as e:
-            print(f"Exception running command {command}: {e}")
-            return False, str(e)
+        """Run git command (argv list, without the leading 'git') with optional date"""
+        if isinstance(command, str):
+            command = shlex.split(command)[1:]
+        return self.git.run(command, date_str)
     
     def get_current_commit_hash(self):
         """Get the current commit hash"""
-        success, output = self.run_git_command("git rev-parse HEAD")
-        if success:
-            return output.strip()
-        return None
+        return self.git.resolve('HEAD^{commit}')
+    
+    def on_branch(self, commit):
+        """Whether the checked-out history still contains a commit"""
+        return self.git.run(['merge-base', '--is-ancestor', commit, 'HEAD'], quiet=True)[0]
     
     def save_automation_log(self, start_commit, end_commit, total_commits, date_range):
         """Save automation log for removal script"""
@@ -74,214 +97,663 @@ class GitCommitCreator:
             'total_commits': total_commits,
             'date_range': date_range,
             'created_at': datetime.now().isoformat(),
-            'target_file': self.target_file
+            'target_file': self.target_file,
+            'backend': self.backend,
+            'content_strategy': self.strategy.metadata(),
+            'content_generator': self.generator.metadata()
         }
+        self.automation_log = log_data
         
         try:
             with open(self.commit_log_file, 'w') as f:
                 json.dump(log_data, f, indent=2)
-            print(f"📝 Automation log saved to: {self.commit_log_file}")
+            self.say(f"📝 Automation log saved to: {self.commit_log_file}")
         except Exception as e:
-            print(f"Warning: Could not save automation log: {e}")
-    
-    def modify_file(self, commit_num, date_str):
-        """Modify the target file - always add content to ensure commits work"""
-        file_path = os.path.join(self.repo_path, self.target_file)
-        
-        # Create the file if it doesn't exist
-        if not os.path.exists(file_path):
-            print(f"📄 Creating target file: {self.target_file}")
-            with open(file_path, 'w') as f:
-                f.write(f"# Automation Target File\n")
-                f.write(f"# Created for commit automation\n\n")
+            self.say(f"Warning: Could not save automation log: {e}")
         
+        # The log only describes the latest run; the ledger keeps every run's commits
         try:
-            # Determine comment style based on file extension
-            file_ext = os.path.splitext(self.target_file)[1].lower()
-            if file_ext in ['.py', '.sh', '.yml', '.yaml', '.conf']:
-                comment_prefix = "#"
-            elif file_ext in ['.java', '.js', '.ts', '.cpp', '.c', '.cs', '.php', '.go', '.rs']:
-                comment_prefix = "//"
-            elif file_ext in ['.html', '.xml']:
-                comment_prefix = "<!--"
-                comment_suffix = "-->"
-            else:
-                comment_prefix = "#"  # Default to hash
-            
-            # Always add content - this ensures every commit has changes
-            comment = f"{comment_prefix} Auto-generated comment {random.randint(1000, 9999)}"
-            
-            # Add different types of modifications
-            modifications = [
-                f"{comment_prefix} Modified on {date_str}",
-                f"{comment_prefix} Commit #{commit_num} - {comment}",
-                f"{comment_prefix} Update: {random.choice(['refactor', 'optimize', 'cleanup', 'enhance'])}",
-                f"{comment_prefix} Version: {random.randint(1, 100)}.{random.randint(0, 9)}",
-                f"{comment_prefix} Build: {random.randint(1000, 9999)}",
-                f"{comment_prefix} Feature: {random.choice(['improvement', 'bugfix', 'enhancement', 'maintenance'])}",
-                f"{comment_prefix} Automation commit {random.randint(100, 999)}"
-            ]
-            
-            selected_mod = random.choice(modifications)
-            
-            with open(file_path, 'a') as f:
-                f.write(f"\n{selected_mod}\n")
-            
-            return True
+            self.run_id = AutomationLedger(self.git.git_dir()).add_run(
+                log_data, self.list_commits(start_commit, end_commit))
+            self.say(f"📚 Recorded as run #{self.run_id} in the automation ledger")
         except Exception as e:
-            print(f"Error modifying file: {e}")
-            return False
+            self.say(f"Warning: Could not update automation ledger: {e}")
+    
+    def list_commits(self, start_commit, end_commit):
+        """[sha, timestamp] for every commit after start_commit up to end_commit, oldest first"""
+        if not end_commit or end_commit == start_commit:
+            return []
+        args = ['rev-list', '--reverse', '--timestamp', end_commit]
+        if start_commit:
+            args.append(f"^{start_commit}")
+        success, output = self.run_git_command(args)
+        commits = []
+        for line in output.splitlines() if success else []:
+            timestamp, sha = line.split()
+            commits.append([sha, int(timestamp)])
+        return commits
+    
+    def comment_prefix(self):
+        """Comment prefix for the target file's language"""
+        return self.generator.prefix
     
-    def check_for_changes(self):
-        """Check if there are changes to commit"""
+    def build_modification(self, commit_num, date_str, template_index=None):
+        """Build one automation line for the target file"""
+        return self.generator.line(commit_num, date_str, template_index)
+    
+    def modify_file(self, commit_num, date_str, template_index=None, line=None):
+        """Modify the target file through the content strategy; returns the path written"""
         try:
-            result = subprocess.run("git diff --cached --name-only", 
-                                  shell=True, cwd=self.repo_path,
-                                  capture_output=True, text=True)
-            return len(result.stdout.strip()) > 0
-        except:
+            selected_mod = line or self.build_modification(commit_num, date_str, template_index)
+            self.metrics.count('bytes_appended', len(selected_mod.encode()) + 1)
+            return self.strategy.write(self.repo_path, selected_mod)
+        except Exception as e:
+            self.say(f"Error modifying file: {e}")
+            return None
+    
+    def check_for_changes(self, path=None):
+        """Check if there are changes to commit (to `path` only, in large mode)"""
+        if self.large and path:
+            head = self.get_current_commit_hash()
+            if head is None:
+                return True
+            success, output = self.run_git_command(['diff-index', '--cached', '--name-only',
+                                                    head, '--', path])
+        else:
+            success, output = self.run_git_command(['diff', '--cached', '--name-only'])
+        return success and len(output.strip()) > 0
+    
+    def stage_file(self, path):
+        """Stage one path; large mode skips `git add`'s pathspec and ignore handling"""
+        if self.large:
+            return self.run_git_command(['update-index', '--add', '--', path])[0]
+        return self.run_git_command(['add', '--', path])[0]
+    
+    def commit_index(self, message, git_date):
+        """Commit the staged index at git_date; returns success.
+        
+        Large mode writes the tree from the index's cached trees and moves the
+        branch itself, so only the target path's directories are rehashed and
+        the index is not rewritten by `git commit`.
+        """
+        if not self.large:
+            return self.run_git_command(['commit', '-m', message], git_date)[0]
+        success, tree = self.run_git_command(['write-tree'])
+        if not success:
             return False
+        head = self.get_current_commit_hash()
+        args = ['commit-tree', tree.strip(), '-m', message] + (['-p', head] if head else [])
+        success, commit = self.run_git_command(args, git_date)
+        return success and self.git.update_ref('HEAD', commit.strip(), head,
+                                                  reason=f"commit: {message}")
+    
+    def prepare_repository(self):
+        """Settle 'auto' large mode and print (or apply) settings for big repositories.
+        
+        A repository without a working tree has no checkout to write: the run
+        goes through fast-import instead of the worktree backend, and the
+        index settings do not apply.
+        """
+        if not self.git.has_worktree():
+            if self.backend == 'worktree':
+                self.backend = 'fast-import'
+            self.large = False
+            self.say(f"🗄  No working tree: blobs are built from HEAD in memory "
+                     f"({self.backend} backend), only refs and objects are written")
+            return
+        if self.large_repo == 'auto':
+            self.large = is_large(self.git, 'auto')
+        if self.large:
+            self.say(f"🐘 Large repository ({index_entries(self.git.git_dir())} index entries): "
+                     f"per-commit git calls only touch the target path")
+        if self.large or self.tune_repo:
+            tune_repository(self.git, apply=self.tune_repo)
     
     def create_commits_for_date(self, target_date, num_commits):
         """Create specified number of commits for a given date"""
-        date_str = target_date.strftime('%Y-%m-%d')
-        print(f"Creating {num_commits} commits for {date_str}")
-        
-        successful_commits = 0
-        
+        rows = []
         for i in range(num_commits):
             # Randomize time within the day
             hour = random.randint(9, 23)
             minute = random.randint(0, 59)
             second = random.randint(0, 59)
             commit_time = target_date.replace(hour=hour, minute=minute, second=second)
+            rows.append((commit_time, i + 1, random.randrange(len(self.commit_messages)), None))
+        return self.commit_batch(target_date, rows)
+    
+    def commit_batch(self, target_date, rows, position=None):
+        """Create commits for planned (commit_time, commit_num, message_index, template_index) rows
+        
+        position is the plan index of the first row; when a run journal is open,
+        every per-commit success is recorded against it.
+        """
+        date_str = target_date.strftime('%Y-%m-%d')
+        num_commits = len(rows)
+        self.say(f"Creating {num_commits} commits for {date_str}")
+        
+        successful_commits = 0
+        
+        metrics = self.metrics
+        with metrics.timer('generate_content'):
+            lines, messages = self.generator.batch(rows, date_str, position)
+        for offset, (commit_time, commit_num, message_index, template_index) in enumerate(rows):
             git_date = commit_time.strftime('%Y-%m-%d %H:%M:%S')
+            commit_msg = messages[offset]
+            line = lines[offset]
+            metrics.count('commits_attempted')
+            started = time.perf_counter()
+            
+            if self._engine:
+                metrics.count('bytes_appended', len(line.encode()) + 1)
+                with metrics.timer('engine_add_commit'):
+                    added = self._engine.add_commit(line, commit_msg, commit_time)
+                if added:
+                    successful_commits += 1
+                    metrics.count('commits_succeeded')
+                    metrics.observe('commit_latency_seconds', time.perf_counter() - started)
+                else:
+                    metrics.count('commits_failed')
+                continue
             
             # Modify the file
-            if not self.modify_file(i + 1, date_str):
-                print(f"  ✗ Failed to modify file for commit {i+1}")
+            with metrics.timer('modify_file'):
+                changed_path = self.modify_file(commit_num, date_str, line=line)
+            if not changed_path:
+                self.say(f"  ✗ Failed to modify file for commit {commit_num}")
+                metrics.count('commits_skipped')
                 continue
             
             # Stage the file
-            if not self.run_git_command(f"git add {self.target_file}")[0]:
-                print(f"  ✗ Failed to stage file for commit {i+1}")
+            with metrics.timer('stage'):
+                staged = self.stage_file(changed_path)
+            if not staged:
+                self.say(f"  ✗ Failed to stage file for commit {commit_num}")
+                metrics.count('commits_skipped')
                 continue
             
             # Check if there are actually changes to commit
-            if not self.check_for_changes():
-                print(f"  ⚠ No changes to commit for commit {i+1}")
+            with metrics.timer('check_for_changes'):
+                has_changes = self.check_for_changes(changed_path)
+            if not has_changes:
+                self.say(f"  ⚠ No changes to commit for commit {commit_num}")
+                metrics.count('commits_skipped')
                 continue
             
-            # Commit with backdated timestamp
-            commit_msg = random.choice(self.commit_messages)
-            commit_command = f'git commit -m "{commit_msg}"'
+            # Journal the commit before making it, so an interruption right after
+            # it does not leave the branch ahead of the journal
+            if self._journal and position is not None:
+                self.record_progress(position + offset + 1, target_date, successful_commits + 1,
+                                     None, event='pending', message=commit_msg)
             
-            if self.run_git_command(commit_command, git_date)[0]:
+            # Commit with backdated timestamp
+            with metrics.timer('commit'):
+                committed = self.commit_index(commit_msg, git_date)
+            if committed:
                 successful_commits += 1
-                print(f"  ✓ Commit {successful_commits}/{num_commits} created at {git_date}")
+                metrics.count('commits_succeeded')
+                metrics.observe('commit_latency_seconds', time.perf_counter() - started)
+                self.report('commit', f"  ✓ Commit {successful_commits}/{num_commits} created at {git_date}",
+                            date=date_str, committed_at=git_date, commits=successful_commits,
+                            total=num_commits)
+                if self._journal and position is not None:
+                    self.record_progress(position + offset + 1, target_date, successful_commits,
+                                         self.get_current_commit_hash())
             else:
-                print(f"  ✗ Failed to create commit {i+1}")
+                self.say(f"  ✗ Failed to create commit {commit_num}")
+                metrics.count('commits_failed')
             
             # Small delay to avoid issues
-            time.sleep(0.1)
+            with metrics.timer('sleep'):
+                time.sleep(0.1)
         
-        print(f"  → Successfully created {successful_commits}/{num_commits} commits for {date_str}")
+        self.report('day', f"  → Successfully created {successful_commits}/{num_commits} commits for {date_str}",
+                    date=date_str, commits=successful_commits, total=num_commits)
         return successful_commits
     
-    def generate_commits_for_period(self, start_date, end_date):
-        """Generate commits for a specified period"""
-        print(f"Starting commit generation from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}...")
-        
-        if not self.run_git_command("git status")[0]:
-            print("Error: Not in a git repository or git not configured")
+    def record_progress(self, position, batch_date, batch_commits, commit, durable=False,
+                        event='progress', **fields):
+        """Append a journal record: rows before `position` are done and `commit` holds them"""
+        days = self.total_days
+        if batch_commits and batch_date != self.last_day:
+            days += 1
+        self._journal.record(event, durable=durable, position=position, commit=commit,
+                             commits=self.total_commits + batch_commits, days=days,
+                             last_day=batch_date.strftime('%Y-%m-%d'),
+                             strategy=self.strategy.state(), **fields)
+    
+    def checkpoint(self, position):
+        """Make an in-memory backend's work durable and journal it; returns the commit"""
+        commit = self._engine.checkpoint()
+        if commit is None:
+            self.say("⚠ Checkpoint failed; a resume will restart from the previous one")
+            return None
+        self.record_progress(position, self.last_day, 0, commit, durable=True)
+        return commit
+    
+    def is_pending_commit(self, head, commit, pending):
+        """Whether HEAD is the journal's pending commit, made on top of `commit`"""
+        if head is None:
+            return False
+        success, output = self.run_git_command(['log', '-1', '--format=%P%n%B', head])
+        if not success:
             return False
+        parents, _, message = output.partition('\n')
+        return parents.strip() == (commit or '') and message.strip() == pending['message'].strip()
+    
+    def restore_checkpoint(self, state):
+        """Bring the branch files back to the journal's last durable point; returns its position"""
+        start = state['start']
+        progress = state['progress'] or {'position': 0, 'commit': start['start_commit'],
+                                         'commits': 0, 'days': 0, 'last_day': None,
+                                         'strategy': {}}
+        commit = progress['commit']
+        head = self.get_current_commit_hash()
+        pending = state.get('pending')
+        if head != commit and pending and self.is_pending_commit(head, commit, pending):
+            self.say(f"↪️  Keeping commit {head[:7]}, made just before the interruption")
+            progress = dict(pending, commit=head)
+            commit = head
+        if head != commit:
+            self.fail(f"❌ The branch moved since the last checkpoint "
+                      f"(HEAD is {head or 'unborn'}, journal has {commit or 'unborn'})")
+            self.say("Reset the branch to the journal commit, or start a new run.")
+            return None
         
-        # Get starting commit hash
-        start_commit = self.get_current_commit_hash()
+        # Undo anything written after the checkpoint (a half-made worktree commit,
+        # or files that an in-memory backend never synced)
+        created = progress['strategy'].get('created_files', [])
+        contents = {}
+        worktree = self.git.has_worktree()
+        for path in self.strategy.paths():
+            data = self.git.read_blob(commit, path) if commit else None
+            if data is not None:
+                contents[path] = data
+            elif (worktree and path in created and
+                  os.path.exists(os.path.join(self.repo_path, path))):
+                os.remove(os.path.join(self.repo_path, path))
+        if contents:
+            self.git.sync_checkout(contents)
+        self.strategy.restore(progress['strategy'])
         
-        current_date = start_date
-        total_commits = 0
-        total_days = 0
+        self.total_commits = progress['commits']
+        self.total_days = progress['days']
+        self.last_day = (datetime.strptime(progress['last_day'], '%Y-%m-%d')
+                         if progress['last_day'] else None)
+        self.say(f"↩️  Resuming at commit {progress['position'] + 1} of {len(state['plan'])} "
+                 f"({self.total_commits} already created)")
+        return progress['position']
+    
+    def generate_commits_for_period(self, start_date, end_date, plan=None, seed=None, push=None,
+                                    resume=None, maintenance='auto', push_mode='end',
+                                    push_chunk='month', planner='random'):
+        """Generate commits for a specified period, following a precomputed plan.
         
-        print(f"📅 Processing {(end_date - start_date).days + 1} days...")
+        push=None asks the confirm callback (no push without one); True/False
+        push or skip without asking.
+        Progress is journaled in the git directory as the run goes; pass the
+        state from RunJournal.load() as `resume` to continue an interrupted run.
+        maintenance ('auto', 'always' or 'never') controls the repack and
+        commit-graph stage run before pushing; 'auto' skips small runs.
+        push_mode='pipelined' pushes finished chunks in the background while
+        generation goes on, one per month of the schedule or every `push_chunk`
+        commits; whether to push is then settled before the first commit.
+        planner='deficit' trims the plan to what each day is missing next to
+        the configured author's commits already on the branch.
+        """
+        if resume:
+            plan = resume['plan']
+        elif plan is None:
+            with self.metrics.timer('plan'):
+                plan = build_plan(start_date, end_date, seed=seed,
+                                  message_count=len(self.commit_messages),
+                                  template_count=len(self.generator.templates))
+        # Lines are drawn from the plan's seed, so a seeded plan reproduces the content too
+        self.generator.seed = plan.seed
+        self.say(f"Starting commit generation from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}...")
+        self.say(f"🗓  Planned {len(plan)} commits on {plan.active_days()} days")
         
-        # Generate commits for each day in the period
-        while current_date <= end_date:
-            # 65% chance of having commits on any given day
-            if random.random() < 0.65:
-                # Vary commits by day of week (more commits on weekdays)
-                if current_date.weekday() < 5:  # Monday-Friday
-                    num_commits = random.randint(1, 8)
-                else:  # Weekend
-                    num_commits = random.randint(1, 4)
-                
-                commits_made = self.create_commits_for_date(current_date, num_commits)
-                total_commits += commits_made
-                if commits_made > 0:
-                    total_days += 1
-                
-                # Special busy periods (simulate project deadlines)
-                if random.random() < 0.05:  # 5% chance of very busy day
-                    extra_commits = random.randint(5, 12)
-                    extra_made = self.create_commits_for_date(current_date, extra_commits)
-                    total_commits += extra_made
-                    print(f"  🔥 BUSY DAY: Extra {extra_made} commits added!")
-            
-            current_date += timedelta(days=1)
+        if not self.git.is_repository():
+            return self.fail("Error: Not in a git repository or git not configured")
+        self.prepare_repository()
+        if planner == 'deficit' and not resume:
+            planned = len(plan)
+            plan, histogram = deficit_plan(self.git, plan)
+            self.say(f"📈 {histogram.describe()}; {len(plan)} of {planned} planned commits "
+                     f"are missing")
         
-        end_commit = self.get_current_commit_hash()
+        date_range = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+        journal = RunJournal(self.git.git_dir())
+        if resume:
+            start_commit = resume['start']['start_commit']
+            position = self.restore_checkpoint(resume)
+            if position is None:
+                return False
+            journal.reopen()
+        else:
+            if journal.exists():
+                self.say("⚠ Replacing the journal of an unfinished run (it could have been resumed with --resume)")
+            # Get starting commit hash
+            start_commit = self.get_current_commit_hash()
+            position = 0
+            self.total_commits = self.total_days = 0
+            self.last_day = None
+            journal.begin(plan, start_commit=start_commit, target_file=self.target_file,
+                          backend=self.backend, date_range=date_range,
+                          content_strategy=dict(self.strategy.metadata(), shards=self.shards,
+                                                ring_slots=self.ring_slots),
+                          content_generator=self.generator.metadata())
+        self._journal = journal
         
-        print(f"\n📊 Summary:")
-        print(f"Total days with commits: {total_days}")
-        print(f"Total commits created: {total_commits}")
-        print(f"Average commits per active day: {total_commits/total_days if total_days > 0 else 0:.1f}")
+        if self.backend == 'fast-import':
+            self._engine = FastImportBackend(self.repo_path, self.strategy, self.git)
+        elif self.backend == 'plumbing':
+            self._engine = PlumbingBackend(self.repo_path, self.strategy, self.git)
+        elif self.backend == 'pack':
+            self._engine = PackBackend(self.repo_path, self.strategy, self.git)
+        if self._engine:
+            with self.metrics.timer('engine_start'):
+                engine_ready = self._engine.start()
+            if engine_ready:
+                self.say(f"⚡ Writing commits through the {self.backend} backend")
+            elif not self.git.has_worktree():
+                journal.close()
+                self._journal = None
+                return self.fail(f"Error: the {self.backend} backend could not start, and "
+                                 f"there is no working tree to fall back to")
+            else:
+                self.say("⚠ Falling back to per-commit mode")
+                self._engine = None
         
-        # Save automation log
-        date_range = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-        self.save_automation_log(start_commit, end_commit, total_commits, date_range)
+        pipeline = None
+        if push_mode == 'pipelined':
+            if push is None:
+                push = bool(self.confirm and self.confirm(
+                    'push', "\n🚀 Push to the remote repository while generating? (y/N): "))
+            pipeline = self.start_pipeline() if push else None
+        chunk_month = None
+        chunk_commits = self.total_commits
         
-        push_response = input("\n🚀 Do you want to push commits to remote repository? (y/N): ")
-        if push_response.lower() == 'y':
-            print("⏳ Pushing commits to remote repository...")
-            
-            if self.run_git_command("git push origin main")[0]:
-                print("✓ All commits pushed successfully!")
-            elif self.run_git_command("git push origin master")[0]:
-                print("✓ All commits pushed successfully!")
+        self.say(f"📅 Processing {(end_date - start_date).days + 1} days...")
+        
+        # Execute the plan one day batch at a time
+        try:
+            for position, batch_date, rows in plan.batches(position):
+                if pipeline:
+                    month = (batch_date.year, batch_date.month)
+                    if push_chunk == 'month':
+                        due = chunk_month is not None and month != chunk_month
+                    else:
+                        due = self.total_commits - chunk_commits >= push_chunk
+                    # Everything before this batch is a finished chunk
+                    if due:
+                        pipeline.submit(self.chunk_tip(position))
+                        chunk_commits = self.total_commits
+                    chunk_month = month
+                commits_made = self.commit_batch(batch_date, rows, position)
+                self.total_commits += commits_made
+                # A second batch that restarts numbering on the same day is the burst
+                if batch_date == self.last_day and rows[0][1] == 1:
+                    self.say(f"  🔥 BUSY DAY: Extra {commits_made} commits added!")
+                elif commits_made > 0 and batch_date != self.last_day:
+                    self.total_days += 1
+                self.last_day = batch_date
+                if self._engine and journal.checkpoint_due():
+                    with self.metrics.timer('checkpoint'):
+                        self.checkpoint(position + len(rows))
+        
+        except BaseException:
+            try:
+                if pipeline:
+                    pipeline.close()
+                if self._engine:
+                    self._engine.abort()
+                    self._engine = None
+                journal.close()
+                self._journal = None
+                if journal.exists():
+                    self.say("\n⏸  Progress is journaled; continue with: "
+                             "python3 create_commits.py --resume")
+            finally:
+                # Stop the persistent cat-file/hash-object/mktree workers
+                self.git.close()
+            raise
+        
+        if self._engine:
+            engine, self._engine = self._engine, None
+            with self.metrics.timer('engine_finish'):
+                finished = engine.finish()
+            if not finished:
+                self.fail(f"Error: {self.backend} backend did not complete, branch was not moved")
+                if pipeline:
+                    pipeline.close()
+                journal.close()
+                self._journal = None
+                self.git.close()
+                return False
+        
+        end_commit = self.get_current_commit_hash()
+        self.start_commit, self.end_commit = start_commit, end_commit
+        self.git.close()
+        if pipeline:
+            with self.metrics.timer('push'):
+                self.pushed = pipeline.finish(end_commit)
+            if self.pushed:
+                self.say(f"✓ Pushed to {pipeline.remote}/{pipeline.branch} in "
+                         f"{pipeline.chunks} chunk(s) while generating")
             else:
-                print("✗ Error pushing commits.")
-                print("Try manually with one of these commands:")
-                print("  git push origin main")
-                print("  git push origin master")
-                print("  git push")
+                self.say(f"✗ The final push to {pipeline.remote}/{pipeline.branch} failed; "
+                         f"retry with: git push {pipeline.remote} HEAD:{pipeline.branch}")
+        total_commits, total_days = self.total_commits, self.total_days
+        
+        self.say(f"\n📊 Summary:")
+        self.say(f"Total days with commits: {total_days}")
+        self.say(f"Total commits created: {total_commits}")
+        self.say(f"Average commits per active day: {total_commits/total_days if total_days > 0 else 0:.1f}")
+        
+        # Save automation log; the journal is no longer needed once it exists
+        with self.metrics.timer('save_log'):
+            self.save_automation_log(start_commit, end_commit, total_commits, date_range)
+        journal.discard()
+        self._journal = None
+        
+        if maintenance != 'never':
+            RepositoryMaintenance(self.git, maintenance).finalize(total_commits)
+        
+        if pipeline is None:
+            if push is None:
+                push = bool(self.confirm and self.confirm(
+                    'push', "\n🚀 Do you want to push commits to remote repository? (y/N): "))
+            if push:
+                self.pushed = self.push_commits()
         
         return True
+    
+    def start_pipeline(self):
+        """Start a background pusher for the branch's upstream, or None without a remote"""
+        target = upstream(self.git)
+        if target is None:
+            self.say("⚠ No remote to push to; the run will not be pushed")
+            return None
+        self.say(f"🚀 Pushing to {target[0]}/{target[1]} in chunks while generating")
+        return PushPipeline(self.git, *target)
+    
+    def chunk_tip(self, position):
+        """The commit that holds every row before `position`, made durable for pushing"""
+        if self._engine:
+            with self.metrics.timer('checkpoint'):
+                return self.checkpoint(position)
+        return self.get_current_commit_hash()
+    
+    def push_commits(self):
+        """Push the branch to its upstream (retrying failed attempts); returns success"""
+        target = upstream(self.git)
+        if target is None:
+            self.say("✗ No remote to push to; add one and run: git push -u <remote> HEAD")
+            return False
+        remote, branch = target
+        self.say(f"⏳ Pushing commits to {remote}/{branch}...")
+        
+        with self.metrics.timer('push'):
+            pushed = push_commit(self.git, remote, branch, self.get_current_commit_hash())
+        if pushed:
+            self.say("✓ All commits pushed successfully!")
+        else:
+            self.say("✗ Error pushing commits.")
+            self.say("Try manually with:")
+            self.say(f"  git push {remote} HEAD:{branch}")
+        return pushed
+
+def previous_run(repo_path):
+    """Log data of the repository's last run: its automation log, else the ledger's latest run"""
+    try:
+        with open(os.path.join(repo_path, LOG_FILE), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return AutomationLedger(GitExecutor(repo_path).git_dir()).latest_run()
+
+def top_up_range(log_data, end_date=None):
+    """(start, end) of the days after a logged run up to end_date (today); None if none are left"""
+    last_day = datetime.strptime(log_data['date_range'].split(' to ')[-1], '%Y-%m-%d')
+    end_date = datetime.combine((end_date or datetime.now()).date(), datetime.min.time())
+    start_date = last_day + timedelta(days=1)
+    return (start_date, end_date) if start_date <= end_date else None
 
-def get_repo_info():
+def create(config, progress=None, confirm=None, metrics=None):
+    """Run the generation a CreateConfig describes; returns a CreateResult.
+    
+    progress receives Progress events and confirm(key, prompt) is asked
+    whether to push when config.push is None. Without them nothing is printed
+    or asked. Errors, including unexpected exceptions, end up in result.error.
+    """
+    started = time.monotonic()
+    report = progress_reporter(progress)
+    result = CreateResult(False, config.repo_path)
+    settings = {'target_file': config.target_file, 'backend': config.backend,
+                'content_strategy': config.content_strategy, 'shards': config.shards,
+                'ring_slots': config.ring_slots}
+    state = None
+    pack = None
+    previous = None
+    resume = config.resume
+    start_date, end_date = config.start_date, config.end_date
+    if config.incremental and not resume:
+        # The up-to-date case only reads the log, so a repeated cron run is a no-op
+        try:
+            previous = previous_run(config.repo_path)
+            days = previous and top_up_range(previous, config.end_date)
+        except (OSError, ValueError, KeyError) as e:
+            result.error = f"❌ Could not read the last run from the automation log: {e}"
+            report('error', result.error)
+            return result
+        if previous is None:
+            result.error = "❌ No previous run to continue (no automation log or ledger run)"
+            report('error', result.error)
+            return result
+        if days is None:
+            result.success = True
+            result.start_commit = result.end_commit = previous.get('end_commit')
+            result.seconds = round(time.monotonic() - started, 3)
+            report('message', f"✅ Already up to date: the last run reached "
+                              f"{previous['date_range'].split(' to ')[-1]}")
+            return result
+        interrupted = RunJournal(GitExecutor(config.repo_path).git_dir()).load()
+        if interrupted is not None and interrupted['plan'] is not None:
+            report('message', "⏸  Finishing the interrupted run first; "
+                              "the next incremental run adds the days after it")
+            resume = True
+        else:
+            start_date, end_date = days
+            strategy = previous.get('content_strategy') or {}
+            settings.update(target_file=previous['target_file'],
+                            backend=previous.get('backend', config.backend),
+                            content_strategy=strategy.get('name', 'append'),
+                            shards=strategy.get('shards', config.shards),
+                            ring_slots=strategy.get('slots', config.ring_slots))
+            # An explicit template pack replaces the last run's (loaded below)
+            pack = (previous.get('content_generator') or {}).get('pack')
+    if resume:
+        state = RunJournal(GitExecutor(config.repo_path).git_dir()).load()
+        if state is None or state['plan'] is None:
+            result.error = "❌ No interrupted run to resume (no journal in the git directory)"
+            report('error', result.error)
+            return result
+        start = state['start']
+        strategy = start['content_strategy']
+        settings.update(target_file=start['target_file'], backend=start['backend'],
+                        content_strategy=strategy['name'], shards=strategy.get('shards', 8),
+                        ring_slots=strategy.get('ring_slots', 64))
+        pack = (start.get('content_generator') or {}).get('pack')
+    elif config.template_pack:
+        try:
+            pack = load_pack(config.template_pack)
+        except (OSError, ValueError) as e:
+            result.error = f"❌ Could not load template pack {config.template_pack}: {e}"
+            report('error', result.error)
+            return result
+    
+    creator = GitCommitCreator(config.repo_path, settings['target_file'],
+                               backend=settings['backend'],
+                               content_strategy=settings['content_strategy'],
+                               shards=settings['shards'], ring_slots=settings['ring_slots'],
+                               large_repo=config.large_repo, tune_repo=config.tune_repo,
+                               progress=report, confirm=confirm, metrics=metrics,
+                               template_pack=pack)
+    plan = state['plan'] if state else (None if previous else config.plan)
+    if plan is not None:
+        start_date, end_date = plan.start_date, plan.end_date
+    lock = RepositoryLock(creator.git.git_dir(), 'create_commits')
+    try:
+        if creator.git.is_repository() and not lock.acquire(config.lock_wait):
+            creator.fail(lock.busy_message())
+        elif previous and previous.get('end_commit') and not creator.on_branch(previous['end_commit']):
+            creator.fail(f"❌ The last run's end commit {previous['end_commit'][:7]} is no longer "
+                         f"on the branch; run a full date range instead of --incremental")
+        else:
+            if lock.broken:
+                creator.say(f"🔓 Removed a stale lock left by {lock.describe(lock.broken)}")
+            result.success = creator.generate_commits_for_period(
+                start_date, end_date, plan=plan, seed=config.seed, push=config.push,
+                resume=state, maintenance=config.maintenance, push_mode=config.push_mode,
+                push_chunk=config.push_chunk, planner=config.planner)
+    except Exception as e:
+        creator.fail(f"❌ {type(e).__name__}: {e}")
+    finally:
+        lock.release()
+    
+    result.start_commit = creator.start_commit
+    result.end_commit = creator.end_commit
+    result.commits = creator.total_commits
+    result.days = creator.total_days
+    result.run_id = creator.run_id
+    result.pushed = creator.pushed
+    result.error = creator.error
+    result.automation_log = creator.automation_log
+    result.seconds = round(time.monotonic() - started, 3)
+    result.metrics = creator.metrics.summary()
+    return result
+
+def get_repo_info(rank='index', extensions=CANDIDATE_EXTENSIONS, read_only=False, git_dir=None,
+                  discover=True):
     """Get repository path and suggest target files"""
-    # Use current directory as repository path
-    repo_path = os.getcwd()
+    # Use the --git-dir (a bare repository or git directory) or the current directory
+    repo_path = repository_at(git_dir or os.getcwd())
     
     # Check if we're in a git repository
-    if not os.path.exists(os.path.join(repo_path, '.git')):
-        print("❌ Error: Current directory is not a git repository!")
-        print("Please run this script from inside a git repository.")
+    if repo_path is None:
+        if git_dir:
+            print(f"❌ Error: {git_dir} is not a git directory or bare repository!")
+        else:
+            print("❌ Error: Current directory is not a git repository!")
+            print("Please run this script from the top of a git repository, or pass --git-dir.")
         return None, None
     
-    common_files = []
-    for root, dirs, files in os.walk(repo_path):
-        # Skip .git and other hidden directories
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
-        
-        for file in files:
-            if file.endswith(('.py', '.js', '.java', '.cpp', '.c', '.ts', '.php', '.rb', '.go', '.rs')):
-                rel_path = os.path.relpath(os.path.join(root, file), repo_path)
-                common_files.append(rel_path)
-        
-        if len(common_files) >= 20:
-            break
+    if not discover:
+        return repo_path, []
     
-    return repo_path, common_files[:20]  # Limit to first 20 files
+    # Suggest tracked files from the index (first 20, or the best 20 by `rank`)
+    discovery = FileDiscovery(repo_path, extensions=extensions, rank=rank, limit=20,
+                              read_only=read_only)
+    return repo_path, discovery.candidates()
 
 def select_target_file(suggested_files):
     """Let user select or specify target file"""
@@ -312,23 +784,8 @@ def select_target_file(suggested_files):
         except ValueError:
             print("Please enter a valid number")
 
-def main():
-    print("🚀 GitHub Commit Creator")
-    print("=" * 50)
-    
-    # Get repository information
-    repo_path, suggested_files = get_repo_info()
-    if repo_path is None:
-        return
-    
-    # Get target file
-    target_file = select_target_file(suggested_files)
-    
-    print(f"Repository: {repo_path}")
-    print(f"Target file: {target_file}")
-    print("=" * 50)
-    
-    # Get date range from user
+def select_date_range():
+    """Ask the user for the date range to fill"""
     print("\n📅 Date Range Configuration:")
     print("1. Last 30 days")
     print("2. Last 90 days")
@@ -372,9 +829,243 @@ def main():
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30)
     
+    return start_date, end_date
+
+def push_chunk_size(value):
+    """argparse type for --push-chunk: 'month' or a positive number of commits"""
+    if value == 'month':
+        return value
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError("expected 'month' or a positive number of commits")
+    return int(value)
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Create automated commits for a date range.")
+    parser.add_argument('--git-dir', metavar='PATH',
+                        help="run against a bare repository or git directory instead of the "
+                             "current checkout; nothing outside it is written")
+    parser.add_argument('--backend', choices=BACKENDS, default='worktree',
+                        help="commit engine: 'worktree' runs git per commit (default; "
+                             "fast-import without a working tree), "
+                             "'fast-import' streams the whole range into one git process, "
+                             "'plumbing' writes objects through persistent git workers, "
+                             "'pack' builds a single packfile in-process")
+    parser.add_argument('--content-strategy', choices=STRATEGIES, default='append',
+                        help="'append' grows the target file (default), 'shard' rotates "
+                             "across capped shard files, 'ring' rewrites fixed slots in place")
+    parser.add_argument('--template-pack', metavar='PATH',
+                        help="JSON file with templates, commit messages and/or comment "
+                             "styles to use instead of the built-in ones")
+    parser.add_argument('--shards', type=int, default=8, help="shard files for --content-strategy shard")
+    parser.add_argument('--ring-slots', type=int, default=64, help="slots for --content-strategy ring")
+    parser.add_argument('--seed', type=int, help="seed for a reproducible commit plan")
+    parser.add_argument('--plan', metavar='PATH', help="execute a plan saved with --save-plan")
+    parser.add_argument('--planner', choices=PLANNERS, default='random',
+                        help="'random' plans every day from scratch (default); 'deficit' only "
+                             "adds what each day lacks next to your existing commits")
+    parser.add_argument('--save-plan', metavar='PATH', help="write the commit plan to PATH")
+    parser.add_argument('--plan-only', action='store_true',
+                        help="build (and save or print) the plan without creating commits")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="estimate commits, wall time and .git growth for the run "
+                             "without writing anything to the repository")
+    parser.add_argument('--recalibrate', action='store_true',
+                        help="with --dry-run, measure the backend's calibration numbers again")
+    parser.add_argument('--file-rank', choices=RANKINGS, default='index',
+                        help="how to order suggested target files: index order (default), "
+                             "extension preference, smallest first, or most churn first")
+    parser.add_argument('--extensions', default=','.join(CANDIDATE_EXTENSIONS),
+                        help="comma-separated extensions to suggest, in order of preference")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from its journal in the git directory")
+    parser.add_argument('--incremental', action='store_true',
+                        help="add only the days since the last run up to today, with its target "
+                             "file and settings, without asking (for cron); a no-op once up to date")
+    parser.add_argument('--push', action='store_true',
+                        help="push when the run is done without asking (--incremental never asks)")
+    parser.add_argument('--maintenance', choices=POLICIES, default='auto',
+                        help="repack and write commit-graph/bitmaps after the run: 'auto' "
+                             "(default) skips small runs, 'always' or 'never'")
+    parser.add_argument('--large-repo', choices=LARGE_REPO_MODES, default='auto',
+                        help="per-commit git calls that only touch the target path: 'auto' "
+                             f"(default) from {LARGE_REPO_FILES} tracked files, 'on' or 'off'")
+    parser.add_argument('--tune-repo', action='store_true',
+                        help="enable the untracked cache, split index, fsmonitor and sparse "
+                             "index where available instead of only recommending them")
+    parser.add_argument('--push-mode', choices=PUSH_MODES, default='end',
+                        help="'end' pushes once the run is done (default); 'pipelined' pushes "
+                             "finished chunks to the upstream branch while generating")
+    parser.add_argument('--push-chunk', type=push_chunk_size, default='month',
+                        help="chunk size for --push-mode pipelined: 'month' (default) or a "
+                             "number of commits")
+    parser.add_argument('--lock-wait', type=float, default=0, metavar='SECONDS',
+                        help="wait this long for a repository another run has locked "
+                             "(default: fail at once)")
+    add_instrumentation_args(parser)
+    return parser.parse_args(argv)
+
+def creator_labels(repo_path, backend, strategy):
+    """Prometheus labels identifying a creator's run"""
+    return {'script': 'create_commits', 'repo': os.path.basename(os.path.abspath(repo_path)),
+            'backend': backend, 'strategy': strategy}
+
+def top_up(repo_path, args):
+    """Add the days since the last run up to today, with that run's settings, without asking"""
+    try:
+        previous = previous_run(repo_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read the last run from the automation log: {e}")
+        return False
+    if previous is None:
+        print("❌ No previous run to continue (no automation log or ledger run)")
+        return False
+    backend = previous.get('backend', args.backend)
+    strategy = (previous.get('content_strategy') or {}).get('name', 'append')
+    print(f"Repository: {repo_path}")
+    print(f"Target file: {previous.get('target_file')}")
+    print(f"Continuing after {previous.get('date_range', 'Unknown')} ({backend} backend)")
+    print("=" * 50)
+    
+    config = CreateConfig(repo_path, backend=args.backend, template_pack=args.template_pack,
+                          seed=args.seed, planner=args.planner, incremental=True,
+                          push=args.push, push_mode=args.push_mode, push_chunk=args.push_chunk,
+                          maintenance=args.maintenance, large_repo=args.large_repo,
+                          tune_repo=args.tune_repo, lock_wait=args.lock_wait)
+    metrics = Metrics()
+    labels = creator_labels(repo_path, backend, strategy)
+    result = run_instrumented(metrics, args, labels, partial(create, metrics=metrics), config,
+                              progress=print_progress)
+    if result.success and result.commits:
+        print(f"\n🎉 Added {result.commits} commits on {result.days} days")
+    elif not result.success:
+        print("\n❌ Incremental run failed. Please check the errors above.")
+    return result.success
+
+def resume_generation(repo_path, args=None):
+    """Continue the run recorded in the repository's journal, with its original settings"""
+    state = RunJournal(GitExecutor(repo_path).git_dir()).load()
+    if state is None or state['plan'] is None:
+        print("❌ No interrupted run to resume (no journal in the git directory)")
+        return False
+    start = state['start']
+    print(f"Repository: {repo_path}")
+    print(f"Target file: {start['target_file']}")
+    print(f"Resuming run for {start['date_range']} ({start['backend']} backend)")
+    print("=" * 50)
+    
+    config = CreateConfig(repo_path, resume=True, push=True if getattr(args, 'push', False) else None,
+                          push_mode=getattr(args, 'push_mode', 'end'),
+                          push_chunk=getattr(args, 'push_chunk', 'month'),
+                          maintenance=getattr(args, 'maintenance', 'auto'),
+                          large_repo=getattr(args, 'large_repo', 'auto'),
+                          tune_repo=getattr(args, 'tune_repo', False),
+                          lock_wait=getattr(args, 'lock_wait', 0))
+    metrics = Metrics()
+    labels = creator_labels(repo_path, start['backend'], start['content_strategy']['name'])
+    result = run_instrumented(metrics, args, labels, partial(create, metrics=metrics), config,
+                              progress=print_progress, confirm=terminal_confirm)
+    success = result.success
+    if success:
+        print("\n🎉 COMMIT CREATION COMPLETED SUCCESSFULLY!")
+        print(f"📝 To remove these commits later, use the 'remove_commits.py' script.")
+    else:
+        print("\n❌ Could not resume. Please check the errors above.")
+    return success
+
+def dry_run(repo_path, target_file, plan, args):
+    """Print what a run would create and cost, without writing to the repository"""
+    try:
+        pack = load_pack(args.template_pack) if args.template_pack else None
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load template pack {args.template_pack}: {e}")
+        return None
+    calibration = Calibration()
+    calibration.get(args.backend, refresh=args.recalibrate)
+    result = estimate(repo_path, target_file, plan.start_date, plan.end_date,
+                      backend=args.backend, content_strategy=args.content_strategy,
+                      shards=args.shards, ring_slots=args.ring_slots, pack=pack, plan=plan,
+                      calibration=calibration)
+    print(f"\n🔎 Dry run: {plan.start_date.strftime('%Y-%m-%d')} to "
+          f"{plan.end_date.strftime('%Y-%m-%d')}, {args.backend} backend, "
+          f"{args.content_strategy} strategy")
+    for line in describe(result):
+        print(line)
+    print(f"📏 Calibration: {calibration.path} (measured {result['calibration']['measured_at']})")
+    print("Nothing was written to the repository.")
+    return result
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    print("🚀 GitHub Commit Creator")
+    print("=" * 50)
+    
+    # Get repository information
+    extensions = tuple(ext if ext.startswith('.') else f".{ext}"
+                       for ext in args.extensions.split(',') if ext)
+    repo_path, suggested_files = get_repo_info(args.file_rank, extensions,
+                                               read_only=args.dry_run, git_dir=args.git_dir,
+                                               discover=not (args.resume or args.incremental))
+    if repo_path is None:
+        return
+    
+    if args.backend == 'worktree' and not GitExecutor(repo_path).has_worktree():
+        print("🗄  No working tree here: using the fast-import backend")
+        args.backend = 'fast-import'
+    
+    if args.resume:
+        resume_generation(repo_path, args)
+        return
+    if args.incremental:
+        top_up(repo_path, args)
+        return
+    
+    # Get target file
+    target_file = select_target_file(suggested_files)
+    
+    print(f"Repository: {repo_path}")
+    print(f"Target file: {target_file}")
+    print("=" * 50)
+    
+    try:
+        pack = load_pack(args.template_pack) if args.template_pack else None
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load template pack {args.template_pack}: {e}")
+        return
+    
+    if args.plan:
+        plan = CommitPlan.load(args.plan)
+        start_date, end_date = plan.start_date, plan.end_date
+        print(f"📂 Loaded plan: {args.plan}")
+    else:
+        start_date, end_date = select_date_range()
+        # Plan indices must cover the messages and templates the run will draw from
+        generator = ContentGenerator(target_file, pack)
+        plan = build_plan(start_date, end_date, seed=args.seed,
+                          message_count=len(generator.messages),
+                          template_count=len(generator.templates))
+    
+    if args.planner == 'deficit':
+        planned = len(plan)
+        plan, histogram = deficit_plan(GitExecutor(repo_path), plan, read_only=args.dry_run)
+        print(f"📈 {histogram.describe()}; {len(plan)} of {planned} planned commits are missing")
+    
+    if args.save_plan:
+        plan.save(args.save_plan)
+        print(f"💾 Plan saved to: {args.save_plan}")
+    if args.dry_run:
+        dry_run(repo_path, target_file, plan, args)
+        return
+    if args.plan_only:
+        if not args.save_plan:
+            plan.dump_text(sys.stdout)
+        print(f"🗓  Planned {len(plan)} commits on {plan.active_days()} days (nothing written)")
+        return
+    
     print(f"\n📊 Selected period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
-    expected_commits = (end_date - start_date).days * 3  # Rough estimate
-    print(f"Expected commits: ~{expected_commits}")
+    for line in describe(estimate(repo_path, target_file, start_date, end_date, plan=plan)):
+        print(line)
     
     print("\n⚠️  WARNING: This will create many automated commits!")
     print("⚠️  Make sure you have a backup of your repository!")
@@ -386,10 +1077,19 @@ def main():
     
     print("\n🎯 Starting commit generation...")
     
-    creator = GitCommitCreator(repo_path, target_file)
-    success = creator.generate_commits_for_period(start_date, end_date)
+    config = CreateConfig(repo_path, target_file, start_date, end_date, backend=args.backend,
+                          content_strategy=args.content_strategy, shards=args.shards,
+                          ring_slots=args.ring_slots, template_pack=args.template_pack,
+                          plan=plan, push=True if args.push else None,
+                          push_mode=args.push_mode, push_chunk=args.push_chunk,
+                          maintenance=args.maintenance, large_repo=args.large_repo,
+                          tune_repo=args.tune_repo, lock_wait=args.lock_wait)
+    metrics = Metrics()
+    labels = creator_labels(repo_path, args.backend, args.content_strategy)
+    result = run_instrumented(metrics, args, labels, partial(create, metrics=metrics), config,
+                              progress=print_progress, confirm=terminal_confirm)
     
-    if success:
+    if result.success:
         print("\n🎉 COMMIT CREATION COMPLETED SUCCESSFULLY!")
         print("🟢 Your GitHub contribution graph should now show activity for the selected period!")
         print("\n💡 Note: It may take 5-10 minutes for GitHub to update the contribution graph.")
@@ -0,0 +1,392 @@
+"""
+Run estimator
+Sizes a generation run without writing to the repository. The expected commit
+count and its variance come straight from the schedule parameters in
+commit_plan.py; wall time and `.git` growth come from per-backend calibration
+numbers, measured once on a throwaway repository on this machine and cached in
+the user's cache directory.
+"""
+
+import os
+import json
+import math
+import zlib
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+
+from commit_plan import (ACTIVE_DAY_CHANCE, BUSY_DAY_CHANCE, BUSY_DAY_EXTRA, WEEKDAY_COMMITS,
+                         WEEKEND_COMMITS, build_plan, to_wall_seconds)
+from content_generator import ContentGenerator
+from content_strategy import make_strategy
+
+CALIBRATION_VERSION = 1
+CALIBRATION_DAYS = (15, 45)
+CALIBRATION_SEED = 7
+CALIBRATION_TARGET = 'calibration_target.py'
+# Lines sampled to measure the average automation line for a target file
+LINE_SAMPLES = 256
+# Sample of generated lines compressed to estimate loose-object sizes
+COMPRESSION_SAMPLE = 1 << 18
+# Two-sided 95% range around the expected commit count
+SPREAD = 1.96
+
+
+def calibration_path():
+    """Where calibration numbers are cached: $XDG_CACHE_HOME (or ~/.cache)/git_automation"""
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache, 'git_automation', 'calibration.json')
+
+
+def uniform_moments(low, high):
+    """(mean, second moment) of a uniform integer draw from low..high"""
+    values = range(low, high + 1)
+    return (sum(values) / len(values), sum(v * v for v in values) / len(values))
+
+
+def day_moments(weekend):
+    """(mean, variance) of one day's planned commits.
+
+    A day is active with probability p and then gets B commits, plus E more on
+    a busy day (probability q): X = A * (B + Z * E).
+    """
+    p, q = ACTIVE_DAY_CHANCE, BUSY_DAY_CHANCE
+    b_mean, b_square = uniform_moments(*(WEEKEND_COMMITS if weekend else WEEKDAY_COMMITS))
+    e_mean, e_square = uniform_moments(*BUSY_DAY_EXTRA)
+    mean = p * (b_mean + q * e_mean)
+    square = p * (b_square + 2 * q * b_mean * e_mean + q * e_square)
+    return mean, square - mean * mean
+
+
+def commit_moments(start_date, end_date):
+    """(mean, variance, active days) of a range's commit count; days are independent"""
+    first_day = to_wall_seconds(start_date.replace(hour=0, minute=0, second=0,
+                                                   microsecond=0)) // 86400
+    days = (end_date.date() - start_date.date()).days + 1
+    weekend_days = sum(1 for day in range(first_day, first_day + days) if (day + 3) % 7 >= 5)
+    weekday = day_moments(False)
+    weekend = day_moments(True)
+    weekdays = max(0, days - weekend_days)
+    mean = weekdays * weekday[0] + weekend_days * weekend[0]
+    variance = weekdays * weekday[1] + weekend_days * weekend[1]
+    return mean, variance, max(0, days) * ACTIVE_DAY_CHANCE
+
+
+def line_bytes(target_file, pack=None):
+    """Average bytes one commit adds for a target file: the line and its two newlines"""
+    generator = ContentGenerator(target_file, pack, seed=0)
+    lines = [generator.line(number % 8 + 1, '2024-01-01') for number in range(LINE_SAMPLES)]
+    return sum(len(line.encode()) for line in lines) / len(lines) + 2
+
+
+def compression_ratio(target_file, pack=None):
+    """Compressed/raw size of a target file full of automation lines, as git zlibs loose objects"""
+    generator = ContentGenerator(target_file, pack, seed=0)
+    parts = []
+    size = 0
+    number = 0
+    while size < COMPRESSION_SAMPLE:
+        number += 1
+        part = f"\n{generator.line(number % 8 + 1, '2024-01-01')}\n".encode()
+        parts.append(part)
+        size += len(part)
+    sample = b''.join(parts)
+    return len(zlib.compress(sample)) / len(sample)
+
+
+def loose_object_count(repo_path):
+    output = subprocess.run(['git', 'count-objects', '-v'], cwd=repo_path, capture_output=True,
+                            text=True).stdout
+    for line in output.splitlines():
+        if line.startswith('count:'):
+            return int(line.split(':')[1])
+    return 0
+
+
+class BlobModel:
+    """Bytes of target-file content a run hands to git, summed over its commits.
+
+    Every commit stores the whole file it changed, so for `append` the total
+    grows with the square of the commit count; `shard` and `ring` keep each
+    blob bounded.
+    """
+
+    def __init__(self, strategy, target_file, initial_size, line_size, shards=8, ring_slots=64,
+                 pack=None):
+        generator = ContentGenerator(target_file, pack)
+        self.strategy = make_strategy(strategy, target_file, generator.prefix, shards=shards,
+                                      ring_slots=ring_slots, comment_suffix=generator.suffix)
+        if initial_size is None:  # the file would be created with its header
+            initial_size = len(self.strategy.initial_content(target_file))
+        self.initial_size = initial_size
+        self.line_size = line_size
+
+    def total(self, commits, variance=0.0):
+        """Expected blob bytes for `commits` commits (a count with `variance`)"""
+        strategy = self.strategy
+        line = self.line_size
+        if strategy.name == 'append':
+            # sum of (initial + k * line) for k = 1..n, averaged over n
+            return (commits * self.initial_size +
+                    line * (commits * commits + variance + commits) / 2)
+        if strategy.name == 'ring':
+            return commits * (self.initial_size + len(strategy._region_bytes()))
+        header = len(strategy.initial_content(strategy.paths()[0]))
+        shards = strategy.shards
+        cycle = strategy.max_lines
+        total = 0
+        for shard in range(shards):
+            count = int(commits) // shards + (1 if shard < int(commits) % shards else 0)
+            full, rest = divmod(count, cycle)
+            lines = full * cycle * (cycle + 1) // 2 + rest * (rest + 1) // 2
+            total += count * header + lines * line
+        return total
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def environment_key(backend):
+    """What calibration numbers depend on: machine, git, Python and this code's version"""
+    git_version = subprocess.run(['git', '--version'], capture_output=True,
+                                 text=True).stdout.strip()
+    return '|'.join([str(CALIBRATION_VERSION), platform.node(), platform.machine(),
+                     git_version, platform.python_version(), backend])
+
+
+def fit(samples):
+    """Least-squares a, b >= 0 for y = a*x1 + b*x2 over (x1, x2, y) samples"""
+    s11 = sum(x1 * x1 for x1, _, _ in samples)
+    s22 = sum(x2 * x2 for _, x2, _ in samples)
+    s12 = sum(x1 * x2 for x1, x2, _ in samples)
+    s1y = sum(x1 * y for x1, _, y in samples)
+    s2y = sum(x2 * y for _, x2, y in samples)
+    determinant = s11 * s22 - s12 * s12
+    if determinant > 0:
+        a = (s1y * s22 - s2y * s12) / determinant
+        b = (s2y * s11 - s1y * s12) / determinant
+        if a >= 0 and b >= 0:
+            return a, b
+    # A negative term means the samples follow one term alone; keep the better fit
+    candidates = []
+    if s11:
+        a = max(0.0, s1y / s11)
+        candidates.append((sum((y - a * x1) ** 2 for x1, _, y in samples), a, 0.0))
+    if s22:
+        b = max(0.0, s2y / s22)
+        candidates.append((sum((y - b * x2) ** 2 for _, x2, y in samples), 0.0, b))
+    return min(candidates)[1:] if candidates else (0.0, 0.0)
+
+
+def throwaway_repository(path):
+    """A small repository like the ones the benchmarks use: ten files and the target file"""
+    os.makedirs(path)
+    for args in (['init', '-q'], ['config', 'user.name', 'Calibration'],
+                 ['config', 'user.email', 'calibration@example.com']):
+        subprocess.run(['git'] + args, cwd=path, check=True, capture_output=True)
+    os.makedirs(os.path.join(path, 'src'))
+    for number in range(10):
+        with open(os.path.join(path, 'src', f"module_{number}.py"), 'w') as f:
+            f.write(f"VALUE = {number}\n")
+    with open(os.path.join(path, CALIBRATION_TARGET), 'w') as f:
+        f.write("def main():\n    pass\n")
+    subprocess.run(['git', 'add', '-A'], cwd=path, check=True, capture_output=True)
+    subprocess.run(['git', 'commit', '-q', '-m', 'Initial commit'], cwd=path, check=True,
+                   capture_output=True)
+    subprocess.run(['git', 'repack', '-a', '-d', '-q'], cwd=path, check=True,
+                   capture_output=True)
+
+
+def measure(backend, workdir=None):
+    """Run two seeded calibration runs on throwaway repositories; returns the fitted numbers"""
+    from create_commits import GitCommitCreator
+
+    root = tempfile.mkdtemp(prefix='commit-calibrate-', dir=workdir)
+    time_samples = []
+    growth_samples = []
+    loose = False
+    try:
+        for days in CALIBRATION_DAYS:
+            work = os.path.join(root, f"calibrate-{days}")
+            throwaway_repository(work)
+            git_dir = os.path.join(work, '.git')
+            initial_size = os.path.getsize(os.path.join(work, CALIBRATION_TARGET))
+            creator = GitCommitCreator(work, CALIBRATION_TARGET, backend=backend,
+                                       progress=lambda event, message=None, **data: None)
+            start = datetime(2020, 1, 1)
+            end = start + timedelta(days=days - 1)
+            plan = build_plan(start, end, seed=CALIBRATION_SEED, engine='python',
+                              message_count=len(creator.commit_messages),
+                              template_count=len(creator.generator.templates))
+            before = directory_size(git_dir)
+            started = time.perf_counter()
+            success = creator.generate_commits_for_period(start, end, plan=plan, push=False,
+                                                          maintenance='never')
+            seconds = time.perf_counter() - started
+            if not success:
+                raise RuntimeError(f"calibration run failed: {creator.error}")
+            growth = directory_size(git_dir) - before
+            loose = loose or loose_object_count(work) >= creator.total_commits
+            commits = creator.total_commits
+            blobs = BlobModel('append', CALIBRATION_TARGET, initial_size,
+                              line_bytes(CALIBRATION_TARGET)).total(commits)
+            time_samples.append((1, commits, seconds))
+            growth_samples.append((commits, blobs, growth))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    startup, per_commit = fit(time_samples)
+    if loose:
+        # Every commit stores its whole file zlibbed; runs this short cannot show
+        # that growth, so the blobs are costed at the content's compression ratio
+        per_blob_byte = compression_ratio(CALIBRATION_TARGET)
+        per_commit_bytes = max(0.0, sum((growth - per_blob_byte * blobs) / commits
+                                        for commits, blobs, growth in growth_samples) /
+                               len(growth_samples))
+    else:
+        per_commit_bytes, per_blob_byte = fit(growth_samples)
+    return {
+        'backend': backend,
+        'loose_objects': loose,
+        'startup_seconds': startup,
+        'seconds_per_commit': per_commit,
+        'bytes_per_commit': per_commit_bytes,
+        'bytes_per_blob_byte': per_blob_byte,
+        'samples': {'time': time_samples, 'growth': growth_samples},
+        'measured_at': datetime.now().isoformat(),
+    }
+
+
+class Calibration:
+    """Per-backend calibration numbers for this machine, measured on first use and cached"""
+
+    def __init__(self, path=None, say=print):
+        self.path = path or calibration_path()
+        self.say = say
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, backend, refresh=False):
+        key = environment_key(backend)
+        if refresh or key not in self.entries:
+            self.say(f"📏 Calibrating the {backend} backend on a throwaway repository "
+                     f"(once per machine)...")
+            self.entries[key] = measure(backend)
+            self._save()
+        return self.entries[key]
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def target_size(repo_path, target_file):
+    """Current size of the target file, from HEAD's blob when there is no checkout; None if absent"""
+    path = os.path.join(repo_path, target_file)
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    output = subprocess.run(['git', 'cat-file', '-s', f"HEAD:{target_file}"], cwd=repo_path,
+                            capture_output=True, text=True)
+    return int(output.stdout) if output.returncode == 0 else None
+
+
+def estimate(repo_path, target_file, start_date, end_date, backend='worktree',
+             content_strategy='append', shards=8, ring_slots=64, pack=None, plan=None,
+             calibration=None):
+    """Size a run without writing to the repository; returns a dict of estimates.
+
+    'commits' holds the expected count, its standard deviation and a 95%
+    range; with a `plan`, 'planned' is that plan's exact count and the time
+    and growth figures follow it. Without a `calibration`, only the commit
+    figures are filled in.
+    """
+    mean, variance, active_days = commit_moments(start_date, end_date)
+    deviation = math.sqrt(variance)
+    result = {
+        'days': (end_date.date() - start_date.date()).days + 1,
+        'active_days': round(active_days, 1),
+        'commits': {'mean': round(mean, 1), 'stddev': round(deviation, 1),
+                    'low': max(0, math.floor(mean - SPREAD * deviation)),
+                    'high': math.ceil(mean + SPREAD * deviation)},
+        'backend': backend,
+        'content_strategy': content_strategy,
+    }
+    if plan is not None:
+        result['planned'] = len(plan)
+    if calibration is None:
+        return result
+
+    size = target_size(repo_path, target_file)
+    model = BlobModel(content_strategy, target_file, size, line_bytes(target_file, pack),
+                      shards=shards, ring_slots=ring_slots, pack=pack)
+    numbers = calibration.get(backend)
+    per_blob_byte = (compression_ratio(target_file, pack) if numbers['loose_objects']
+                     else numbers['bytes_per_blob_byte'])
+
+    def sized(commits, variance=0.0):
+        seconds = numbers['startup_seconds'] + numbers['seconds_per_commit'] * commits
+        growth = (numbers['bytes_per_commit'] * commits +
+                  per_blob_byte * model.total(commits, variance))
+        return seconds, growth
+
+    if plan is not None:
+        points = {'expected': sized(len(plan))}
+    else:
+        points = {'expected': sized(mean, variance)}
+    points['low'] = sized(result['commits']['low'])
+    points['high'] = sized(result['commits']['high'])
+    result['seconds'] = {name: round(value[0], 1) for name, value in points.items()}
+    result['git_growth_bytes'] = {name: int(value[1]) for name, value in points.items()}
+    result['calibration'] = {key: numbers[key] for key in
+                             ('loose_objects', 'startup_seconds', 'seconds_per_commit',
+                              'bytes_per_commit', 'bytes_per_blob_byte', 'measured_at')}
+    return result
+
+
+def format_bytes(count):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(count) < 1024 or unit == 'GiB':
+            return f"{count:.0f} {unit}" if unit == 'B' else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+def format_seconds(seconds):
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 5400:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def describe(result):
+    """Lines summarising an estimate for the terminal"""
+    commits = result['commits']
+    lines = [f"Expected commits: ~{commits['mean']:.0f} ± {commits['stddev']:.0f} "
+             f"(95%: {commits['low']}-{commits['high']}) on ~{result['active_days']:.0f} "
+             f"of {result['days']} days"]
+    if 'planned' in result:
+        lines.append(f"This plan: {result['planned']} commits")
+    if 'seconds' in result:
+        seconds = result['seconds']
+        growth = result['git_growth_bytes']
+        lines.append(f"Wall time ({result['backend']}): ~{format_seconds(seconds['expected'])} "
+                     f"({format_seconds(seconds['low'])}-{format_seconds(seconds['high'])})")
+        lines.append(f".git growth before maintenance: ~{format_bytes(growth['expected'])} "
+                     f"({format_bytes(growth['low'])}-{format_bytes(growth['high'])})")
+    return lines
@@ -0,0 +1,142 @@
+"""
+Fast-import backend
+Streams a whole commit schedule into a single long-lived `git fast-import` process.
+"""
+
+import subprocess
+import tempfile
+
+from git_plumbing import GitExecutor, format_raw_date
+
+
+def commit_record(branch_ref, mark, author, committer, raw_date, message, path, mode,
+                  content, parent=None):
+    """Serialize one fast-import `commit` command that replaces a single file"""
+    message = message.encode() + b'\n'
+    record = [
+        f"commit {branch_ref}\n".encode(),
+        f"mark :{mark}\n".encode(),
+        f"author {author} {raw_date}\n".encode(),
+        f"committer {committer} {raw_date}\n".encode(),
+        f"data {len(message)}\n".encode(), message,
+    ]
+    if parent:
+        record.append(f"from {parent}\n".encode())
+    record.append(f"M {mode} inline {path}\n".encode())
+    record.append(f"data {len(content)}\n".encode())
+    record.append(content)
+    record.append(b"\n")
+    return b''.join(record)
+
+
+class FastImportBackend:
+    """Commit backend that feeds blobs and commits to one `git fast-import` process.
+
+    File contents are kept in memory by the content strategy, so the working tree
+    and the index are only touched once, after the import has moved the branch ref
+    (and never in a repository without a working tree).
+    """
+
+    def __init__(self, repo_path, strategy, executor=None):
+        self.repo_path = repo_path
+        self.strategy = strategy
+        self.git = executor or GitExecutor(repo_path)
+        self.process = None
+        self.branch_ref = None
+        self.parent = None
+        self.file_modes = {}
+        self.commits_written = 0
+        self._stderr = None
+
+    def start(self):
+        """Resolve branch, parent commit and base content, then launch fast-import"""
+        success, ref = self.git.run(['symbolic-ref', '-q', 'HEAD'], quiet=True)
+        if not success:
+            self.git.say("⚠ fast-import backend needs a checked-out branch (detached HEAD)")
+            return False
+        self.branch_ref = ref.strip()
+
+        self.author = self.git.identity('AUTHOR')
+        self.committer = self.git.identity('COMMITTER')
+        if not self.author or not self.committer:
+            self.git.say("⚠ git user.name/user.email are not configured")
+            return False
+
+        self.parent = self.git.resolve('HEAD^{commit}')
+        if self.parent:
+            success, output = self.git.run(['ls-tree', self.parent, '--'] +
+                                           self.strategy.paths(), quiet=True)
+            for entry in output.splitlines() if success else []:
+                meta, path = entry.split('\t', 1)
+                self.file_modes[path] = meta.split()[0]
+
+        # Start from what is on disk, like the per-commit path does (HEAD's blobs when bare)
+        self.strategy.load(self.git.read_base_file)
+
+        self._stderr = tempfile.TemporaryFile()
+        self.git.metrics.count('subprocesses')
+        try:
+            self.process = subprocess.Popen(
+                ['git', 'fast-import', '--quiet', '--date-format=raw', '--done'],
+                cwd=self.repo_path, stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE, stderr=self._stderr)
+        except OSError as e:
+            self.git.say(f"⚠ Could not start git fast-import: {e}")
+            return False
+        return True
+
+    def add_commit(self, line, message, commit_time):
+        """Apply one line through the content strategy and stream one commit"""
+        path, content = self.strategy.apply(line)
+        self.commits_written += 1
+        record = commit_record(self.branch_ref, self.commits_written, self.author,
+                               self.committer, format_raw_date(commit_time), message, path,
+                               self.file_modes.get(path, '100644'), content,
+                               self.parent if self.commits_written == 1 else None)
+
+        try:
+            self.process.stdin.write(record)
+            return True
+        except (BrokenPipeError, OSError) as e:
+            self.git.say(f"  ✗ git fast-import stopped accepting data: {e}")
+            return False
+
+    def checkpoint(self):
+        """Have fast-import write out its pack and move the branch; returns the tip"""
+        if not self.commits_written:
+            return self.parent
+        try:
+            self.process.stdin.write(f"checkpoint\nget-mark :{self.commits_written}\n".encode())
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.git.say(f"  ✗ git fast-import stopped accepting data: {e}")
+            return None
+        # get-mark is answered on stdout only after the checkpoint has completed
+        return self.process.stdout.readline().decode().strip() or None
+
+    def finish(self):
+        """Close the stream, let fast-import update the ref and sync the checkout"""
+        try:
+            self.process.stdin.write(b"done\n")
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self.process.wait()
+        if returncode != 0:
+            self._stderr.seek(0)
+            self.git.say("✗ git fast-import failed:")
+            self.git.say(self._stderr.read().decode(errors='replace'))
+            return False
+        self._stderr.close()
+
+        if self.commits_written:
+            # The ref moved underneath the checkout: write the final file and
+            # refresh its index entry so `git status` stays clean.
+            self.git.sync_checkout(self.strategy.contents)
+        return True
+
+    def abort(self):
+        """Kill fast-import without updating any ref"""
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
@@ -0,0 +1,170 @@
+"""
+File discovery
+Suggests target files from the git index instead of walking the working tree:
+`git ls-files -z` is streamed and abandoned as soon as enough candidates are
+found, and results are cached against the index and HEAD. A repository
+without a working tree has no index, so HEAD's tree is listed instead.
+"""
+
+import os
+import json
+import subprocess
+from collections import Counter
+
+from git_plumbing import GitExecutor
+
+CANDIDATE_EXTENSIONS = ('.py', '.js', '.java', '.cpp', '.c', '.ts', '.php', '.rb', '.go', '.rs')
+RANKINGS = ('index', 'extension', 'size', 'churn')
+CACHE_FILE = 'automation-candidates.json'
+
+# Ranked modes look at this many candidates before choosing, so a huge
+# index is still never read in full
+SCAN_LIMIT = 2000
+# How far back `churn` counts file changes
+CHURN_COMMITS = 1000
+
+
+def iter_tracked_files(repo_path, chunk_size=1 << 16, tree=None):
+    """Yield tracked paths from `git ls-files -z` (or the files of `tree`) as they arrive.
+
+    Closing the generator early stops git, so callers can take the first few
+    paths of a very large index without waiting for the rest.
+    """
+    command = (['git', 'ls-files', '-z'] if tree is None else
+               ['git', 'ls-tree', '-r', '-z', '--name-only', tree])
+    try:
+        process = subprocess.Popen(command, cwd=repo_path,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return
+    try:
+        pending = b''
+        while True:
+            chunk = process.stdout.read1(chunk_size)
+            if not chunk:
+                break
+            pending += chunk
+            *paths, pending = pending.split(b'\0')
+            for path in paths:
+                yield path.decode('utf-8', 'surrogateescape')
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+
+
+def churn_counts(repo_path, commits=CHURN_COMMITS):
+    """How often each path changed in the last `commits` commits"""
+    result = subprocess.run(['git', 'log', f'-n{commits}', '--format=', '--name-only', '-z'],
+                            cwd=repo_path, capture_output=True)
+    if result.returncode != 0:
+        return Counter()
+    return Counter(path.decode('utf-8', 'surrogateescape').strip('\n')
+                   for path in result.stdout.split(b'\0') if path.strip())
+
+
+class FileDiscovery:
+    """Finds candidate target files for one repository.
+
+    rank='index' keeps git's index order and stops at `limit`; 'extension'
+    prefers earlier entries of `extensions`; 'size' prefers small files (cheap
+    to rewrite); 'churn' prefers files that already change often. A read-only
+    discovery never writes its cache to the git directory.
+    """
+
+    def __init__(self, repo_path, extensions=CANDIDATE_EXTENSIONS, rank='index', limit=20,
+                 executor=None, read_only=False):
+        if rank not in RANKINGS:
+            raise ValueError(f"Unknown ranking '{rank}'")
+        self.repo_path = repo_path
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.rank = rank
+        self.limit = limit
+        self.git = executor or GitExecutor(repo_path)
+        self.read_only = read_only
+
+    def cache_key(self):
+        """Identifies the index state and settings a cached result belongs to"""
+        index_path = os.path.join(self.git.git_dir(), 'index')
+        try:
+            stat = os.stat(index_path)
+            index = [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            index = None
+        success, head = self.git.run(['rev-parse', '-q', '--verify', 'HEAD'], quiet=True)
+        return {
+            'index': index,
+            'head': head.strip() if success else None,
+            'extensions': list(self.extensions),
+            'rank': self.rank,
+            'limit': self.limit,
+        }
+
+    def _load_cache(self, key):
+        try:
+            with open(os.path.join(self.git.git_dir(), CACHE_FILE), 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cached['files'] if cached.get('key') == key else None
+
+    def _save_cache(self, key, files):
+        if self.read_only:
+            return
+        path = os.path.join(self.git.git_dir(), CACHE_FILE)
+        try:
+            with open(path + '.tmp', 'w') as f:
+                json.dump({'key': key, 'files': files}, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass  # the cache is only an optimisation
+
+    def scan(self):
+        """Read the index only as far as the ranking needs"""
+        wanted = self.limit if self.rank == 'index' else SCAN_LIMIT
+        found = []
+        files = iter_tracked_files(self.repo_path,
+                                   tree=None if self.git.has_worktree() else 'HEAD')
+        try:
+            for path in files:
+                if path.lower().endswith(self.extensions):
+                    found.append(path)
+                    if len(found) >= wanted:
+                        break
+        finally:
+            files.close()
+        return found
+
+    def ranked(self, paths):
+        """Order scanned candidates by the configured ranking"""
+        if self.rank == 'extension':
+            def preference(path):
+                ext = os.path.splitext(path)[1].lower()
+                return self.extensions.index(ext) if ext in self.extensions else len(self.extensions)
+            paths = sorted(paths, key=lambda path: (preference(path), path))
+        elif self.rank == 'size':
+            worktree = self.git.has_worktree()
+
+            def size(path):
+                if not worktree:
+                    info = self.git.object_info(f"HEAD:{path}")
+                    return info[2] if info else float('inf')
+                try:
+                    return os.path.getsize(os.path.join(self.repo_path, path))
+                except OSError:
+                    return float('inf')
+            paths = sorted(paths, key=lambda path: (size(path), path))
+        elif self.rank == 'churn':
+            counts = churn_counts(self.repo_path)
+            paths = sorted(paths, key=lambda path: (-counts.get(path, 0), path))
+        return paths[:self.limit]
+
+    def candidates(self):
+        """Candidate target files, from the cache when the index and HEAD are unchanged"""
+        key = self.cache_key()
+        files = self._load_cache(key)
+        if files is None:
+            files = self.ranked(self.scan())
+            self._save_cache(key, files)
+        return files
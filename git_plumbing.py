@@ -0,0 +1,388 @@
+"""
+Git plumbing executor
+Shared process layer for the automation scripts: argv-only git calls plus
+long-lived batch workers, so building commits never touches the index.
+Repositories without a working tree (bare mirrors, or a `--git-dir`) are run
+from the git directory itself, and only their objects and refs are written.
+"""
+
+import os
+import subprocess
+import time
+import tempfile
+from datetime import datetime
+
+from instrumentation import Metrics
+
+NULL_SHA = '0' * 40
+
+
+def format_raw_date(commit_time):
+    """Format a naive local datetime as a git raw date ('<epoch> <+hhmm>')"""
+    timestamp = int(time.mktime(commit_time.timetuple()))
+    offset = int((datetime.fromtimestamp(timestamp) -
+                  datetime.utcfromtimestamp(timestamp)).total_seconds())
+    sign = '+' if offset >= 0 else '-'
+    offset = abs(offset)
+    return f"{timestamp} {sign}{offset // 3600:02d}{(offset % 3600) // 60:02d}"
+
+
+def commit_object(tree, parents, author, committer, message):
+    """Serialize a commit body byte-for-byte the way `git commit-tree` does"""
+    lines = [f"tree {tree}"]
+    lines.extend(f"parent {parent}" for parent in parents)
+    lines.append(f"author {author}")
+    lines.append(f"committer {committer}")
+    if not message.endswith('\n'):
+        message += '\n'
+    return ('\n'.join(lines) + '\n\n' + message).encode()
+
+
+def repository_at(path):
+    """The directory to run git in for the repository at `path`, or None.
+
+    `path` must be a working tree's top level, a bare repository or a git
+    directory; a plain directory inside some other repository does not count.
+    """
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        return None
+    git = GitExecutor(path)
+    if not git.is_repository():
+        return None
+    if os.path.realpath(git.git_dir()) == os.path.realpath(path):
+        return path
+    success, output = git.run(['rev-parse', '--show-toplevel'], quiet=True)
+    if success and os.path.realpath(output.strip()) == os.path.realpath(path):
+        return path
+    return None
+
+
+class BatchWorker:
+    """A git process that answers one output line per request line"""
+
+    def __init__(self, repo_path, args):
+        self.args = args
+        self.process = subprocess.Popen(['git'] + args, cwd=repo_path,
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE)
+
+    def request(self, payload):
+        """Send a request and return the response line (without newline)"""
+        self.process.stdin.write(payload)
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            error = self.process.stderr.read().decode(errors='replace')
+            raise RuntimeError(f"git {' '.join(self.args)} exited: {error.strip()}")
+        return line.rstrip(b'\n').decode()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+class GitExecutor:
+    """Runs git commands for one repository without a shell.
+
+    One-off commands go through `run`; object lookups and writes are served by
+    persistent `cat-file`, `hash-object` and `mktree` workers started on first use.
+    Every process started is counted, and one-off commands are timed per
+    subcommand, in `metrics`.
+    """
+
+    def __init__(self, repo_path, metrics=None):
+        self.repo_path = repo_path
+        self.metrics = metrics or Metrics()
+        self._workers = {}
+        self._dated_env = None
+        self._git_dir = None
+        self._worktree = None
+        self._scratch = None
+        # Where progress and error lines go; the scripts' library API redirects it
+        self.say = print
+
+    def run(self, args, date_str=None, quiet=False):
+        """Run `git <args>`; returns (success, output) like run_git_command"""
+        env = None
+        if date_str:
+            # Reuse one environment for every dated commit instead of copying os.environ
+            if self._dated_env is None:
+                self._dated_env = os.environ.copy()
+            self._dated_env['GIT_AUTHOR_DATE'] = date_str
+            self._dated_env['GIT_COMMITTER_DATE'] = date_str
+            env = self._dated_env
+        command = ' '.join(['git'] + list(args))
+        self.metrics.count('subprocesses')
+        try:
+            with self.metrics.timer(f"git {args[0]}"):
+                result = subprocess.run(['git'] + list(args), cwd=self.repo_path,
+                                        capture_output=True, text=True, env=env)
+            if result.returncode != 0:
+                if not quiet:
+                    self.say(f"Error running command: {command}")
+                    self.say(f"Error: {result.stderr}")
+                return False, result.stderr
+            return True, result.stdout
+        except Exception as e:
+            self.say(f"Exception running command {command}: {e}")
+            return False, str(e)
+
+    def git_dir(self):
+        """Absolute path of the repository's git directory"""
+        if self._git_dir is None:
+            success, output = self.run(['rev-parse', '--absolute-git-dir'], quiet=True)
+            self._git_dir = output.strip() if success else os.path.join(self.repo_path, '.git')
+        return self._git_dir
+
+    def is_repository(self):
+        """Cheap 'are we in a repository' probe; unlike `git status` it never scans the worktree"""
+        success, output = self.run(['rev-parse', '--absolute-git-dir'], quiet=True)
+        if success:
+            self._git_dir = output.strip()
+        return success
+
+    def has_worktree(self):
+        """Whether git runs inside a working tree here (False for a bare repository or git dir)"""
+        if self._worktree is None:
+            success, output = self.run(['rev-parse', '--is-inside-work-tree'], quiet=True)
+            self._worktree = success and output.strip() == 'true'
+        return self._worktree
+
+    def _worker(self, *args):
+        worker = self._workers.get(args)
+        if worker is None or worker.process.poll() is not None:
+            worker = BatchWorker(self.repo_path, list(args))
+            self.metrics.count('subprocesses')
+            self._workers[args] = worker
+        return worker
+
+    def object_info(self, rev):
+        """Return (sha, type, size) for a revision, or None if it does not exist"""
+        response = self._worker('cat-file', '--batch-check').request(f"{rev}\n".encode())
+        parts = response.split()
+        if len(parts) != 3:
+            return None
+        return parts[0], parts[1], int(parts[2])
+
+    def resolve(self, rev):
+        """Resolve a revision to an object name without spawning a process"""
+        info = self.object_info(rev)
+        return info[0] if info else None
+
+    def _write_object(self, data, object_type):
+        if self._scratch is None:
+            fd, self._scratch = tempfile.mkstemp(prefix='automation-', dir=self.git_dir())
+            os.close(fd)
+        with open(self._scratch, 'wb') as f:
+            f.write(data)
+        worker = self._worker('hash-object', '-w', '--no-filters', '-t', object_type,
+                              '--stdin-paths')
+        return worker.request(f"{self._scratch}\n".encode())
+
+    def hash_blob(self, data):
+        """Write a blob and return its name"""
+        return self._write_object(data, 'blob')
+
+    def mktree(self, entries):
+        """Write a tree from (mode, type, sha, name) entries and return its name"""
+        listing = ''.join(f"{mode} {kind} {sha}\t{name}\n" for mode, kind, sha, name in entries)
+        return self._worker('mktree', '--batch').request(f"{listing}\n".encode())
+
+    def ls_tree(self, treeish):
+        """Return the (mode, type, sha, name) entries of a tree, or [] if missing"""
+        success, output = self.run(['ls-tree', '-z', treeish], quiet=True)
+        if not success:
+            return []
+        entries = []
+        for record in output.split('\0'):
+            if record:
+                meta, name = record.split('\t', 1)
+                mode, kind, sha = meta.split()
+                entries.append((mode, kind, sha, name))
+        return entries
+
+    def commit_tree(self, tree, parents, author, committer, message):
+        """Write a commit object exactly as `git commit-tree` would and return its name"""
+        return self._write_object(commit_object(tree, parents, author, committer, message),
+                                  'commit')
+
+    def update_ref(self, ref, new_value, old_value=None, reason='commit automation'):
+        """Move a ref, refusing if it no longer points at old_value"""
+        args = ['update-ref', '-m', reason, ref, new_value]
+        if old_value:
+            args.append(old_value)
+        return self.run(args)[0]
+
+    def identity(self, kind='AUTHOR'):
+        """Return the 'Name <email>' part of git's configured author/committer ident"""
+        success, output = self.run(['var', f'GIT_{kind}_IDENT'], quiet=True)
+        if not success:
+            return None
+        ident = output.strip()
+        return ident[:ident.rfind('>') + 1]
+
+    def read_blob(self, commit, path):
+        """Return a file's bytes as of a commit, or None if it is not there"""
+        self.metrics.count('subprocesses')
+        result = subprocess.run(['git', 'cat-file', 'blob', f"{commit}:{path}"],
+                                cwd=self.repo_path, capture_output=True)
+        return result.stdout if result.returncode == 0 else None
+
+    def read_worktree_file(self, path):
+        """Return a checked-out file's bytes, or None if it does not exist"""
+        file_path = os.path.join(self.repo_path, path)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def read_base_file(self, path):
+        """Return the bytes a run starts from: the checked-out file, or HEAD's blob without a worktree"""
+        if self.has_worktree():
+            return self.read_worktree_file(path)
+        return self.read_blob('HEAD', path)
+
+    def move_head(self, commit, old_value=None, reason='commit automation'):
+        """Point HEAD's branch (or a detached HEAD) at a commit without touching index or worktree"""
+        success, ref = self.run(['symbolic-ref', '-q', 'HEAD'], quiet=True)
+        return self.update_ref(ref.strip() if success else 'HEAD', commit, old_value, reason)
+
+    def sync_checkout(self, contents):
+        """Write the final files and refresh their index entries after a ref move.
+
+        Without a working tree there is nothing to bring in line, so nothing is written.
+        """
+        if not self.has_worktree():
+            return
+        for path, content in contents.items():
+            file_path = os.path.join(self.repo_path, path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.write(content)
+        self.run(['reset', '-q', '--'] + sorted(contents), quiet=True)
+
+    def close(self):
+        """Stop all batch workers"""
+        for worker in self._workers.values():
+            worker.close()
+        self._workers = {}
+        if self._scratch and os.path.exists(self._scratch):
+            os.remove(self._scratch)
+        self._scratch = None
+
+
+class PlumbingBackend:
+    """Commit backend that writes blobs, trees and commits through batch workers.
+
+    Nothing is written to the index or working tree per commit; the branch moves
+    with one `update-ref` when the run finishes. All paths written by the content
+    strategy live in the target file's directory.
+    """
+
+    name = 'plumbing'
+
+    def __init__(self, repo_path, strategy, executor=None):
+        self.repo_path = repo_path
+        self.strategy = strategy
+        self.git = executor or GitExecutor(repo_path)
+        self.branch_ref = None
+        self.start_commit = None
+        self.tip = None
+        self.ref_value = None
+        self.commits_written = 0
+        self._dirs = strategy.target_file.split('/')[:-1]
+        self._trees = []
+        self._modes = {}
+
+    def start(self):
+        """Resolve branch, parent commit and the trees along the target path"""
+        success, ref = self.git.run(['symbolic-ref', '-q', 'HEAD'], quiet=True)
+        if not success:
+            self.git.say(f"⚠ {self.name} backend needs a checked-out branch (detached HEAD)")
+            return False
+        self.branch_ref = ref.strip()
+
+        self.author = self.git.identity('AUTHOR')
+        self.committer = self.git.identity('COMMITTER')
+        if not self.author or not self.committer:
+            self.git.say("⚠ git user.name/user.email are not configured")
+            return False
+
+        self.start_commit = self.git.resolve('HEAD^{commit}')
+        self.tip = self.start_commit
+        self.ref_value = self.start_commit
+
+        # Cache the listing of every directory between the root and the target file
+        for depth in range(len(self._dirs) + 1):
+            prefix = '/'.join(self._dirs[:depth])
+            entries = []
+            if self.start_commit:
+                entries = self.git.ls_tree(f"{self.start_commit}:{prefix}")
+            self._trees.append(entries)
+        self._modes = {name: mode for mode, kind, sha, name in self._trees[-1]}
+
+        # Start from what is on disk, like the per-commit path does (HEAD's blobs when bare)
+        self.strategy.load(self.git.read_base_file)
+        return True
+
+    def write_blob(self, data, path):
+        """Store a blob and return its name"""
+        return self.git.hash_blob(data)
+
+    def write_tree(self, entries):
+        """Store a tree and return its name"""
+        return self.git.mktree(entries)
+
+    def write_commit(self, tree, parents, author, committer, message):
+        """Store a commit and return its name"""
+        return self.git.commit_tree(tree, parents, author, committer, message)
+
+    def _replace(self, depth, entry):
+        entries = [e for e in self._trees[depth] if e[3] != entry[3]]
+        entries.append(entry)
+        self._trees[depth] = entries
+        return self.write_tree(entries)
+
+    def add_commit(self, line, message, commit_time):
+        """Apply one line through the content strategy and write one commit"""
+        path, content = self.strategy.apply(line)
+        raw_date = format_raw_date(commit_time)
+        try:
+            name = path.split('/')[-1]
+            sha = self.write_blob(content, path)
+            entry = (self._modes.get(name, '100644'), 'blob', sha, name)
+            for depth in range(len(self._dirs), -1, -1):
+                sha = self._replace(depth, entry)
+                if depth:
+                    entry = ('040000', 'tree', sha, self._dirs[depth - 1])
+            parents = [self.tip] if self.tip else []
+            self.tip = self.write_commit(sha, parents, f"{self.author} {raw_date}",
+                                         f"{self.committer} {raw_date}", message)
+            self.commits_written += 1
+            return True
+        except (RuntimeError, OSError) as e:
+            self.git.say(f"  ✗ Failed to write commit objects: {e}")
+            return False
+
+    def checkpoint(self):
+        """Move the branch to the current tip so the work so far survives an interruption"""
+        if self.tip != self.ref_value:
+            if not self.git.update_ref(self.branch_ref, self.tip, self.ref_value or NULL_SHA):
+                return None
+            self.ref_value = self.tip
+        return self.tip
+
+    def finish(self):
+        """Move the branch once and bring the checkout (if any) in line with it"""
+        if not self.commits_written:
+            return True
+        if self.checkpoint() is None:
+            return False
+        self.git.sync_checkout(self.strategy.contents)
+        return True
+
+    def abort(self):
+        """Drop the run; the written objects stay unreachable until gc"""
+        self.commits_written = 0
@@ -0,0 +1,261 @@
+"""
+History rewrite
+Removes automation commits from the middle of a branch while keeping every
+other commit: `git fast-export` of the affected range is filtered in a single
+streaming pass and replayed through `git fast-import`, original dates intact.
+"""
+
+import subprocess
+import tempfile
+
+from git_plumbing import GitExecutor
+from markers import COMMIT_MESSAGES
+
+REWRITE_REF = 'refs/automation/rewrite'
+BACKUP_REF = 'refs/automation/pre-rewrite'
+MATCHES = ('auto', 'ledger', 'signature', 'either')
+
+# fast-export writes blob names instead of contents (--no-data), so the stream
+# carries commit headers only and fast-import reuses the existing blobs
+EXPORT_ARGS = ['fast-export', '--no-data', '--show-original-ids', '--reference-excluded-parents',
+               '--use-done-feature', '--signed-tags=strip', '--tag-of-filtered-object=drop']
+
+
+def unquote_path(path):
+    """Decode a path as fast-export writes it (C-style quoted when unusual)"""
+    if not path.startswith(b'"'):
+        return path.decode('utf-8', 'surrogateescape')
+    escapes = {b'n': b'\n', b't': b'\t', b'"': b'"', b'\\': b'\\', b'a': b'\a',
+               b'b': b'\b', b'f': b'\f', b'r': b'\r', b'v': b'\v'}
+    out = bytearray()
+    body = path[1:-1]
+    i = 0
+    while i < len(body):
+        if body[i:i + 1] == b'\\':
+            if body[i + 1:i + 2].isdigit():
+                out.append(int(body[i + 1:i + 4], 8))
+                i += 4
+            else:
+                out += escapes.get(body[i + 1:i + 2], body[i + 1:i + 2])
+                i += 2
+        else:
+            out.append(body[i])
+            i += 1
+    return bytes(out).decode('utf-8', 'surrogateescape')
+
+
+class ExportedCommit:
+    """One `commit` command of a fast-export stream"""
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.mark = None
+        self.original = None
+        self.headers = []       # author, committer, encoding lines
+        self.message = b''
+        self.parent = None      # the `from` dataref, when given
+        self.merges = []
+        self.changes = []
+
+    def paths(self):
+        """Paths of M lines, or None if the commit does anything else"""
+        paths = []
+        for change in self.changes:
+            if not change.startswith(b'M '):
+                return None
+            paths.append(unquote_path(change.rstrip(b'\n').split(b' ', 3)[3]))
+        return paths
+
+
+class HistoryRewriter:
+    """Drops automation commits from `base..<branch>` and replays the rest.
+
+    A commit is automation if its name is in `automated` (ledger hashes), or
+    if it has the creator's signature: a single parent, only M changes to
+    `paths`, and one of the creator's commit messages. match='auto' uses the
+    hashes when there are any and the signature otherwise.
+    """
+
+    def __init__(self, repo_path, automated=(), paths=(), messages=COMMIT_MESSAGES,
+                 match='auto', executor=None):
+        if match not in MATCHES:
+            raise ValueError(f"Unknown match '{match}'")
+        if match == 'auto':
+            match = 'ledger' if automated else 'signature'
+        self.repo_path = repo_path
+        self.automated = set(automated)
+        self.paths = set(paths)
+        self.messages = {message.encode() for message in messages}
+        self.match = match
+        self.git = executor or GitExecutor(repo_path)
+        self.kept = 0
+        self.dropped = 0
+        self.touched = 0        # kept commits that change automation paths after a drop
+        self._replaced = {}
+        self._tips = {}
+
+    def is_automation(self, commit):
+        if self.match in ('ledger', 'either') and commit.original in self.automated:
+            return True
+        if self.match in ('signature', 'either'):
+            paths = commit.paths()
+            return bool(paths and not commit.merges and self.paths.issuperset(paths) and
+                        commit.message.strip() in self.messages)
+        return False
+
+    def _map(self, dataref):
+        """Where a parent points once dropped commits are skipped; None for no parent"""
+        while dataref in self._replaced:
+            dataref = self._replaced[dataref]
+        return dataref
+
+    # Stream parsing -----------------------------------------------------
+
+    def _read_commit(self, stream, ref):
+        commit = ExportedCommit(ref)
+        for line in iter(stream.readline, b''):
+            if line == b'\n':
+                break
+            if line.startswith(b'mark '):
+                commit.mark = line[5:-1]
+            elif line.startswith(b'original-oid '):
+                commit.original = line[13:-1].decode()
+            elif line.startswith(b'data '):
+                commit.message = stream.read(int(line[5:]))
+            elif line.startswith(b'from '):
+                commit.parent = line[5:-1]
+            elif line.startswith(b'merge '):
+                commit.merges.append(line[6:-1])
+            elif line.startswith((b'author ', b'committer ', b'encoding ')):
+                commit.headers.append(line)
+            else:
+                commit.changes.append(line)
+        if commit.parent is None:
+            # fast-export leaves out `from` when the parent is the ref's previous commit
+            commit.parent = self._tips.get(ref)
+        return commit
+
+    def _write_commit(self, out, commit):
+        parent = self._map(commit.parent)
+        merges = []
+        for merge in commit.merges:
+            merge = self._map(merge)
+            if merge is not None and merge != parent and merge not in merges:
+                merges.append(merge)
+        if parent is None:
+            # Without `from`, fast-import would continue from the ref's last commit
+            out.write(b'reset ' + REWRITE_REF.encode() + b'\n\n')
+        out.write(b'commit ' + REWRITE_REF.encode() + b'\nmark ' + commit.mark + b'\n')
+        if commit.original:
+            out.write(b'original-oid ' + commit.original.encode() + b'\n')
+        out.writelines(commit.headers)
+        out.write(b'data %d\n' % len(commit.message) + commit.message)
+        if parent is not None:
+            out.write(b'from ' + parent + b'\n')
+        out.writelines(b'merge ' + merge + b'\n' for merge in merges)
+        out.writelines(commit.changes)
+        out.write(b'\n')
+
+    def filter(self, stream, out, branch_ref):
+        """Copy a fast-export stream to `out`, leaving out automation commits.
+
+        Returns the dataref the branch ends at once they are gone.
+        """
+        branch = branch_ref.encode()
+        line = stream.readline()
+        while line:
+            following = None
+            if line.startswith(b'commit '):
+                ref = line[7:-1]
+                commit = self._read_commit(stream, ref)
+                if self.is_automation(commit):
+                    self._replaced[commit.mark] = self._map(commit.parent)
+                    self.dropped += 1
+                else:
+                    if self.dropped and self.paths.intersection(commit.paths() or ()):
+                        self.touched += 1
+                    self._write_commit(out, commit)
+                    self.kept += 1
+                self._tips[ref] = commit.mark
+            elif line.startswith(b'reset '):
+                ref = line[6:-1]
+                self._tips[ref] = None
+                # `from` is optional; without it the next command follows directly
+                following = stream.readline()
+                if following.startswith(b'from '):
+                    self._tips[ref] = following[5:-1]
+                    following = None
+            elif line == b'done\n':
+                break
+            elif line.startswith(b'feature ') or line == b'\n':
+                out.write(line)
+            else:
+                raise RuntimeError(f"unexpected fast-export command: {line[:40]!r}")
+            line = following if following is not None else stream.readline()
+        return self._map(self._tips.get(branch))
+
+    # Running ------------------------------------------------------------
+
+    def rewrite(self, branch_ref, base=None):
+        """Rewrite `base..branch_ref` into REWRITE_REF; returns (success, new_tip or error)"""
+        self.git.run(['update-ref', '-d', REWRITE_REF], quiet=True)
+        export_args = EXPORT_ARGS + [branch_ref] + ([f'^{base}'] if base else [])
+        with tempfile.TemporaryFile() as export_err, tempfile.TemporaryFile() as import_err:
+            exporter = subprocess.Popen(['git'] + export_args, cwd=self.repo_path,
+                                        stdout=subprocess.PIPE, stderr=export_err)
+            importer = subprocess.Popen(['git', 'fast-import', '--quiet', '--done'],
+                                        cwd=self.repo_path, stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=import_err)
+            try:
+                tip = self.filter(exporter.stdout, importer.stdin, branch_ref)
+                if tip is None:
+                    raise RuntimeError("every commit on the branch would be dropped")
+                importer.stdin.write(b'reset ' + REWRITE_REF.encode() + b'\nfrom ' + tip +
+                                     b'\n\ndone\n')
+                importer.stdin.close()
+            except BaseException as e:
+                # A stream without `done` never touches a ref
+                for process in (exporter, importer):
+                    process.kill()
+                    process.wait()
+                if isinstance(e, (RuntimeError, ValueError, BrokenPipeError)):
+                    return False, str(e)
+                raise
+            exported = exporter.wait()
+            imported = importer.wait()
+            if exported != 0 or imported != 0:
+                failed, err = ((export_err, 'fast-export') if exported != 0
+                               else (import_err, 'fast-import'))
+                err.seek(0)
+                return False, f"git {failed} failed: " + err.read().decode(errors='replace').strip()
+        success, output = self.git.run(['rev-parse', '--verify', REWRITE_REF], quiet=True)
+        self.git.run(['update-ref', '-d', REWRITE_REF], quiet=True)
+        return (True, output.strip()) if success else (False, output)
+
+    def apply(self, branch_ref, base=None):
+        """Rewrite the checked-out branch and move it, the index and the worktree.
+
+        The old tip is kept in BACKUP_REF. Local changes survive unless they
+        touch a file the rewrite changes, in which case nothing is moved.
+        Without a working tree only the refs move. Returns (success, message).
+        """
+        success, old_tip = self.git.run(['rev-parse', '--verify', branch_ref], quiet=True)
+        if not success:
+            return False, f"cannot resolve {branch_ref}"
+        old_tip = old_tip.strip()
+        success, new_tip = self.rewrite(branch_ref, base)
+        if not success:
+            return False, new_tip
+        if self.dropped == 0:
+            return True, old_tip
+        worktree = self.git.has_worktree()
+        if worktree:
+            success, output = self.git.run(['read-tree', '-m', '-u', old_tip, new_tip], quiet=True)
+            if not success:
+                return False, f"local changes conflict with the rewrite: {output.strip()}"
+        self.git.update_ref(BACKUP_REF, old_tip, reason='automation rewrite backup')
+        if not self.git.update_ref(branch_ref, new_tip, old_tip, reason='automation rewrite'):
+            if worktree:
+                self.git.run(['read-tree', '-m', '-u', new_tip, old_tip], quiet=True)
+            return False, f"{branch_ref} moved during the rewrite"
+        return True, new_tip
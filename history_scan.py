@@ -0,0 +1,215 @@
+"""
+History scanner
+Rebuilds automation metadata from the branch itself when the automation log is
+gone or describes a later run: one streamed `git log -z --name-only` pass finds
+runs of creator-shaped commits (a creator message, one parent, one changed
+file), confirms each run by the marker lines in its final file, and records it
+in the automation ledger. Commit names are spooled to a temporary file, so
+memory stays flat however long the history is.
+"""
+
+import re
+import struct
+import subprocess
+import tempfile
+from datetime import datetime
+
+from content_strategy import RING_PATTERN
+from markers import COMMIT_MESSAGES, LINE_PATTERN
+
+LOG_FORMAT = '%x1e%H %P%x1f%at%x1f%s'
+READ_SIZE = 1 << 20
+# Spool record: binary commit name and author timestamp
+SPOOL_RECORD = struct.Struct('<20sq')
+SPOOL_BLOCK = 4096
+# Runs are dated forwards; an older commit dated this much later starts another run
+RUN_GAP = 86400
+SHARD_PATH = re.compile(r'^(.*)\.shard\d+(\.[^./]*)?$')
+
+
+def target_of(path):
+    """The target file a (possibly shard) path belongs to"""
+    match = SHARD_PATH.match(path)
+    return match.group(1) + (match.group(2) or '') if match else path
+
+
+class HistoryScanner:
+    """Finds automation runs on a branch's first-parent history.
+
+    `scan()` returns log data for each run (oldest first) in the shape the
+    remover reads from the automation log, with 'source': 'history-scan';
+    `commits(run)` then yields the run's [sha, timestamp] pairs, oldest first.
+    """
+
+    def __init__(self, git, messages=COMMIT_MESSAGES, pattern=LINE_PATTERN):
+        self.git = git
+        self.messages = set(messages)
+        self.pattern = pattern
+        self.scanned = 0
+        self._spool = None
+
+    # Streaming ----------------------------------------------------------
+
+    def _log(self, rev):
+        """Yield (sha, parents, timestamp, subject, paths) per commit, newest first"""
+        self.git.metrics.count('subprocesses')
+        process = subprocess.Popen(['git', 'log', '--first-parent', '--no-renames', '-z',
+                                    '--name-only', f'--format={LOG_FORMAT}', rev, '--'],
+                                   cwd=self.git.repo_path, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        commit = None
+        carry = b''
+        try:
+            for chunk in iter(lambda: process.stdout.read(READ_SIZE), b''):
+                fields = (carry + chunk).split(b'\0')
+                carry = fields.pop()
+                for field in fields:
+                    if field.startswith(b'\x1e'):
+                        if commit:
+                            yield commit
+                        names, timestamp, subject = field[1:].split(b'\x1f', 2)
+                        names = names.decode().split()
+                        commit = (names[0], names[1:], int(timestamp),
+                                  subject.decode('utf-8', 'replace'), [])
+                    elif commit and field:
+                        commit[4].append(field.lstrip(b'\n').decode('utf-8', 'surrogateescape'))
+            if commit:
+                yield commit
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def _has_markers(self, commit, path):
+        """Whether a file holds automation lines (or a ring region) at a commit, streamed"""
+        self.git.metrics.count('subprocesses')
+        process = subprocess.Popen(['git', 'cat-file', 'blob', f"{commit}:{path}"],
+                                   cwd=self.git.repo_path, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        found = None
+        carry = b''
+        try:
+            for chunk in iter(lambda: process.stdout.read(READ_SIZE), b''):
+                data = carry + chunk
+                cut = data.rfind(b'\n') + 1
+                # A ring region is added at the end of the file, so keep reading for one
+                if RING_PATTERN.search(data[:cut]):
+                    return 'ring'
+                if found is None and self.pattern.search(data[:cut]):
+                    found = 'lines'
+                carry = data[cut:]
+            if RING_PATTERN.search(carry):
+                return 'ring'
+            if found is None and self.pattern.search(carry):
+                found = 'lines'
+            return found
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    # Runs ---------------------------------------------------------------
+
+    def _is_automation(self, parents, subject, paths):
+        return len(parents) <= 1 and len(paths) == 1 and subject in self.messages
+
+    def _close(self, run):
+        """Confirm a finished run by its final file and turn it into log data"""
+        newest_path = run['newest_path']
+        found = self._has_markers(run['end_commit'], newest_path)
+        if not found:
+            return None
+        paths = sorted(run['paths'])
+        start = run['start_commit']
+        created = [path for path in paths
+                   if not start or self.git.object_info(f"{start}:{path}") is None]
+        if any(SHARD_PATH.match(path) for path in paths):
+            strategy = 'shard'
+        else:
+            strategy = 'ring' if found == 'ring' else 'append'
+        first = datetime.fromtimestamp(run['first_timestamp']).strftime('%Y-%m-%d')
+        last = datetime.fromtimestamp(run['last_timestamp']).strftime('%Y-%m-%d')
+        return {
+            'start_commit': start,
+            'end_commit': run['end_commit'],
+            'total_commits': run['count'],
+            'date_range': f"{first} to {last}",
+            'created_at': datetime.now().isoformat(),
+            'target_file': run['target'],
+            'content_strategy': {'name': strategy, 'paths': paths, 'created_files': created},
+            'source': 'history-scan',
+            'spool': [run['spool_start'], run['spool_end']],
+        }
+
+    def scan(self, rev='HEAD'):
+        """Stream the history once; returns the automation runs found, oldest first"""
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile(dir=self.git.git_dir())
+        spool = self._spool
+        spool.seek(0)
+        spool.truncate()
+        runs = []
+        run = None
+        position = 0
+        with self.git.metrics.timer('history_scan'):
+            for sha, parents, timestamp, subject, paths in self._log(rev):
+                self.scanned += 1
+                automation = self._is_automation(parents, subject, paths)
+                target = target_of(paths[0]) if automation else None
+                if run and (not automation or target != run['target'] or
+                            timestamp > run['first_timestamp'] + RUN_GAP):
+                    closed = self._close(run)
+                    if closed:
+                        runs.append(closed)
+                    run = None
+                if not automation:
+                    continue
+                if run is None:
+                    run = {'target': target, 'end_commit': sha, 'newest_path': paths[0],
+                           'paths': set(), 'count': 0, 'last_timestamp': timestamp,
+                           'first_timestamp': timestamp, 'spool_start': position}
+                run['paths'].add(paths[0])
+                run['count'] += 1
+                run['first_timestamp'] = min(run['first_timestamp'], timestamp)
+                run['last_timestamp'] = max(run['last_timestamp'], timestamp)
+                run['start_commit'] = parents[0] if parents else None
+                spool.write(SPOOL_RECORD.pack(bytes.fromhex(sha), timestamp))
+                position += 1
+                run['spool_end'] = position
+            if run:
+                closed = self._close(run)
+                if closed:
+                    runs.append(closed)
+        self.git.metrics.count('commits_scanned', self.scanned)
+        spool.flush()
+        runs.reverse()
+        return runs
+
+    def commits(self, run):
+        """[sha, timestamp] pairs of a scanned run, oldest first, read back from the spool"""
+        start, end = run['spool']
+        spool = self._spool
+        while end > start:
+            count = min(SPOOL_BLOCK, end - start)
+            end -= count
+            spool.seek(end * SPOOL_RECORD.size)
+            block = spool.read(count * SPOOL_RECORD.size)
+            for offset in range((count - 1) * SPOOL_RECORD.size, -1, -SPOOL_RECORD.size):
+                sha, timestamp = SPOOL_RECORD.unpack_from(block, offset)
+                yield [sha.hex(), timestamp]
+
+    def record(self, ledger, runs):
+        """Add scanned runs the ledger does not know yet; returns their run ids"""
+        known = {run.get('end_commit') for run in ledger.runs()}
+        run_id = ledger.next_run_id()
+        added = []
+        for run in runs:
+            if run['end_commit'] in known:
+                continue
+            log_data = {key: value for key, value in run.items() if key != 'spool'}
+            added.append(ledger.add_run(log_data, self.commits(run), run_id))
+            run_id += 1
+        return added
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
@@ -0,0 +1,231 @@
+"""
+Instrumentation
+Monotonic phase timers, counters and latency histograms for one run, exported
+as a JSON summary or a Prometheus textfile, plus an optional cProfile wrapper.
+"""
+
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import contextlib
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+
+METRIC_PREFIX = 'commit_automation'
+# Upper bounds in seconds: fast-import commits take microseconds, worktree commits seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds values up to buckets[i], the last one the rest"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def summary(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                'sum': round(self.sum, 6), 'count': self.count,
+                'mean': round(self.sum / self.count, 6) if self.count else None}
+
+
+class Metrics:
+    """Timers, counters and histograms collected during one run.
+
+    Phases are timed with `timer()` and accumulate calls and seconds; counters
+    only go up. Summaries are plain dicts, so they survive process pools and
+    can be merged into a batch total.
+    """
+
+    def __init__(self, started=None):
+        self.started = time.monotonic() if started is None else started
+        self.phases = {}
+        self.counters = Counter()
+        self.histograms = {}
+
+    @contextlib.contextmanager
+    def timer(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - started)
+
+    def add_time(self, phase, seconds):
+        entry = self.phases.setdefault(phase, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def observe(self, name, value):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(value)
+
+    def summary(self):
+        return {
+            'elapsed': round(time.monotonic() - self.started, 6),
+            'phases': {phase: {'calls': calls, 'seconds': round(seconds, 6)}
+                       for phase, (calls, seconds) in sorted(self.phases.items())},
+            'counters': dict(sorted(self.counters.items())),
+            'histograms': {name: histogram.summary()
+                           for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def merge(self, summary):
+        """Add another run's summary (e.g. from a batch worker) into this one"""
+        for phase, entry in summary.get('phases', {}).items():
+            mine = self.phases.setdefault(phase, [0, 0.0])
+            mine[0] += entry['calls']
+            mine[1] += entry['seconds']
+        self.counters.update(summary.get('counters', {}))
+        for name, data in summary.get('histograms', {}).items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(data['buckets'])
+            if list(histogram.buckets) != list(data['buckets']):
+                continue
+            histogram.counts = [a + b for a, b in zip(histogram.counts, data['counts'])]
+            histogram.sum += data['sum']
+            histogram.count += data['count']
+
+    def report(self, limit=10):
+        """Print the slowest phases and the counters"""
+        print(f"\n⏱  Timing ({time.monotonic() - self.started:.2f}s total):")
+        phases = sorted(self.phases.items(), key=lambda item: -item[1][1])
+        for phase, (calls, seconds) in phases[:limit]:
+            print(f"  {phase:<22} {seconds:9.3f}s  {calls:>7} calls")
+        if self.counters:
+            print("  " + ", ".join(f"{name}={value}" for name, value in sorted(self.counters.items())))
+        for name, histogram in sorted(self.histograms.items()):
+            if histogram.count:
+                print(f"  {name}: mean {histogram.sum / histogram.count * 1000:.2f}ms "
+                      f"over {histogram.count}")
+
+    def write_json(self, path, **extra):
+        """Write the summary (and any extra fields) as JSON"""
+        document = dict(extra, created_at=datetime.now().isoformat(), metrics=self.summary())
+        _write_atomic(path, json.dumps(document, indent=2) + '\n')
+
+    def write_prometheus(self, path, labels=None):
+        """Write a node_exporter textfile; replaced atomically so scrapes never see half a file"""
+        _write_atomic(path, prometheus_text(self.summary(), labels or {}))
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _labels(labels, **more):
+    merged = dict(labels, **more)
+    if not merged:
+        return ''
+    escaped = (f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"')
+               .replace('\n', '\\n') + '"' for key, value in sorted(merged.items()))
+    return '{' + ','.join(escaped) + '}'
+
+
+def prometheus_text(summary, labels):
+    """Render a metrics summary in the Prometheus text exposition format"""
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+    family('run_seconds', 'gauge', "Wall time of the run.")
+    lines.append(f"{METRIC_PREFIX}_run_seconds{_labels(labels)} {summary['elapsed']}")
+    family('last_run_timestamp_seconds', 'gauge', "When the run finished.")
+    lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds{_labels(labels)} {time.time():.3f}")
+
+    if summary['phases']:
+        family('phase_seconds_total', 'counter', "Time spent in each phase.")
+        for phase, entry in summary['phases'].items():
+            lines.append(f"{METRIC_PREFIX}_phase_seconds_total{_labels(labels, phase=phase)} "
+                         f"{entry['seconds']}")
+        family('phase_calls_total', 'counter', "Times each phase ran.")
+        for phase, entry in summary['phases'].items():
+            lines.append(f"{METRIC_PREFIX}_phase_calls_total{_labels(labels, phase=phase)} "
+                         f"{entry['calls']}")
+
+    for name, value in summary['counters'].items():
+        family(f"{name}_total", 'counter', f"Count of {name.replace('_', ' ')}.")
+        lines.append(f"{METRIC_PREFIX}_{name}_total{_labels(labels)} {value}")
+
+    for name, data in summary['histograms'].items():
+        family(name, 'histogram', f"Distribution of {name.replace('_', ' ')}.")
+        cumulative = 0
+        for bound, count in zip(list(data['buckets']) + ['+Inf'], data['counts']):
+            cumulative += count
+            lines.append(f"{METRIC_PREFIX}_{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{METRIC_PREFIX}_{name}_sum{_labels(labels)} {data['sum']}")
+        lines.append(f"{METRIC_PREFIX}_{name}_count{_labels(labels)} {data['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def add_instrumentation_args(parser, profile=True):
+    """The --profile / --metrics-json / --metrics-prom options shared by the scripts"""
+    group = parser.add_argument_group('instrumentation')
+    if profile:
+        group.add_argument('--profile', nargs='?', const='', metavar='PATH',
+                           help="run under cProfile, print phase timings and the hottest "
+                                "functions, and save the raw profile to PATH if given")
+    group.add_argument('--metrics-json', metavar='PATH',
+                       help="write phase timings, counters and histograms as JSON")
+    group.add_argument('--metrics-prom', metavar='PATH',
+                       help="write the metrics as a Prometheus textfile (node_exporter)")
+
+
+def run_instrumented(metrics, args, labels, fn, *fn_args, **fn_kwargs):
+    """Call fn as the command line options ask, then export `metrics`"""
+    profile = getattr(args, 'profile', None)
+    try:
+        if profile is not None:
+            return profiled(fn, *fn_args, profile_path=profile or None, **fn_kwargs)
+        return fn(*fn_args, **fn_kwargs)
+    finally:
+        if profile is not None:
+            metrics.report()
+        export_metrics(metrics, args, labels)
+
+
+def export_metrics(metrics, args, labels):
+    """Write `metrics` to the --metrics-json / --metrics-prom paths, if given"""
+    if getattr(args, 'metrics_json', None):
+        metrics.write_json(args.metrics_json, labels=labels)
+        print(f"📝 Metrics saved to: {args.metrics_json}")
+    if getattr(args, 'metrics_prom', None):
+        metrics.write_prometheus(args.metrics_prom, labels)
+        print(f"📝 Prometheus metrics saved to: {args.metrics_prom}")
+
+
+def profiled(fn, *args, profile_path=None, limit=25, **kwargs):
+    """Call fn under cProfile, print the top entries by cumulative time and return its result"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        if profile_path:
+            profiler.dump_stats(profile_path)
+            print(f"📝 Profile saved to: {profile_path} (open with python -m pstats)")
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        print(f"\n🔬 Profile (top {limit} by cumulative time):")
+        print(output.getvalue())
@@ -0,0 +1,314 @@
+"""
+Job queue
+Per-repository queue of runner jobs, kept in the git directory next to the
+repository lock. Runners submit their jobs here, and whichever runner holds the
+lock runs everything queued: jobs for one repository run one at a time, and
+create jobs for the same target whose date ranges overlap or touch are merged
+into one plan. Days a drain has already filled are trimmed from later jobs for
+that target, so a range queued while an overlapping one runs adds only the
+missing days. Each repository has its own queue and lock, so different
+repositories still run in parallel.
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+
+from repo_lock import RepositoryLock, POLL_INTERVAL
+from run_journal import RunJournal
+
+QUEUE_DIR = 'automation-queue'
+# Fields that may differ between create jobs merged into one plan
+RANGE_FIELDS = ('start_date', 'end_date', 'seed')
+# How long a runner waits for a repository another process has locked
+DEFAULT_WAIT = 600
+# Results nobody collected (their runner exited) are dropped after this long
+RESULT_TTL = 7 * 24 * 3600
+
+
+def job_label(job):
+    """Short description of a job for result listings"""
+    if job.get('action') == 'remove':
+        return f"remove ({job.get('mode', 'soft')})"
+    return f"{job['start_date']} to {job['end_date']}"
+
+
+def day_range(job):
+    """(first, last) day ordinals of a create job, or None if its dates do not parse"""
+    try:
+        start = datetime.strptime(job['start_date'], '%Y-%m-%d').toordinal()
+        end = datetime.strptime(job['end_date'], '%Y-%m-%d').toordinal()
+    except (KeyError, TypeError, ValueError):
+        return None
+    return (start, end) if start <= end else None
+
+
+def merge_key(job):
+    """Jobs with the same key may share a plan; None for jobs that never merge"""
+    if job.get('action', 'create') != 'create' or day_range(job) is None:
+        return None
+    return json.dumps({key: value for key, value in job.items() if key not in RANGE_FIELDS},
+                      sort_keys=True, default=str)
+
+
+def with_range(job, start, end):
+    """A copy of a create job covering day ordinals start..end"""
+    job = dict(job)
+    job['start_date'] = datetime.fromordinal(start).strftime('%Y-%m-%d')
+    job['end_date'] = datetime.fromordinal(end).strftime('%Y-%m-%d')
+    return job
+
+
+def subtract(start, end, covered):
+    """Parts of start..end (day ordinals) outside the covered ranges, in order"""
+    parts = [(start, end)]
+    for low, high in covered:
+        remaining = []
+        for first, last in parts:
+            if high < first or low > last:
+                remaining.append((first, last))
+                continue
+            if first < low:
+                remaining.append((first, low - 1))
+            if last > high:
+                remaining.append((high + 1, last))
+        parts = remaining
+    return parts
+
+
+def coalesce(entries):
+    """Merge queued (job_id, job) pairs into [(members, job)] in run order.
+
+    Consecutive create jobs with the same merge key whose ranges overlap or
+    touch become one job spanning all of them, seeded like the first; a job
+    with a different key, or a remove, ends the merge.
+    """
+    merged = []
+    for job_id, job in entries:
+        key = merge_key(job)
+        if merged and key is not None and merge_key(merged[-1][1]) == key:
+            members, current = merged[-1]
+            start, end = day_range(current)
+            first, last = day_range(job)
+            if first <= end + 1 and last >= start - 1:
+                merged[-1] = (members + [(job_id, job)],
+                              with_range(current, min(start, first), max(end, last)))
+                continue
+        merged.append(([(job_id, job)], job))
+    return merged
+
+
+class JobQueue:
+    """The queue directory of one git directory.
+
+    submit() adds jobs as <id>.json files. The lock holder calls next_job()
+    and finish() until the queue is empty: next_job() claims everything
+    queued (renaming it to <id>.running), finish() turns a run's result into
+    one result per member job, kept in `results` for jobs this process
+    submitted and written to <id>.result for other runners to collect().
+    """
+
+    def __init__(self, git_dir):
+        self.git_dir = git_dir
+        self.path = os.path.join(git_dir, QUEUE_DIR)
+        self.own = {}               # job id -> job, for the jobs this process submitted
+        self.results = {}
+        self.covered = {}           # merge key -> day ranges created during this drain
+        self._pending = []
+        self._carry = {}            # results of earlier parts of a job split by trimming
+        self._sequence = 0
+
+    def _file(self, job_id, suffix):
+        return os.path.join(self.path, f"{job_id}.{suffix}")
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _ids(self, suffix):
+        try:
+            names = os.listdir(self.path)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(suffix) - 1] for name in names if name.endswith('.' + suffix))
+
+    def submit(self, jobs):
+        """Queue jobs in order; returns their ids"""
+        os.makedirs(self.path, exist_ok=True)
+        ids = []
+        for job in jobs:
+            self._sequence += 1
+            job_id = f"{time.time_ns():020d}-{os.getpid()}-{self._sequence:06d}"
+            self._write(self._file(job_id, 'json'), job)
+            self.own[job_id] = job
+            ids.append(job_id)
+        return ids
+
+    def take(self):
+        """Claim every queued job, oldest first; returns (job_id, job) pairs"""
+        entries = []
+        for job_id in self._ids('json'):
+            running = self._file(job_id, 'running')
+            try:
+                os.rename(self._file(job_id, 'json'), running)
+            except FileNotFoundError:
+                continue            # withdrawn by its runner
+            with open(running) as f:
+                entries.append((job_id, json.load(f)))
+        return entries
+
+    def recover(self):
+        """Fail jobs a previous lock holder claimed but never finished; drop old results"""
+        # Only a create run that got as far as its journal can be resumed
+        journaled = RunJournal(self.git_dir).exists()
+        for job_id in self._ids('running'):
+            with open(self._file(job_id, 'running')) as f:
+                job = json.load(f)
+            if journaled and job.get('action') != 'remove':
+                hint = "resume with create_commits.py --resume"
+            else:
+                hint = "it left no run journal, so submit the job again"
+            self._deliver(job_id, {'repo': job.get('repo'), 'date_range': job_label(job),
+                                   'success': False,
+                                   'error': "interrupted: the runner that claimed it "
+                                            f"exited; {hint}"})
+        cutoff = time.time() - RESULT_TTL
+        for job_id in self._ids('result'):
+            path = self._file(job_id, 'result')
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def next_job(self):
+        """The next (members, job) to run, or None once the queue is empty"""
+        while True:
+            if not self._pending:
+                self._pending = coalesce(self.take())
+                if not self._pending:
+                    return None
+            members, job = self._pending.pop(0)
+            key = merge_key(job)
+            if key is None or key not in self.covered:
+                return members, job
+            parts = subtract(*day_range(job), self.covered[key])
+            if not parts:
+                self.finish(members, job, {'repo': job.get('repo'), 'success': True,
+                                           'total_commits': 0,
+                                           'date_range': job_label(job),
+                                           'note': 'every day was already created'})
+                continue
+            # Earlier parts run without members; finish() folds them into the last one
+            split = [([], with_range(job, first, last)) for first, last in parts[:-1]]
+            self._pending[:0] = split + [(members, with_range(job, *parts[-1]))]
+            return self._pending.pop(0)
+
+    def finish(self, members, job, result):
+        """Record a run's result for each of its member jobs"""
+        key = merge_key(job)
+        if job.get('action') == 'remove':
+            self.covered.clear()
+        elif key is not None and result.get('success'):
+            self.covered.setdefault(key, []).append(day_range(job))
+        if not members:
+            self._carry.setdefault(key, []).append(result)
+            return
+        earlier = self._carry.pop(key, [])
+        if earlier:
+            result = dict(result)
+            result['success'] = result['success'] and all(part['success'] for part in earlier)
+            result['total_commits'] = (result.get('total_commits', 0) +
+                                       sum(part.get('total_commits', 0) for part in earlier))
+            errors = [part['error'] for part in earlier if part.get('error')]
+            if errors and not result.get('error'):
+                result['error'] = errors[0]
+        for number, (job_id, member) in enumerate(members):
+            if number:
+                member_result = {'repo': result.get('repo'), 'date_range': job_label(member),
+                                 'success': result['success'],
+                                 'coalesced_into': result.get('date_range', job_label(job))}
+            else:
+                member_result = result
+                if len(members) > 1:
+                    member_result = dict(result, coalesced=len(members))
+            if job_id in self.own:
+                self.results[job_id] = member_result
+                self._forget(job_id)
+            else:
+                self._deliver(job_id, member_result)
+
+    def _deliver(self, job_id, result):
+        self._write(self._file(job_id, 'result'), result)
+        self._forget(job_id)
+
+    def _forget(self, job_id):
+        try:
+            os.unlink(self._file(job_id, 'running'))
+        except FileNotFoundError:
+            pass
+
+    def collect(self, ids):
+        """Results other runners left for these jobs; returns {job_id: result}"""
+        results = {}
+        for job_id in ids:
+            path = self._file(job_id, 'result')
+            try:
+                with open(path) as f:
+                    results[job_id] = json.load(f)
+            except FileNotFoundError:
+                continue
+            os.unlink(path)
+        return results
+
+    def give_up(self, ids, reason):
+        """Withdraw jobs still queued after the wait ran out; returns their failed results"""
+        results = {}
+        for job_id in ids:
+            try:
+                os.unlink(self._file(job_id, 'json'))
+                error = reason
+            except FileNotFoundError:
+                error = "handed over to the runner holding the repository lock"
+            job = self.own[job_id]
+            results[job_id] = {'repo': job.get('repo'), 'date_range': job_label(job),
+                               'success': False, 'error': error}
+        return results
+
+
+def run_serialised(git_dir, jobs, run, wait=DEFAULT_WAIT, operation='batch_runner'):
+    """Run one repository's jobs through its queue; returns their results in order.
+
+    `run(job)` returns a result dict. Jobs queued by other runners for the
+    same repository are run too while this process holds the lock; if another
+    runner holds it, this one waits up to `wait` seconds for that runner to
+    run them.
+    """
+    queue = JobQueue(git_dir)
+    lock = RepositoryLock(git_dir, operation)
+    ids = queue.submit(jobs)
+    results = queue.results
+    deadline = time.monotonic() + wait
+    while True:
+        results.update(queue.collect([job_id for job_id in ids if job_id not in results]))
+        if len(results) == len(ids):
+            break
+        if lock.acquire():
+            try:
+                queue.recover()
+                entry = queue.next_job()
+                while entry is not None:
+                    queue.finish(*entry, run(entry[1]))
+                    entry = queue.next_job()
+            finally:
+                lock.release()
+            continue
+        if time.monotonic() >= deadline:
+            remaining = [job_id for job_id in ids if job_id not in results]
+            results.update(queue.give_up(remaining, lock.busy_message()))
+            break
+        time.sleep(POLL_INTERVAL)
+    return [results[job_id] for job_id in ids]
@@ -0,0 +1,105 @@
+"""
+Large repositories
+Detects repositories whose index is big enough that whole-worktree git commands
+(status, add, commit) dominate each commit, and the index settings that keep
+the remaining work cheap: untracked cache, fsmonitor, split and sparse index.
+"""
+
+import os
+import glob
+import struct
+
+MODES = ('auto', 'on', 'off')
+
+# 'auto' switches to large mode from this many index entries
+LARGE_REPO_FILES = 50000
+
+# update-index options that apply a setting to the existing index
+INDEX_FLAGS = {
+    'feature.manyFiles': ['--index-version', '4', '--untracked-cache'],
+    'core.splitIndex': ['--split-index'],
+}
+
+
+def _header_entries(path):
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(12)
+    except OSError:
+        return 0
+    if len(header) < 12 or header[:4] != b'DIRC':
+        return 0
+    return struct.unpack('>I', header[8:12])[0]
+
+
+def index_entries(git_dir):
+    """Number of index entries, read from the 12-byte header alone.
+
+    With a split index most entries live in a shared index; the newest one
+    is counted then.
+    """
+    entries = _header_entries(os.path.join(git_dir, 'index'))
+    shared = glob.glob(os.path.join(git_dir, 'sharedindex.*'))
+    if shared:
+        entries = max(entries, _header_entries(max(shared, key=os.path.getmtime)))
+    return entries
+
+
+def is_large(git, mode='auto'):
+    """Whether a repository should run in large mode ('auto', 'on' or 'off')"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown large-repo mode '{mode}'")
+    if mode != 'auto':
+        return mode == 'on'
+    return index_entries(git.git_dir()) >= LARGE_REPO_FILES
+
+
+def _config(git, key):
+    success, output = git.run(['config', '--get', key], quiet=True)
+    return output.strip().lower() if success else None
+
+
+def has_fsmonitor_daemon(git):
+    """Whether this git build ships the builtin filesystem monitor"""
+    success, output = git.run(['version', '--build-options'], quiet=True)
+    return success and 'fsmonitor--daemon' in output
+
+
+def recommended_settings(git):
+    """(key, value, reason) for settings that would help and are not set yet"""
+    settings = []
+    if _config(git, 'feature.manyfiles') != 'true':
+        settings.append(('feature.manyFiles', 'true',
+                         "index v4 and the untracked cache: smaller index, faster status"))
+    if _config(git, 'core.splitindex') != 'true':
+        settings.append(('core.splitIndex', 'true',
+                         "per-commit index writes only rewrite the changed entries"))
+    if _config(git, 'core.fsmonitor') is None and has_fsmonitor_daemon(git):
+        settings.append(('core.fsmonitor', 'true',
+                         "the filesystem monitor replaces lstat() of every tracked file"))
+    if (_config(git, 'core.sparsecheckout') == 'true' and
+            _config(git, 'core.sparsecheckoutcone') == 'true' and
+            _config(git, 'index.sparse') != 'true'):
+        settings.append(('index.sparse', 'true',
+                         "the index only lists the sparse-checkout cone"))
+    return settings
+
+
+def tune_repository(git, apply=False):
+    """Print the recommended settings, or write them to the repository's config"""
+    settings = recommended_settings(git)
+    if not settings:
+        git.say("🐘 Repository settings are already tuned for its size")
+        return []
+    if not apply:
+        git.say("💡 Settings that would speed up git in this repository (apply with --tune-repo):")
+        for key, value, reason in settings:
+            git.say(f"  git config {key} {value}    # {reason}")
+        return settings
+    for key, value, reason in settings:
+        if git.run(['config', key, value])[0]:
+            git.say(f"  ✓ {key}={value} ({reason})")
+            # Convert the index now rather than on some later write
+            if key in INDEX_FLAGS:
+                git.run(['update-index'] + INDEX_FLAGS[key], quiet=True)
+    return settings
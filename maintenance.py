@@ -0,0 +1,110 @@
+"""
+Repository maintenance
+Optional stages after a run: pack the loose objects a run leaves behind and
+write the commit-graph and reachability bitmaps, or, after a removal, drop the
+objects nothing refers to any more.
+"""
+
+import time
+
+POLICIES = ('auto', 'always', 'never')
+
+# 'auto' leaves small runs alone; git's own gc.auto threshold is 6700 loose objects
+MIN_COMMITS = 500
+MIN_LOOSE_OBJECTS = 2000
+
+
+def object_stats(git):
+    """`git count-objects -v` as a dict of ints (sizes in KiB)"""
+    success, output = git.run(['count-objects', '-v'], quiet=True)
+    stats = {}
+    for line in output.splitlines() if success else []:
+        key, _, value = line.partition(':')
+        if value.strip().isdigit():
+            stats[key.strip()] = int(value)
+    return stats
+
+
+def describe(stats):
+    size = stats.get('size-pack', 0)
+    size = f"{size / 1024:.1f} MiB" if size >= 1024 else f"{size} KiB"
+    return f"{stats.get('count', 0)} loose objects, {stats.get('packs', 0)} packs ({size})"
+
+
+class RepositoryMaintenance:
+    """Runs the maintenance stages through a GitExecutor and reports what they did.
+
+    finalize() is the post-generation stage: an incremental repack of the loose
+    objects into a new pack with a multi-pack-index bitmap, and a split
+    commit-graph. after_removal() repacks everything so objects of removed
+    commits are dropped, prunes unreachable loose objects and rewrites the
+    commit-graph. Objects still named by a reflog count as reachable, so
+    removed commits are only reclaimed once their reflog entries expire.
+    """
+
+    def __init__(self, git, policy='auto'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown maintenance policy '{policy}'")
+        self.git = git
+        self.policy = policy
+
+    def should_run(self, commits, stats):
+        if self.policy != 'auto':
+            return self.policy == 'always'
+        return commits >= MIN_COMMITS or stats.get('count', 0) >= MIN_LOOSE_OBJECTS
+
+    def _step(self, variants):
+        """Run command sequences until one completes; returns whether one did"""
+        for commands in variants:
+            if all(self.git.run(args, quiet=True)[0] for args in commands):
+                return True
+        return False
+
+    def _run(self, label, commits, steps):
+        before = object_stats(self.git)
+        if not self.should_run(commits, before):
+            if self.policy == 'auto':
+                self.git.say(f"🧰 Skipping {label} ({commits} commits, {before.get('count', 0)} loose objects)")
+            return {'skipped': True, 'before': before, 'after': before}
+        self.git.say(f"🧰 Running {label}...")
+        started = time.monotonic()
+        failed = []
+        with self.git.metrics.timer(label.replace(' ', '_')):
+            for name, variants in steps:
+                if not self._step(variants):
+                    failed.append(name)
+        after = object_stats(self.git)
+        elapsed = time.monotonic() - started
+        self.git.say(f"  {describe(before)} → {describe(after)} in {elapsed:.2f}s")
+        for name in failed:
+            self.git.say(f"  ⚠ {name} failed; the repository is still usable")
+        return {'skipped': False, 'before': before, 'after': after,
+                'failed': failed, 'elapsed': round(elapsed, 3)}
+
+    def finalize(self, commits):
+        """Pack a finished run's objects and write commit-graph and bitmaps"""
+        return self._run('post-run maintenance', commits, [
+            # Only loose objects are packed (no -a); the bitmap then lives in a
+            # multi-pack-index, and git older than 2.34 gets one without bitmap
+            ('repack', ([['repack', '-d', '-q', '--write-midx', '--write-bitmap-index']],
+                        [['repack', '-d', '-q'], ['multi-pack-index', 'write']])),
+            ('commit-graph', ([['commit-graph', 'write', '--reachable', '--split']],)),
+        ])
+
+    def after_removal(self, commits, expire_reflog=False):
+        """Drop objects that only removed commits used.
+
+        With expire_reflog, reflog entries for commits that are no longer
+        reachable from any ref are expired first, so those commits can go too.
+        """
+        steps = []
+        if expire_reflog:
+            steps.append(('reflog expire', ([['reflog', 'expire', '--expire-unreachable=now',
+                                              '--all']],)))
+        steps += [
+            ('repack', ([['repack', '-a', '-d', '-q', '--write-bitmap-index']],
+                        [['repack', '-a', '-d', '-q']])),
+            ('prune', ([['prune', '--expire=now']],)),
+            ('commit-graph', ([['commit-graph', 'write', '--reachable']],)),
+        ]
+        return self._run('post-removal maintenance', commits, steps)
@@ -0,0 +1,271 @@
+"""
+Automation markers
+The one registry of what the creator writes: commit messages, the lines it
+adds to a target file and the comment syntax they use per language. The
+creator formats its lines from TEMPLATES; the remover strips them with a single
+regex compiled from the same templates, streaming the file in fixed-size chunks.
+"""
+
+import os
+import re
+import mmap
+import random
+import tempfile
+from collections import Counter
+from contextlib import contextmanager
+from string import Formatter
+
+# (prefix, suffix) comment syntax by file extension; anything else uses '#'
+COMMENT_STYLES = {
+    **dict.fromkeys(('.py', '.sh', '.bash', '.yml', '.yaml', '.conf', '.toml', '.rb', '.pl',
+                     '.r', '.ps1', '.mk', '.cfg'), ('#', '')),
+    **dict.fromkeys(('.java', '.js', '.jsx', '.ts', '.tsx', '.cpp', '.cc', '.h', '.hpp', '.c',
+                     '.cs', '.php', '.go', '.rs', '.swift', '.kt', '.scala', '.dart'), ('//', '')),
+    **dict.fromkeys(('.html', '.htm', '.xml', '.svg', '.vue', '.md'), ('<!--', '-->')),
+    **dict.fromkeys(('.css',), ('/*', '*/')),
+    **dict.fromkeys(('.sql', '.lua', '.hs'), ('--', '')),
+    **dict.fromkeys(('.ini',), (';', '')),
+}
+DEFAULT_COMMENT_STYLE = ('#', '')
+
+COMMENT_PREFIXES = tuple(dict.fromkeys(prefix for prefix, _ in COMMENT_STYLES.values()))
+COMMENT_SUFFIXES = tuple(dict.fromkeys(suffix for _, suffix in COMMENT_STYLES.values() if suffix))
+UPDATE_KINDS = ('refactor', 'optimize', 'cleanup', 'enhance')
+FEATURE_KINDS = ('improvement', 'bugfix', 'enhancement', 'maintenance')
+
+COMMIT_MESSAGES = (
+    "Update code structure",
+    "Fix minor issues",
+    "Refactor code",
+    "Add improvements",
+    "Update documentation",
+    "Optimize performance",
+    "Fix bugs",
+    "Clean up code",
+    "Add new features",
+    "Update comments",
+    "Improve UI",
+    "Fix styling",
+    "Update methods",
+    "Add error handling",
+    "Improve logic",
+    "Code cleanup",
+    "Minor updates",
+    "Performance improvements",
+    "Bug fixes",
+    "Feature updates",
+)
+
+TEMPLATES = (
+    "{prefix} Modified on {date}",
+    "{prefix} Commit #{commit_num} - {prefix} Auto-generated comment {comment_id}",
+    "{prefix} Update: {update}",
+    "{prefix} Version: {major}.{minor}",
+    "{prefix} Build: {build}",
+    "{prefix} Feature: {feature}",
+    "{prefix} Automation commit {automation_id}",
+)
+
+# Lines older versions wrote (and the remover has always matched anywhere in a line)
+LEGACY_MARKERS = ('Automated commit', 'Auto-generated')
+# Literal text only the creator writes; a template with one of these, or with a
+# {date}, is anchored. Other templates ("# Version: 1.2") read like comments a
+# person could write, so the cleaner only removes lines the run itself added.
+ANCHOR_MARKERS = ('Automation commit',) + LEGACY_MARKERS
+
+FIELD_PATTERNS = {
+    'prefix': None,  # the comment prefixes a pattern is built for
+    'date': r'\d{4}-\d{2}-\d{2}',
+    'commit_num': r'\d+',
+    'comment_id': r'\d+',
+    'update': '(?:' + '|'.join(UPDATE_KINDS) + ')',
+    'major': r'\d+',
+    'minor': r'\d+',
+    'build': r'\d+',
+    'feature': '(?:' + '|'.join(FEATURE_KINDS) + ')',
+    'automation_id': r'\d+',
+}
+
+CHUNK_SIZE = 1 << 20
+
+
+def template_values(commit_num, date_str, prefix, rng=random):
+    """Random field values for one line, drawn in the order the creator always used"""
+    return {
+        'prefix': prefix,
+        'date': date_str,
+        'commit_num': commit_num,
+        'comment_id': rng.randint(1000, 9999),
+        'update': rng.choice(UPDATE_KINDS),
+        'major': rng.randint(1, 100),
+        'minor': rng.randint(0, 9),
+        'build': rng.randint(1000, 9999),
+        'feature': rng.choice(FEATURE_KINDS),
+        'automation_id': rng.randint(100, 999),
+    }
+
+
+def comment_style(path, styles=None):
+    """(prefix, suffix) for a file, from its extension; `styles` overrides the registry"""
+    ext = os.path.splitext(path)[1].lower()
+    if styles and ext in styles:
+        return tuple(styles[ext])
+    return COMMENT_STYLES.get(ext, DEFAULT_COMMENT_STYLE)
+
+
+def template_fields(template):
+    """Fields a template uses; raises ValueError for fields the remover cannot match"""
+    fields = []
+    for _, field, spec, conversion in Formatter().parse(template):
+        if field is None:
+            continue
+        if field not in FIELD_PATTERNS or spec or conversion:
+            raise ValueError(f"unsupported template field '{{{field}}}' in {template!r}")
+        fields.append(field)
+    return fields
+
+
+def is_anchored(template):
+    """Whether a template's lines can only have come from the creator"""
+    return 'date' in template_fields(template) or any(marker in template for marker in ANCHOR_MARKERS)
+
+
+def _alternatives(values):
+    return '(?:' + '|'.join(re.escape(value) for value in values) + ')'
+
+
+def _template_pattern(template, prefix):
+    template_fields(template)
+    parts = []
+    for literal, field, _, _ in Formatter().parse(template):
+        parts.append(re.escape(literal))
+        if field is not None:
+            parts.append(prefix if field == 'prefix' else FIELD_PATTERNS[field])
+    return ''.join(parts)
+
+
+def line_pattern(templates=TEMPLATES, styles=(), registry=True):
+    """One regex for a whole automation line, with the blank line written before it.
+
+    `styles` adds (prefix, suffix) comment syntaxes to the registry's, for
+    lines written with a template pack. With registry=False only the given
+    templates and styles are matched, as a run recorded them. Lines of
+    templates that are not anchored match in the 'generic' group.
+    """
+    if registry:
+        templates = tuple(TEMPLATES) + tuple(templates)
+        styles = [(prefix, '') for prefix in COMMENT_PREFIXES] + \
+            [('', suffix) for suffix in COMMENT_SUFFIXES] + list(styles)
+    prefix = _alternatives(dict.fromkeys(prefix for prefix, _ in styles if prefix))
+    suffixes = tuple(dict.fromkeys(suffix for _, suffix in styles if suffix))
+    templates = tuple(dict.fromkeys(templates))
+    anchored = '|'.join(_template_pattern(template, prefix)
+                        for template in templates if is_anchored(template)) or '(?!)'
+    generic = '|'.join(_template_pattern(template, prefix)
+                       for template in templates if not is_anchored(template)) or '(?!)'
+    legacy = prefix + ' ' + _alternatives(LEGACY_MARKERS)
+    suffix = _alternatives(suffixes) + '?' if suffixes else ''
+    pattern = (r'^(?:[ \t]*\r?\n)?'                        # separator line
+               r'(?:[ \t]*(?:' + anchored + r'|(?P<generic>' + generic + r'))[ \t]*' +
+               suffix + r'[ \t]*\r?'
+               r'|[^\n]*' + legacy + r'[^\n]*)'
+               r'(?:\n|\Z)')
+    return re.compile(pattern.encode(), re.MULTILINE)
+
+
+LINE_PATTERN = line_pattern()
+
+
+def is_marker_line(line, pattern=LINE_PATTERN):
+    """Whether a single line (str or bytes) is an automation line"""
+    if isinstance(line, str):
+        line = line.encode()
+    return pattern.fullmatch(line.rstrip(b'\n') + b'\n') is not None
+
+
+def generic_line(line, pattern=LINE_PATTERN):
+    """The stripped line if it is a line of a template that is not anchored, else None"""
+    match = pattern.fullmatch(line.rstrip(b'\n') + b'\n')
+    if match is None or match.group('generic') is None:
+        return None
+    return line.strip()
+
+
+def _chunks(f, size, use_mmap):
+    if use_mmap:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for offset in range(0, len(view), size):
+                yield view[offset:offset + size]
+    else:
+        yield from iter(lambda: f.read(size), b'')
+
+
+@contextmanager
+def atomic_output(path):
+    """A temporary file next to `path` that replaces it, keeping its mode, once the block succeeds"""
+    fd, tmp_path = tempfile.mkstemp(prefix='.automation-clean-', dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as dst:
+            yield dst
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def strip_marker_lines(path, chunk_size=CHUNK_SIZE, use_mmap=False, pattern=LINE_PATTERN,
+                       written=None, existing=None):
+    """Remove automation lines from a file in one pass; returns the number removed.
+
+    Memory stays at about one chunk however large the file is. The result goes
+    to a temporary file next to the original, which then atomically replaces it.
+    use_mmap reads through a read-only mapping instead of read() calls; mapped
+    pages count towards the process RSS, so it is off by default. Pass a
+    `line_pattern()` to also match a template pack's lines.
+
+    Lines of anchored templates are always removed. A generic line is only
+    removed while the Counter `written` (stripped lines the runs added) has
+    it, and only after the `existing` count of that line from before the runs
+    has been kept; without `written` generic lines are left alone.
+    """
+    use_mmap = use_mmap and os.path.getsize(path) > 0
+    removed = 0
+    written = Counter(written or ())
+    skip = Counter(existing or ())
+
+    def replace(match):
+        nonlocal removed
+        if match.group('generic') is not None:
+            line = match.group(0).strip()
+            if skip[line]:
+                skip[line] -= 1
+                return match.group(0)
+            if not written[line]:
+                return match.group(0)
+            written[line] -= 1
+        removed += 1
+        return b''
+
+    with atomic_output(path) as dst, open(path, 'rb') as src:
+        carry = b''
+        for chunk in _chunks(src, chunk_size, use_mmap):
+            data = carry + chunk
+            # Process whole lines only, and hold back a trailing blank line
+            # in case the next chunk starts with the automation line it belongs to
+            cut = data.rfind(b'\n') + 1
+            if cut:
+                start = data.rfind(b'\n', 0, cut - 1) + 1
+                if not data[start:cut].strip():
+                    cut = start
+            if not cut:
+                carry = data
+                continue
+            dst.write(pattern.sub(replace, data[:cut]))
+            carry = data[cut:]
+        if carry:
+            dst.write(pattern.sub(replace, carry))
+    return removed
@@ -0,0 +1,314 @@
+"""
+Pack writer backend
+Builds blob, tree and commit objects in-process and stores a whole run as a
+single packfile + index, without spawning git per commit.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+
+from git_plumbing import PlumbingBackend, commit_object
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_OFS_DELTA = 6
+
+# Same default as git's pack.depth; bounds the work needed to read a blob back
+MAX_DELTA_DEPTH = 50
+
+
+def object_id(type_name, data):
+    """Return the binary SHA-1 git uses to name an object"""
+    digest = hashlib.sha1(f"{type_name} {len(data)}\0".encode())
+    digest.update(data)
+    return digest.digest()
+
+
+def tree_object(entries):
+    """Serialize (mode, type, sha, name) entries in git's tree order"""
+    def sort_key(entry):
+        name = entry[3].encode()
+        return name + b'/' if entry[1] == 'tree' else name
+
+    body = []
+    for mode, kind, sha, name in sorted(entries, key=sort_key):
+        mode = mode.lstrip('0')
+        body.append(f"{mode} {name}".encode() + b'\0' + bytes.fromhex(sha))
+    return b''.join(body)
+
+
+def _delta_size(size):
+    out = bytearray()
+    while True:
+        byte = size & 0x7f
+        size >>= 7
+        if size:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _copy_ops(offset, length):
+    out = bytearray()
+    end = offset + length
+    while offset < end:
+        size = min(end - offset, 0xffffff)
+        command = 0x80
+        args = bytearray()
+        for i in range(4):
+            byte = (offset >> (8 * i)) & 0xff
+            if byte:
+                command |= 1 << i
+                args.append(byte)
+        for i in range(3):
+            byte = (size >> (8 * i)) & 0xff
+            if byte:
+                command |= 0x10 << i
+                args.append(byte)
+        out.append(command)
+        out += args
+        offset += size
+    return out
+
+
+def _common_length(a, b, from_end=False):
+    """Length of the common prefix (or suffix) of two byte strings"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if from_end:
+            same = a[len(a) - mid:] == b[len(b) - mid:]
+        else:
+            same = a[:mid] == b[:mid]
+        if same:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def splice_delta(base, data):
+    """Delta that keeps the common prefix and suffix of base and inserts the rest.
+
+    Covers both append-only growth and in-place slot rewrites. Returns None
+    when the changed region is too large for a delta to pay off.
+    """
+    if data.startswith(base):
+        prefix, suffix = len(base), 0
+    else:
+        prefix = _common_length(base, data)
+        suffix = _common_length(base[prefix:], data[prefix:], from_end=True)
+    inserted = data[prefix:len(data) - suffix]
+    if len(inserted) * 2 > len(data):
+        return None
+    out = bytearray(_delta_size(len(base)))
+    out += _delta_size(len(data))
+    out += _copy_ops(0, prefix)
+    for i in range(0, len(inserted), 0x7f):
+        chunk = inserted[i:i + 0x7f]
+        out.append(len(chunk))
+        out += chunk
+    out += _copy_ops(len(base) - suffix, suffix)
+    return bytes(out)
+
+
+class PackWriter:
+    """Streams objects into a temporary packfile and writes its v2 index"""
+
+    def __init__(self, pack_dir):
+        self.pack_dir = pack_dir
+        fd, self.tmp_path = tempfile.mkstemp(prefix='tmp_pack_', dir=pack_dir)
+        self.file = os.fdopen(fd, 'w+b')
+        self.file.write(b'PACK' + struct.pack('>II', 2, 0))
+        self.offset = 12
+        self.entries = []
+        self.known = set()
+
+    def add(self, type_code, sha, data, base_offset=None):
+        """Append one object (or a delta against base_offset); returns its offset"""
+        offset = self.offset
+        size = len(data)
+        header = bytearray()
+        byte = (type_code << 4) | (size & 0x0f)
+        size >>= 4
+        while size:
+            header.append(byte | 0x80)
+            byte = size & 0x7f
+            size >>= 7
+        header.append(byte)
+        if base_offset is not None:
+            distance = offset - base_offset
+            encoded = [distance & 0x7f]
+            distance >>= 7
+            while distance:
+                distance -= 1
+                encoded.insert(0, 0x80 | (distance & 0x7f))
+                distance >>= 7
+            header += bytes(encoded)
+        record = bytes(header) + zlib.compress(data)
+        self.file.write(record)
+        self.offset += len(record)
+        self.entries.append((sha, offset, zlib.crc32(record) & 0xffffffff))
+        self.known.add(sha)
+        return offset
+
+    def finish(self):
+        """Fix up the header, checksum the pack, write the index; returns the pack name"""
+        self.file.seek(8)
+        self.file.write(struct.pack('>I', len(self.entries)))
+        self.file.flush()
+        self.file.seek(0)
+        digest = hashlib.sha1()
+        for chunk in iter(lambda: self.file.read(1 << 20), b''):
+            digest.update(chunk)
+        checksum = digest.digest()
+        self.file.seek(0, os.SEEK_END)
+        self.file.write(checksum)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+        name = checksum.hex()
+        base = os.path.join(self.pack_dir, f"pack-{name}")
+        os.chmod(self.tmp_path, 0o444)
+        os.replace(self.tmp_path, base + '.pack')
+
+        entries = sorted(self.entries)
+        index = bytearray(b'\xfftOc' + struct.pack('>I', 2))
+        fanout = [0] * 256
+        for sha, _, _ in entries:
+            fanout[sha[0]] += 1
+        total = 0
+        for i in range(256):
+            total += fanout[i]
+            index += struct.pack('>I', total)
+        for sha, _, _ in entries:
+            index += sha
+        for _, _, crc in entries:
+            index += struct.pack('>I', crc)
+        large = []
+        for _, offset, _ in entries:
+            if offset < 0x80000000:
+                index += struct.pack('>I', offset)
+            else:
+                index += struct.pack('>I', 0x80000000 | len(large))
+                large.append(offset)
+        for offset in large:
+            index += struct.pack('>Q', offset)
+        index += checksum
+        index += hashlib.sha1(index).digest()
+
+        fd, tmp_idx = tempfile.mkstemp(prefix='tmp_idx_', dir=self.pack_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(index)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_idx, 0o444)
+        os.replace(tmp_idx, base + '.idx')
+        return name
+
+    def discard(self):
+        """Remove the unfinished pack"""
+        if not self.file.closed:
+            self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class PackBackend(PlumbingBackend):
+    """Commit backend that hashes and packs every object in-process.
+
+    Successive versions of a file are stored as deltas against the previous
+    version, so the pack grows with the changed lines rather than file size.
+    Git is only run to read the starting trees and to move the branch ref.
+    """
+
+    name = 'pack'
+
+    def __init__(self, repo_path, strategy, executor=None):
+        super().__init__(repo_path, strategy, executor)
+        self.pack = None
+        self._last_blobs = {}  # path -> (content, offset, depth)
+
+    def start(self):
+        """Prepare the branch state and open a temporary pack"""
+        if not super().start():
+            return False
+        pack_dir = os.path.join(self.git.git_dir(), 'objects', 'pack')
+        os.makedirs(pack_dir, exist_ok=True)
+        self.pack = PackWriter(pack_dir)
+        return True
+
+    def _store(self, type_name, type_code, data):
+        sha = object_id(type_name, data)
+        if sha not in self.pack.known:
+            self.pack.add(type_code, sha, data)
+        return sha.hex()
+
+    def write_blob(self, data, path):
+        """Store a blob, as a delta on the previous version of the same path"""
+        sha = object_id('blob', data)
+        if sha in self.pack.known:
+            return sha.hex()
+        last = self._last_blobs.get(path)
+        delta = None
+        if last and last[2] < MAX_DELTA_DEPTH:
+            delta = splice_delta(last[0], data)
+        if delta is not None:
+            offset = self.pack.add(OBJ_OFS_DELTA, sha, delta, base_offset=last[1])
+            self._last_blobs[path] = (data, offset, last[2] + 1)
+        else:
+            offset = self.pack.add(OBJ_BLOB, sha, data)
+            self._last_blobs[path] = (data, offset, 0)
+        return sha.hex()
+
+    def write_tree(self, entries):
+        """Store a tree and return its name"""
+        return self._store('tree', OBJ_TREE, tree_object(entries))
+
+    def write_commit(self, tree, parents, author, committer, message):
+        """Store a commit and return its name"""
+        return self._store('commit', OBJ_COMMIT,
+                           commit_object(tree, parents, author, committer, message))
+
+    def _seal(self):
+        """Finish the current pack; returns False if it could not be written"""
+        try:
+            name = self.pack.finish()
+        except OSError as e:
+            self.git.say(f"✗ Could not write packfile: {e}")
+            self.pack.discard()
+            return False
+        self.git.say(f"📦 Wrote pack-{name}.pack ({len(self.pack.entries)} objects)")
+        return True
+
+    def checkpoint(self):
+        """Seal the pack written so far, move the branch and continue in a new pack"""
+        if not self.pack.entries:
+            return super().checkpoint()
+        known = self.pack.known
+        if not self._seal():
+            return None
+        self.pack = PackWriter(self.pack.pack_dir)
+        # Sealed objects stay known; deltas cannot reach into the sealed pack
+        self.pack.known = known
+        self._last_blobs = {}
+        return super().checkpoint()
+
+    def finish(self):
+        """Seal the pack, then move the branch ref"""
+        # The final checkpoint seals the pack and opens an empty one; drop that
+        success = super().finish()
+        self.pack.discard()
+        return success
+
+    def abort(self):
+        """Discard the unfinished pack"""
+        if self.pack:
+            self.pack.discard()
+        super().abort()
@@ -0,0 +1,109 @@
+"""
+Push pipeline
+Pushes a run to its upstream branch in chunks while generation continues: each
+finished chunk's tip is handed to a background thread, which pushes only the
+newest tip it has been given, retrying with backoff. Later chunks contain the
+earlier ones, so a failed chunk is made up for by the next push.
+"""
+
+import time
+import queue
+import threading
+
+PUSH_MODES = ('end', 'pipelined')
+RETRIES = 3
+BACKOFF = 1.0
+
+
+def upstream(git):
+    """(remote, branch) the checked-out branch pushes to, or None if there is no remote.
+
+    The branch's configured upstream wins; without one the branch is pushed
+    under its own name to `origin` (or the only remote there is).
+    """
+    success, ref = git.run(['symbolic-ref', '-q', 'HEAD'], quiet=True)
+    if not success:
+        return None
+    ref = ref.strip()
+    success, output = git.run(['for-each-ref', '--format=%(upstream:remotename)%00'
+                               '%(upstream:remoteref)', ref], quiet=True)
+    remote, _, remote_ref = output.strip().partition('\0') if success else ('', '', '')
+    if remote and remote_ref.startswith('refs/heads/'):
+        return remote, remote_ref[len('refs/heads/'):]
+    success, output = git.run(['remote'], quiet=True)
+    remotes = output.split() if success else []
+    if not remotes:
+        return None
+    remote = 'origin' if 'origin' in remotes else remotes[0]
+    return remote, ref[len('refs/heads/'):]
+
+
+def push_commit(git, remote, branch, commit, force=False, retries=RETRIES, backoff=BACKOFF):
+    """Push `commit` to `remote`'s `branch`, retrying with exponential backoff; returns success"""
+    args = ['push', '-q'] + (['--force'] if force else []) + [remote,
+                                                             f"{commit}:refs/heads/{branch}"]
+    for attempt in range(retries + 1):
+        if attempt:
+            git.metrics.count('push_retries')
+            time.sleep(backoff * 2 ** (attempt - 1))
+        with git.metrics.timer('push_chunk'):
+            success, output = git.run(args, quiet=True)
+        if success:
+            git.metrics.count('pushes')
+            return True
+    git.metrics.count('push_failures')
+    reason = output.strip().splitlines()[0] if output.strip() else 'unknown error'
+    git.say(f"  ⚠ Push of {commit[:7]} to {remote}/{branch} failed: {reason}")
+    return False
+
+
+class PushPipeline:
+    """Background pusher for one run.
+
+    submit() hands over a chunk's tip and returns at once; finish() pushes the
+    final tip, waits for the thread and returns whether the remote has it.
+    """
+
+    def __init__(self, git, remote, branch, retries=RETRIES, backoff=BACKOFF):
+        self.git = git
+        self.remote = remote
+        self.branch = branch
+        self.retries = retries
+        self.backoff = backoff
+        self.pushed = None          # newest commit the remote is known to have
+        self.chunks = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='push-pipeline', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            commit = self._queue.get()
+            # Only the newest tip matters; it contains every chunk queued before it
+            while commit is not None and not self._queue.empty():
+                following = self._queue.get()
+                if following is None:
+                    self._queue.put(None)
+                    break
+                commit = following
+            if commit is None:
+                return
+            if commit != self.pushed and push_commit(self.git, self.remote, self.branch, commit,
+                                                     retries=self.retries, backoff=self.backoff):
+                self.pushed = commit
+                self.chunks += 1
+
+    def submit(self, commit):
+        if commit:
+            self._queue.put(commit)
+
+    def close(self):
+        """Stop the thread once the chunks already handed over are pushed"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def finish(self, commit):
+        """Push the run's final commit and stop the thread; returns success"""
+        self.submit(commit)
+        self.close()
+        return self.pushed == commit
@@ -4,56 +4,184 @@ Removes automated commits created by the create_commits.py script.
 """
 
 import os
-import subprocess
 import json
+import time
+import shlex
+import argparse
+import subprocess
+from collections import Counter
 from datetime import datetime
 
-class GitCommitRemover:
-    def __init__(self, repo_path):
+from git_plumbing import GitExecutor, repository_at
+from content_strategy import strip_ring_region
+from markers import (COMMIT_MESSAGES, LINE_PATTERN, TEMPLATES, atomic_output, generic_line,
+                     line_pattern, strip_marker_lines)
+from content_generator import pack_matchers
+from history_scan import HistoryScanner
+from run_journal import RunJournal
+from automation_ledger import AutomationLedger
+from history_rewrite import BACKUP_REF, HistoryRewriter
+from instrumentation import Metrics, add_instrumentation_args, run_instrumented
+from maintenance import POLICIES, RepositoryMaintenance, object_stats
+from push_pipeline import push_commit, upstream
+from repo_lock import RepositoryLock
+from automation_api import (REMOVAL_MODES, ProgressReporting, RemoveResult, progress_reporter,
+                            terminal_confirm)
+
+class GitCommitRemover(ProgressReporting):
+    def __init__(self, repo_path, progress=None, confirm=None, metrics=None):
         self.repo_path = repo_path
+        # progress(event, message, **data) receives what would otherwise be printed;
+        # confirm(key, prompt) is asked before a hard reset and before expiring reflogs
+        self.progress = progress
+        self.confirm = confirm
+        self.metrics = metrics or Metrics()
+        self.git = GitExecutor(repo_path, self.metrics)
+        self.git.say = self.say
         self.commit_log_file = os.path.join(repo_path, '.commit_automation_log.json')
+        self.journal = RunJournal(self.git.git_dir())
+        self.ledger = AutomationLedger(self.git.git_dir())
+        self.maintenance = 'auto'
+        self.expire_reflog = False
+        # Scan the branch history for runs before loading one
+        self.scan = False
+        self.old_head = None
+        self.new_head = None
+        self.pushed = False
         
     def run_git_command(self, command):
-        """Run git command"""
-        try:
-            result = subprocess.run(command, shell=True, cwd=self.repo_path,
-                                  capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                print(f"Error running command: {command}")
-                print(f"Error: {result.stderr}")
-                return False, result.stderr
-            return True, result.stdout
-        except Exception as e:
-            print(f"Exception running command {command}: {e}")
-            return False, str(e)
+        """Run git command (argv list, without the leading 'git')"""
+        if isinstance(command, str):
+            command = shlex.split(command)[1:]
+        return self.git.run(command)
     
     def load_automation_log(self):
-        """Load automation log to get commit information"""
+        """Load automation log to get commit information
+        
+        Without a log, journal or ledger run, the branch history is scanned
+        for runs; with `scan` set it is scanned first and the ledger's latest
+        run is used.
+        """
         try:
+            if self.scan:
+                self.scan_history()
+                log_data = self.load_ledger_run()
+                if log_data:
+                    return log_data
             if not os.path.exists(self.commit_log_file):
-                print(f"❌ Automation log file not found: {self.commit_log_file}")
-                print("This file is created when you run create_commits.py")
+                log_data = self.load_interrupted_run() or self.load_ledger_run()
+                if log_data:
+                    return log_data
+                if not self.scan and self.scan_history():
+                    return self.load_ledger_run()
+                self.fail(f"❌ Automation log file not found: {self.commit_log_file}")
+                self.say("This file is created when you run create_commits.py")
                 return None
             
             with open(self.commit_log_file, 'r') as f:
                 log_data = json.load(f)
             
-            print("📋 Found automation log:")
-            print(f"  Date range: {log_data.get('date_range', 'Unknown')}")
-            print(f"  Total commits: {log_data.get('total_commits', 'Unknown')}")
-            print(f"  Target file: {log_data.get('target_file', 'Unknown')}")
-            print(f"  Created at: {log_data.get('created_at', 'Unknown')}")
+            self.say("📋 Found automation log:")
+            self.say(f"  Date range: {log_data.get('date_range', 'Unknown')}")
+            self.say(f"  Total commits: {log_data.get('total_commits', 'Unknown')}")
+            self.say(f"  Target file: {log_data.get('target_file', 'Unknown')}")
+            self.say(f"  Created at: {log_data.get('created_at', 'Unknown')}")
             
             return log_data
         except Exception as e:
-            print(f"Error loading automation log: {e}")
+            self.fail(f"Error loading automation log: {e}")
             return None
     
+    def load_interrupted_run(self):
+        """Build log data from the journal of a run that never reached its end"""
+        state = self.journal.load()
+        if state is None:
+            return None
+        start = state['start']
+        progress = state['progress'] or {}
+        strategy = dict(start.get('content_strategy') or {'name': 'append'})
+        strategy.update(progress.get('strategy', {}))
+        log_data = {
+            'start_commit': start.get('start_commit'),
+            'end_commit': progress.get('commit'),
+            'total_commits': progress.get('commits', 0),
+            'date_range': start.get('date_range'),
+            'created_at': start.get('created_at'),
+            'target_file': start.get('target_file'),
+            'content_strategy': strategy,
+        }
+        self.say("📋 Found the journal of an interrupted run:")
+        self.say(f"  Date range: {log_data['date_range']}")
+        self.say(f"  Commits created before the interruption: {log_data['total_commits']}")
+        self.say(f"  Target file: {log_data['target_file']}")
+        self.say(f"  Started at: {log_data['created_at']}")
+        return log_data
+    
+    def load_ledger_run(self, run=None):
+        """Use a ledger run (the latest by default) as log data"""
+        run = run or self.ledger.latest_run()
+        if run is None:
+            return None
+        self.say(f"📋 Found run #{run['run_id']} in the automation ledger:")
+        self.say(f"  Date range: {run.get('date_range', 'Unknown')}")
+        self.say(f"  Total commits: {run.get('total_commits', 'Unknown')}")
+        self.say(f"  Target file: {run.get('target_file', 'Unknown')}")
+        self.say(f"  Created at: {run.get('created_at', 'Unknown')}")
+        return run
+    
+    def scan_history(self):
+        """Find automation runs in the branch history; returns the run ids added to the ledger"""
+        messages = list(COMMIT_MESSAGES)
+        templates, styles = [], []
+        for run in self.ledger.runs(include_removed=True):
+            run_templates, run_styles, run_messages = pack_matchers(run.get('content_generator'))
+            templates.extend(run_templates)
+            styles.extend(run_styles)
+            messages.extend(run_messages)
+        pattern = line_pattern(templates, styles) if templates or styles else LINE_PATTERN
+        scanner = HistoryScanner(self.git, messages, pattern)
+        self.say("🔎 Scanning the branch history for automation runs...")
+        try:
+            found = scanner.scan()
+            added = scanner.record(self.ledger, found)
+        finally:
+            scanner.close()
+        self.say(f"  {scanner.scanned} commits scanned, {len(found)} automation run(s) found, "
+                 f"{len(added)} added to the automation ledger")
+        return added
+    
+    def load_run(self, run_id):
+        """Log data for ledger run `run_id`, or None if the ledger does not have it"""
+        selected = [run for run in self.ledger.runs() if run['run_id'] == run_id]
+        if not selected:
+            self.fail(f"❌ Run #{run_id} is not in the automation ledger")
+            return None
+        later = [run for run in self.ledger.runs() if run['run_id'] > run_id]
+        if later:
+            self.say(f"⚠️  Resetting to the start of run #{run_id} also removes "
+                     f"{len(later)} later run(s)")
+        return self.load_ledger_run(selected[0])
+    
+    def sync_ledger(self):
+        """Retire ledger runs whose commits are no longer on the current branch"""
+        gone = []
+        for run in self.ledger.runs():
+            end_commit = run.get('end_commit')
+            if not end_commit or end_commit == run.get('start_commit'):
+                continue
+            if not self.git.run(['merge-base', '--is-ancestor', end_commit, 'HEAD'],
+                                quiet=True)[0]:
+                gone.append(run['run_id'])
+        if gone:
+            with self.metrics.timer('sync_ledger'):
+                self.ledger.mark_removed(gone)
+                self.ledger.compact()
+            self.say(f"✅ Retired {len(gone)} run(s) from the automation ledger")
+    
     def get_commit_count_to_remove(self, start_commit):
         """Get the number of commits to remove from start_commit to HEAD"""
         try:
-            success, output = self.run_git_command(f"git rev-list --count {start_commit}..HEAD")
+            success, output = self.run_git_command(['rev-list', '--count', f"{start_commit}..HEAD"])
             if success:
                 return int(output.strip())
             return 0
@@ -61,253 +189,527 @@ class GitCommitRemover:
             return 0
     
     def reset_to_commit(self, commit_hash, hard_reset=False):
-        """Reset repository to a specific commit"""
+        """Reset repository to a specific commit; without a working tree only the branch moves"""
         reset_type = "--hard" if hard_reset else "--soft"
-        success, output = self.run_git_command(f"git reset {reset_type} {commit_hash}")
+        if self.git.resolve(f"{commit_hash}^{{commit}}") is None:
+            return self.fail(f"❌ Commit not found in this repository: {commit_hash}")
+        with self.metrics.timer('reset'):
+            if not self.git.has_worktree():
+                return self.git.move_head(commit_hash, self.git.resolve('HEAD^{commit}'),
+                                          reason=f"reset: moving to {commit_hash}")
+            success, output = self.run_git_command(['reset', reset_type, commit_hash])
         return success
     
     def remove_automation_commits_safe(self, log_data):
         """Safely remove automation commits using soft reset"""
         start_commit = log_data.get('start_commit')
         if not start_commit:
-            print("❌ No start commit found in log data")
-            return False
+            return self.fail("❌ No start commit found in log data")
         
         # Count commits to be removed
         commits_to_remove = self.get_commit_count_to_remove(start_commit)
-        print(f"📊 Commits to remove: {commits_to_remove}")
+        self.say(f"📊 Commits to remove: {commits_to_remove}")
         
         if commits_to_remove == 0:
-            print("✅ No commits to remove (already at starting point)")
+            self.say("✅ No commits to remove (already at starting point)")
             return True
         
-        print(f"\n🔄 Removing {commits_to_remove} automated commits...")
-        print(f"Resetting to commit: {start_commit}")
+        self.say(f"\n🔄 Removing {commits_to_remove} automated commits...")
+        self.say(f"Resetting to commit: {start_commit}")
         
         # Perform soft reset to preserve working directory changes
         if self.reset_to_commit(start_commit, hard_reset=False):
-            print("✅ Commits removed successfully (soft reset)")
-            print("📝 Your working directory changes are preserved")
+            self.metrics.count('commits_removed', commits_to_remove)
+            self.say("✅ Commits removed successfully (soft reset)")
+            if self.git.has_worktree():
+                self.say("📝 Your working directory changes are preserved")
             return True
         else:
-            print("❌ Failed to remove commits")
-            return False
+            return self.fail("❌ Failed to remove commits")
     
     def remove_automation_commits_hard(self, log_data):
         """Remove automation commits using hard reset (WARNING: loses changes)"""
         start_commit = log_data.get('start_commit')
         if not start_commit:
-            print("❌ No start commit found in log data")
-            return False
+            return self.fail("❌ No start commit found in log data")
         
         # Count commits to be removed
         commits_to_remove = self.get_commit_count_to_remove(start_commit)
-        print(f"📊 Commits to remove: {commits_to_remove}")
+        self.say(f"📊 Commits to remove: {commits_to_remove}")
         
         if commits_to_remove == 0:
-            print("✅ No commits to remove (already at starting point)")
+            self.say("✅ No commits to remove (already at starting point)")
             return True
         
-        print(f"\n⚠️  HARD RESET: This will permanently delete {commits_to_remove} commits!")
-        print(f"⚠️  All uncommitted changes will be lost!")
-        confirm = input("Type 'DELETE' to confirm hard reset: ")
+        self.say(f"\n⚠️  HARD RESET: This will permanently delete {commits_to_remove} commits!")
+        self.say(f"⚠️  All uncommitted changes will be lost!")
+        if self.confirm and not self.confirm('hard_reset', "Type 'DELETE' to confirm hard reset: "):
+            return self.fail("❌ Hard reset cancelled")
         
-        if confirm != "DELETE":
-            print("❌ Hard reset cancelled")
-            return False
-        
-        print(f"🔄 Performing hard reset to commit: {start_commit}")
+        self.say(f"🔄 Performing hard reset to commit: {start_commit}")
         
         # Perform hard reset
         if self.reset_to_commit(start_commit, hard_reset=True):
-            print("✅ Hard reset completed successfully")
-            print("⚠️  All automated commits and uncommitted changes have been removed")
+            self.metrics.count('commits_removed', commits_to_remove)
+            self.say("✅ Hard reset completed successfully")
+            self.say("⚠️  All automated commits and uncommitted changes have been removed")
             return True
         else:
-            print("❌ Failed to perform hard reset")
-            return False
+            return self.fail("❌ Failed to perform hard reset")
+    
+    def ledger_runs_from(self, log_data):
+        """The ledger run behind log_data and every later run, or [] if it is not recorded"""
+        runs = self.ledger.runs()
+        run_id = log_data.get('run_id')
+        if run_id is None:
+            matching = [run for run in runs if run.get('end_commit') == log_data.get('end_commit')]
+            if not matching:
+                return []
+            run_id = matching[-1]['run_id']
+        return [run for run in runs if run['run_id'] >= run_id]
+    
+    def automation_paths(self, runs):
+        """Every file the given runs (log data or ledger runs) wrote to"""
+        paths = set()
+        for run in runs:
+            if run.get('target_file'):
+                paths.add(run['target_file'])
+            strategy = run.get('content_strategy') or {}
+            paths.update(strategy.get('paths', []))
+            paths.update(strategy.get('created_files', []))
+        return paths
+    
+    def remove_automation_commits_surgical(self, log_data):
+        """Rewrite history without the automation commits, keeping every other commit"""
+        start_commit = log_data.get('start_commit')
+        success, branch_ref = self.run_git_command(['symbolic-ref', '-q', 'HEAD'])
+        if not success:
+            return self.fail("❌ Surgical removal needs a checked-out branch (detached HEAD)")
+        
+        runs = self.ledger_runs_from(log_data)
+        automated = [sha for run in runs for sha, timestamp in self.ledger.run_commits(run['run_id'])]
+        messages = list(COMMIT_MESSAGES)
+        for run in runs or [log_data]:
+            messages.extend(pack_matchers(run.get('content_generator'))[2])
+        rewriter = HistoryRewriter(self.repo_path, automated, self.automation_paths(runs or [log_data]),
+                                   messages=messages, executor=self.git)
+        matched_by = ("ledger hashes" if rewriter.match == 'ledger'
+                      else "message and target file signature")
+        self.say(f"\n🔪 Rewriting {start_commit[:7] + '..' if start_commit else ''}HEAD "
+                 f"(automation commits matched by {matched_by})...")
+        
+        started = time.monotonic()
+        with self.metrics.timer('surgical_rewrite'):
+            success, result = rewriter.apply(branch_ref.strip(), start_commit)
+        if not success:
+            return self.fail(f"❌ Rewrite failed: {result}")
+        if rewriter.dropped == 0:
+            self.say("✅ No automation commits found in that range")
+            return True
+        self.metrics.count('commits_removed', rewriter.dropped)
+        self.metrics.count('commits_replayed', rewriter.kept)
+        self.say(f"✅ Dropped {rewriter.dropped} automation commits and replayed {rewriter.kept} "
+                 f"others in {time.monotonic() - started:.2f}s")
+        if rewriter.touched:
+            self.say(f"⚠️  {rewriter.touched} kept commits also changed automation files; their "
+                     f"versions of those files may still contain automation lines")
+        self.say(f"💾 The previous history is kept at {BACKUP_REF}")
+        return True
     
     def clean_target_file(self, log_data):
         """Clean the target file that was modified during automation"""
         target_file = log_data.get('target_file')
         if not target_file:
-            print("❌ No target file found in log data")
-            return False
+            return self.fail("❌ No target file found in log data")
+        if not self.git.has_worktree():
+            return self.fail("❌ Cleaning the target file needs a working tree; without one, "
+                             "remove the commits (soft, hard or surgical) instead")
         
         file_path = os.path.join(self.repo_path, target_file)
         
+        strategy = log_data.get('content_strategy') or {'name': 'append'}
+        if strategy.get('name') == 'shard':
+            return self.clean_shard_files(strategy)
+        
         if not os.path.exists(file_path):
-            print(f"❌ Target file not found: {target_file}")
-            return False
+            return self.fail(f"❌ Target file not found: {target_file}")
         
-        print(f"\n🧹 Cleaning target file: {target_file}")
+        self.say(f"\n🧹 Cleaning target file: {target_file}")
+        
+        if strategy.get('name') == 'ring':
+            return self.clean_ring_region(file_path, target_file)
         
         try:
-            # Remove automation comments and restore original content
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            # Filter out automation comments
-            original_lines = []
-            for line in lines:
-                # Skip lines that contain automation markers
-                if not any(marker in line for marker in [
-                    "# Automated commit", "// Automated commit", "<!-- Automated commit",
-                    "# Auto-generated", "// Auto-generated", "<!-- Auto-generated"
-                ]):
-                    original_lines.append(line)
-            
-            # Write back the cleaned content
-            with open(file_path, 'w') as f:
-                f.writelines(original_lines)
-            
-            print(f"✅ File cleaned: {target_file}")
+            # One streaming pass matching the templates and comment syntax the
+            # runs recorded; lines that read like hand-written comments are only
+            # removed where the runs' own commits added them
+            runs = self.ledger_runs_from(log_data) or [log_data]
+            pattern = self.recorded_pattern(runs)
+            with self.metrics.timer('clean_target_file'):
+                written, existing = self.generic_lines_added(runs, target_file, pattern)
+                removed = strip_marker_lines(file_path, pattern=pattern, written=written,
+                                             existing=existing)
+            self.metrics.count('marker_lines_removed', removed)
+            self.say(f"✅ File cleaned: {target_file} ({removed} automation lines removed)")
             return True
             
         except Exception as e:
-            print(f"❌ Error cleaning file {target_file}: {e}")
-            return False
+            return self.fail(f"❌ Error cleaning file {target_file}: {e}")
+    
+    def recorded_pattern(self, runs):
+        """Line pattern for exactly the templates and comment syntax the runs wrote with"""
+        templates, styles = [], []
+        registry = False
+        for run in runs:
+            generator = run.get('content_generator') or {}
+            run_templates, run_styles, _ = pack_matchers(generator)
+            templates.extend(run_templates or TEMPLATES)
+            styles.extend(run_styles)
+            if generator.get('comment_style'):
+                styles.append(tuple(generator['comment_style']))
+            else:
+                registry = True     # logged before the comment syntax was recorded
+        return line_pattern(templates, styles, registry=registry)
+    
+    def _git_lines(self, args):
+        """Stream the lines of a git command's output, as bytes"""
+        self.git.metrics.count('subprocesses')
+        process = subprocess.Popen(['git'] + args, cwd=self.repo_path,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            yield from process.stdout
+        finally:
+            process.stdout.close()
+            process.wait()
+    
+    def generic_lines_added(self, runs, target_file, pattern):
+        """Counters of the generic template lines the runs' commits added to the target
+        file, and of those it already held before the first run"""
+        written, existing = Counter(), Counter()
+        for run in runs:
+            if not run.get('end_commit'):
+                continue
+            args = ['log', '--no-color', '--no-ext-diff', '--format=', '-p', '-U0',
+                    run['end_commit']]
+            if run.get('start_commit'):
+                args.append(f"^{run['start_commit']}")
+            for line in self._git_lines(args + ['--', target_file]):
+                if line.startswith(b'+') and not line.startswith(b'+++'):
+                    key = generic_line(line[1:], pattern)
+                    if key:
+                        written[key] += 1
+        start = runs[0].get('start_commit')
+        if start:
+            for line in self._git_lines(['cat-file', 'blob', f"{start}:{target_file}"]):
+                key = generic_line(line, pattern)
+                if key:
+                    existing[key] += 1
+        return written, existing
+    
+    def clean_ring_region(self, file_path, target_file):
+        """Remove the fixed-size ring region written by the 'ring' content strategy"""
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            # Same temp-file and rename path as the marker cleaner, so an interruption
+            # leaves the original file intact
+            with atomic_output(file_path) as f:
+                f.write(strip_ring_region(content))
+            self.say(f"✅ Ring region removed from: {target_file}")
+            return True
+        except Exception as e:
+            return self.fail(f"❌ Error cleaning file {target_file}: {e}")
+    
+    def clean_shard_files(self, strategy):
+        """Delete the shard files created by the 'shard' content strategy"""
+        created = strategy.get('created_files', [])
+        if not created:
+            self.say("✅ No shard files were created by automation")
+            return True
+        
+        # Unstage them first so a soft reset does not leave them in the index
+        self.run_git_command(['rm', '--cached', '-q', '--ignore-unmatch', '--'] + created)
+        for path in created:
+            file_path = os.path.join(self.repo_path, path)
+            try:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                    self.say(f"✅ Removed shard file: {path}")
+            except OSError as e:
+                return self.fail(f"❌ Error removing shard file {path}: {e}")
+        return True
     
     def remove_automation_log(self):
-        """Remove the automation log file"""
+        """Remove the automation log file (and any interrupted run's journal)"""
         try:
+            self.sync_ledger()
+            if self.journal.exists():
+                self.journal.discard()
+                self.say("✅ Removed run journal")
             if os.path.exists(self.commit_log_file):
                 os.remove(self.commit_log_file)
-                print(f"✅ Removed automation log: {os.path.basename(self.commit_log_file)}")
+                self.say(f"✅ Removed automation log: {os.path.basename(self.commit_log_file)}")
                 return True
             return True
         except Exception as e:
-            print(f"❌ Error removing automation log: {e}")
-            return False
+            return self.fail(f"❌ Error removing automation log: {e}")
     
-    def interactive_removal(self):
-        """Interactive commit removal process"""
-        print("🔍 Checking repository status...")
+    def maintain_after_removal(self, interactive=True):
+        """Repack, prune and rewrite the commit-graph once commits have been removed
         
-        if not self.run_git_command("git status")[0]:
-            print("❌ Not in a git repository or git not configured")
-            return False
-        
-        # Load automation log
-        log_data = self.load_automation_log()
-        if not log_data:
-            return False
-        
-        print(f"\n🎯 Removal Options:")
-        print("1. Safe removal (soft reset - preserves working directory)")
-        print("2. Complete removal (hard reset - removes all changes)")
-        print("3. Clean file only (remove automation comments)")  
-        print("4. Cancel")
+        Removed commits stay reachable from reflogs (and the surgical rewrite's
+        backup ref); with `expire_reflog` set, or when the confirm callback
+        agrees (interactive only), they are let go so their objects are deleted now.
+        """
+        if self.maintenance == 'never':
+            return None
+        removed = self.metrics.counters['commits_removed']
+        maintenance = RepositoryMaintenance(self.git, self.maintenance)
+        expire = self.expire_reflog
+        if (not expire and interactive and self.confirm and
+                maintenance.should_run(removed, object_stats(self.git))):
+            expire = self.confirm('expire_reflog', "🧹 Also expire reflog entries (and the rewrite "
+                                  "backup) so the removed commits are deleted now? (y/N): ")
+        if expire:
+            self.git.run(['update-ref', '-d', BACKUP_REF], quiet=True)
+        return maintenance.after_removal(removed, expire_reflog=expire)
+    
+    def run_removal(self, mode, log_data=None, run_id=None, push=False):
+        """Remove a run in one of REMOVAL_MODES; returns success.
         
-        choice = input("\nSelect option (1-4): ").strip()
+        The run is `log_data` if given, else ledger run `run_id`, else the
+        latest run. A successful soft removal also cleans the target file;
+        every removal then retires the log and runs the maintenance stage.
+        push force-pushes the result.
+        """
+        if mode not in REMOVAL_MODES:
+            return self.fail(f"❌ Unknown removal mode '{mode}'")
+        if log_data is None:
+            if not self.git.is_repository():
+                return self.fail("❌ Not in a git repository or git not configured")
+            if run_id is None:
+                log_data = self.load_automation_log()
+            else:
+                if self.scan:
+                    self.scan_history()
+                log_data = self.load_run(run_id)
+            if not log_data:
+                return False
+        self.old_head = self.git.resolve('HEAD^{commit}')
         
-        if choice == "1":
-            print("\n🛡️  SAFE REMOVAL MODE")
-            print("This will remove commits but preserve your working directory changes.")
-            confirm = input("Continue? (y/N): ")
-            if confirm.lower() == 'y':
-                success = self.remove_automation_commits_safe(log_data)
-                if success:
-                    # Also clean the file
-                    self.clean_target_file(log_data)
-                    self.remove_automation_log()
-                return success
-                
-        elif choice == "2":
-            print("\n⚠️  COMPLETE REMOVAL MODE")
-            print("🚨 WARNING: This will permanently delete ALL changes!")
-            print("🚨 This includes any work you may have done after automation!")
-            print("🚨 Make sure you have a backup!")
-            confirm = input("Continue? (y/N): ")
-            if confirm.lower() == 'y':
-                success = self.remove_automation_commits_hard(log_data)
-                if success:
-                    self.remove_automation_log()
-                return success
-                
-        elif choice == "3":
-            print("\n🧹 FILE CLEANING MODE")
-            print("This will only remove automation comments from the target file.")
-            confirm = input("Continue? (y/N): ")
-            if confirm.lower() == 'y':
-                success = self.clean_target_file(log_data)
-                if success:
-                    print("✅ File cleaned successfully")
-                return success
-                
-        elif choice == "4":
-            print("❌ Operation cancelled")
-            return False
-            
+        if mode == 'clean':
+            success = self.clean_target_file(log_data)
         else:
-            print("❌ Invalid choice")
-            return False
-            
+            remove = {'soft': self.remove_automation_commits_safe,
+                      'hard': self.remove_automation_commits_hard,
+                      'surgical': self.remove_automation_commits_surgical}[mode]
+            success = remove(log_data)
+            if success:
+                # Without a working tree the branch move alone took the lines away
+                if mode == 'soft' and self.git.has_worktree():
+                    self.clean_target_file(log_data)
+                self.remove_automation_log()
+                self.maintain_after_removal()
+        self.new_head = self.git.resolve('HEAD^{commit}')
+        if success and push and self.new_head != self.old_head:
+            self.pushed = self.force_push()
+        return success
+    
+    def force_push(self):
+        """Force push the branch to its upstream; returns success"""
+        target = upstream(self.git)
+        if target is None:
+            return self.fail("❌ No remote to push to")
+        remote, branch = target
+        self.say(f"⚠️  Force pushing to {remote}/{branch}...")
+        if push_commit(self.git, remote, branch, self.git.resolve('HEAD^{commit}'), force=True):
+            self.say("✅ Force push completed!")
+            return True
+        self.say("❌ Force push failed. Try manually:")
+        self.say(f"  git push --force {remote} HEAD:{branch}")
         return False
     
     def show_commit_history(self, limit=10):
         """Show recent commit history"""
-        print(f"\n📝 Recent commit history (last {limit} commits):")
-        success, output = self.run_git_command(f"git log --oneline -n {limit}")
+        self.say(f"\n📝 Recent commit history (last {limit} commits):")
+        success, output = self.run_git_command(['log', '--format=%H %s', '-n', str(limit)])
         if success:
-            print(output)
+            commits = [line.partition(' ')[::2] for line in output.splitlines()]
+            automated = self.ledger.lookup_many([sha for sha, subject in commits])
+            for sha, subject in commits:
+                marker = f"  🤖 run #{automated[sha][0]}" if sha in automated else ""
+                self.say(f"{sha[:7]} {subject}{marker}")
         else:
-            print("Could not retrieve commit history")
+            self.say("Could not retrieve commit history")
 
-def get_repo_info():
-    """Get repository path and check if it's a git repository"""
-    repo_path = os.getcwd()
+def remove(config, progress=None, confirm=None, metrics=None):
+    """Run the removal a RemoveConfig describes; returns a RemoveResult.
     
-    # Check if we're in a git repository
-    if not os.path.exists(os.path.join(repo_path, '.git')):
-        print("❌ Error: Current directory is not a git repository!")
-        print("Please run this script from inside a git repository.")
-        return None
+    progress receives Progress events; confirm(key, prompt), if given, is
+    asked before a hard reset and before expiring reflogs. Without them
+    nothing is printed or asked. Errors, including unexpected exceptions,
+    end up in result.error.
+    """
+    started = time.monotonic()
+    remover = GitCommitRemover(config.repo_path, progress=progress_reporter(progress),
+                               confirm=confirm, metrics=metrics)
+    remover.maintenance = config.maintenance
+    remover.expire_reflog = config.expire_reflog
+    remover.scan = config.scan
+    result = RemoveResult(False, config.repo_path, config.mode, run_id=config.run_id)
+    lock = RepositoryLock(remover.git.git_dir(), 'remove_commits')
+    try:
+        if remover.git.is_repository() and not lock.acquire(config.lock_wait):
+            remover.fail(lock.busy_message())
+        else:
+            if lock.broken:
+                remover.say(f"🔓 Removed a stale lock left by {lock.describe(lock.broken)}")
+            result.success = remover.run_removal(config.mode, run_id=config.run_id,
+                                                 push=config.push)
+    except Exception as e:
+        remover.fail(f"❌ {type(e).__name__}: {e}")
+    finally:
+        lock.release()
     
-    return repo_path
+    counters = remover.metrics.counters
+    result.old_head = remover.old_head
+    result.new_head = remover.new_head
+    result.removed = counters['commits_removed']
+    result.replayed = counters['commits_replayed']
+    result.marker_lines_removed = counters['marker_lines_removed']
+    result.pushed = remover.pushed
+    result.error = remover.error
+    result.seconds = round(time.monotonic() - started, 3)
+    result.metrics = remover.metrics.summary()
+    return result
 
-def main():
-    print("🗑️  GitHub Commit Remover")
-    print("=" * 50)
+def select_ledger_run(remover, log_data):
+    """With several recorded runs, let the user pick which one to remove back to"""
+    runs = remover.ledger.runs()
+    if len(runs) < 2:
+        return log_data
+    print(f"\n📚 The automation ledger holds {len(runs)} runs:")
+    for run in runs:
+        print(f"  #{run['run_id']}: {run.get('date_range', 'Unknown')}, "
+              f"{run.get('total_commits', 0)} commits, created {run.get('created_at', '?')}")
+    choice = input(f"Run to remove (Enter for the latest, #{runs[-1]['run_id']}): ").strip()
+    if not choice:
+        return log_data
+    if not choice.lstrip('#').isdigit():
+        print("Unknown run; using the latest")
+        return log_data
+    return remover.load_run(int(choice.lstrip('#'))) or log_data
+
+REMOVAL_MENU = (
+    ('soft', "Safe removal (soft reset - preserves working directory)",
+     "\n🛡️  SAFE REMOVAL MODE",
+     ("This will remove commits but preserve your working directory changes.",)),
+    ('hard', "Complete removal (hard reset - removes all changes)",
+     "\n⚠️  COMPLETE REMOVAL MODE",
+     ("🚨 WARNING: This will permanently delete ALL changes!",
+      "🚨 This includes any work you may have done after automation!",
+      "🚨 Make sure you have a backup!")),
+    ('clean', "Clean file only (remove automation comments)",
+     "\n🧹 FILE CLEANING MODE",
+     ("This will only remove automation comments from the target file.",)),
+    ('surgical', "Surgical removal (rewrite history, keeps commits made in between)",
+     "\n🔪 SURGICAL REMOVAL MODE",
+     ("This rewrites the branch from the run's start commit, dropping only",
+      "automation commits. Later commits get new hashes but keep their dates.")),
+)
+
+def interactive_removal(remover):
+    """Interactive commit removal process"""
+    print("🔍 Checking repository status...")
     
-    # Get repository information
-    repo_path = get_repo_info()
-    if repo_path is None:
-        return
+    if not remover.git.is_repository():
+        print("❌ Not in a git repository or git not configured")
+        return False
     
-    print(f"Repository: {repo_path}")
-    print("=" * 50)
+    # Load automation log
+    log_data = remover.load_automation_log()
+    if not log_data:
+        return False
+    log_data = select_ledger_run(remover, log_data)
+    
+    print(f"\n🎯 Removal Options:")
+    for number, (mode, label, title, warnings) in enumerate(REMOVAL_MENU, 1):
+        print(f"{number}. {label}")
+    print(f"{len(REMOVAL_MENU) + 1}. Cancel")
+    
+    choice = input(f"\nSelect option (1-{len(REMOVAL_MENU) + 1}): ").strip()
+    if choice == str(len(REMOVAL_MENU) + 1):
+        print("❌ Operation cancelled")
+        return False
+    if not choice.isdigit() or not 1 <= int(choice) <= len(REMOVAL_MENU):
+        print("❌ Invalid choice")
+        return False
+    
+    mode, label, title, warnings = REMOVAL_MENU[int(choice) - 1]
+    print(title)
+    for line in warnings:
+        print(line)
+    if input("Continue? (y/N): ").lower() != 'y':
+        return False
+    success = remover.run_removal(mode, log_data)
+    if success and mode == 'clean':
+        print("✅ File cleaned successfully")
+    return success
+
+def get_repo_info(git_dir=None):
+    """Get repository path and check if it's a git repository"""
+    # Use the --git-dir (a bare repository or git directory) or the current directory
+    repo_path = repository_at(git_dir or os.getcwd())
     
-    remover = GitCommitRemover(repo_path)
+    # Check if we're in a git repository
+    if repo_path is None:
+        if git_dir:
+            print(f"❌ Error: {git_dir} is not a git directory or bare repository!")
+        else:
+            print("❌ Error: Current directory is not a git repository!")
+            print("Please run this script from the top of a git repository, or pass --git-dir.")
+        return None
     
+    return repo_path
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Remove automated commits created by create_commits.py.")
+    parser.add_argument('--git-dir', metavar='PATH',
+                        help="run against a bare repository or git directory instead of the "
+                             "current checkout; removal then only moves refs")
+    parser.add_argument('--maintenance', choices=POLICIES, default='auto',
+                        help="repack, prune and rewrite the commit-graph after removal: "
+                             "'auto' (default) skips small removals, 'always' or 'never'")
+    parser.add_argument('--scan', action='store_true',
+                        help="rebuild run metadata from the branch history (for a missing or "
+                             "overwritten automation log) and add the runs to the ledger")
+    parser.add_argument('--lock-wait', type=float, default=0, metavar='SECONDS',
+                        help="wait this long for a repository another run has locked "
+                             "(default: fail at once)")
+    add_instrumentation_args(parser)
+    return parser.parse_args(argv)
+
+def remove_interactively(remover, args, repo_path):
+    """The terminal session: history, removal menu and optional force push"""
     # Show current status
     remover.show_commit_history()
     
     print("\nThis tool will help you remove automated commits created by create_commits.py")
     print("⚠️  Always make sure you have a backup before removing commits!")
     
-    success = remover.interactive_removal()
+    labels = {'script': 'remove_commits', 'repo': os.path.basename(repo_path)}
+    success = run_instrumented(remover.metrics, args, labels, interactive_removal, remover)
     
     if success:
         print("\n🎉 COMMIT REMOVAL COMPLETED!")
         print("🔄 Your repository has been cleaned up.")
         
         # Ask about pushing changes
-        push_response = input("\n🚀 Do you want to force push to remote? (y/N): ")
-        if push_response.lower() == 'y':
-            print("⚠️  Force pushing to remote repository...")
+        if terminal_confirm('push', "\n🚀 Do you want to force push to remote? (y/N): "):
             print("🚨 This will rewrite remote history!")
-            
-            final_confirm = input("Type 'FORCE PUSH' to confirm: ")
-            if final_confirm == 'FORCE PUSH':
-                if remover.run_git_command("git push --force origin main")[0]:
-                    print("✅ Force push completed!")
-                elif remover.run_git_command("git push --force origin master")[0]:
-                    print("✅ Force push completed!")
-                else:
-                    print("❌ Force push failed. Try manually:")
-                    print("  git push --force origin main")
-                    print("  git push --force origin master")
+            if terminal_confirm('force_push', "Type 'FORCE PUSH' to confirm: "):
+                remover.force_push()
             else:
                 print("Force push cancelled.")
         
@@ -315,5 +717,34 @@ def main():
     else:
         print("\n❌ Commit removal was not completed.")
 
+def main(argv=None):
+    args = parse_args(argv)
+    
+    print("🗑️  GitHub Commit Remover")
+    print("=" * 50)
+    
+    # Get repository information
+    repo_path = get_repo_info(args.git_dir)
+    if repo_path is None:
+        return
+    
+    print(f"Repository: {repo_path}")
+    print("=" * 50)
+    
+    remover = GitCommitRemover(repo_path, confirm=terminal_confirm)
+    remover.maintenance = args.maintenance
+    remover.scan = args.scan
+    
+    lock = RepositoryLock(remover.git.git_dir(), 'remove_commits')
+    if not lock.acquire(args.lock_wait):
+        print(lock.busy_message())
+        return
+    if lock.broken:
+        print(f"🔓 Removed a stale lock left by {lock.describe(lock.broken)}")
+    try:
+        remove_interactively(remover, args, repo_path)
+    finally:
+        lock.release()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,181 @@
+"""
+Repository lock
+Advisory lock that keeps two automation runs (a create and a remove, or two
+creates) off the same repository at once. The lock is a small JSON file in the
+git directory naming its holder; a lock left behind by a process that died is
+noticed and broken, so a crash never blocks a repository for good.
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # No flock on Windows; lock files are still created exclusively
+    fcntl = None
+
+LOCK_FILE = 'automation.lock'
+GUARD_FILE = 'automation.lock.guard'
+POLL_INTERVAL = 0.5
+# A lock from another host cannot be probed; after this long its holder is presumed gone
+STALE_AFTER = 24 * 3600
+# A lock file with no readable holder is only broken once its writer had time to finish
+UNREADABLE_GRACE = 5.0
+
+# Locks this process holds, by (path, owner), with their nesting depth: create()
+# inside a queue drain takes the lock the drain already holds in the same thread.
+# Another thread or asyncio task of this process waits like any other runner.
+_held = {}
+
+
+def lock_owner():
+    """The thread, and the asyncio task running in it if any, taking a lock"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:        # no event loop running in this thread
+        task = None
+    return threading.get_ident(), task
+
+
+def process_alive(pid):
+    """Whether a process with this pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class RepositoryLock:
+    """The lock file of one git directory.
+
+    acquire(wait) returns whether the lock was taken, waiting up to `wait`
+    seconds for another holder; release() gives it back. Locks nest within the
+    thread (or asyncio task) holding them. After a failed acquire, `holder`
+    describes who has it.
+    """
+
+    def __init__(self, git_dir, operation):
+        self.git_dir = git_dir
+        self.path = os.path.join(git_dir, LOCK_FILE)
+        self.operation = operation
+        self.holder = None
+        self.broken = None          # the stale holder replaced by the last acquire
+        self._acquired = False
+        self._key = None
+
+    def _guard(self):
+        """Serialise lock checks between processes where flock exists; returns the open guard"""
+        if fcntl is None:
+            return None
+        guard = open(os.path.join(self.git_dir, GUARD_FILE), 'a')
+        fcntl.flock(guard, fcntl.LOCK_EX)
+        return guard
+
+    def read(self):
+        """The current holder's record, {} if the file is unreadable, None if unlocked"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def is_stale(self, holder):
+        """Whether a holder record belongs to a process that is gone"""
+        try:
+            age = time.time() - os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return True
+        if not holder:
+            return age > UNREADABLE_GRACE
+        if holder.get('host') == socket.gethostname():
+            pid = holder.get('pid')
+            return not (isinstance(pid, int) and pid > 0 and process_alive(pid))
+        return age > STALE_AFTER
+
+    def _try_acquire(self):
+        guard = self._guard()
+        try:
+            flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            try:
+                fd = os.open(self.path, flags, 0o644)
+            except FileExistsError:
+                holder = self.read()
+                if holder is None or not self.is_stale(holder):
+                    self.holder = holder
+                    return False
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+                self.broken = holder
+                try:
+                    fd = os.open(self.path, flags, 0o644)
+                except FileExistsError:
+                    self.holder = self.read()
+                    return False
+            record = {'pid': os.getpid(), 'host': socket.gethostname(),
+                      'operation': self.operation, 'started_at': datetime.now().isoformat()}
+            with os.fdopen(fd, 'w') as f:
+                json.dump(record, f)
+                f.flush()
+                os.fsync(f.fileno())
+            return True
+        finally:
+            if guard is not None:
+                guard.close()
+
+    def acquire(self, wait=0):
+        """Take the lock, waiting up to `wait` seconds; returns success"""
+        if self._acquired:
+            return True
+        key = (self.path, lock_owner())
+        if _held.get(key):
+            _held[key] += 1
+            self._key = key
+            self._acquired = True
+            return True
+        deadline = time.monotonic() + (wait or 0)
+        while not self._try_acquire():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+        _held[key] = 1
+        self._key = key
+        self._acquired = True
+        self.holder = None
+        return True
+
+    def release(self):
+        if not self._acquired:
+            return
+        self._acquired = False
+        _held[self._key] -= 1
+        if _held[self._key]:
+            return
+        del _held[self._key]
+        holder = self.read()
+        if holder and holder.get('pid') == os.getpid() and holder.get('host') == socket.gethostname():
+            os.unlink(self.path)
+
+    def describe(self, holder=None):
+        """One line naming a lock holder"""
+        holder = self.holder if holder is None else holder
+        if not holder:
+            return "an unknown process"
+        return (f"{holder.get('operation', 'unknown')} (pid {holder.get('pid', '?')} on "
+                f"{holder.get('host', '?')}, since {holder.get('started_at', '?')})")
+
+    def busy_message(self):
+        return (f"❌ Repository is locked by {self.describe()}; "
+                f"wait for it to finish or remove {self.path} if that process is gone")
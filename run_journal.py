@@ -0,0 +1,108 @@
+"""
+Run journal
+Append-only record of a generation run kept in the git directory, so an
+interrupted run can be resumed (or removed) from its last durable point.
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+
+from commit_plan import CommitPlan
+
+JOURNAL_FILE = 'automation-journal.jsonl'
+PLAN_FILE = 'automation-journal.plan'
+
+# Journal lines are flushed as they are written, which survives Ctrl-C and
+# killed processes; fsync (power loss) is coalesced to at most once per interval.
+SYNC_INTERVAL = 1.0
+# In-memory backends make their work durable (pack + ref move) this often
+CHECKPOINT_INTERVAL = 5.0
+
+
+class RunJournal:
+    """One `start` record followed by `progress` records, as JSON lines.
+
+    A progress record names the next plan position, the commit the branch
+    points at once every earlier row is done, the running totals and the
+    content strategy state needed to continue from there. A `pending` record
+    holds the same for a per-commit run's next commit, written just before it
+    is made, so a commit whose progress record never got written is not lost.
+    """
+
+    def __init__(self, git_dir, sync_interval=SYNC_INTERVAL,
+                 checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.path = os.path.join(git_dir, JOURNAL_FILE)
+        self.plan_path = os.path.join(git_dir, PLAN_FILE)
+        self.sync_interval = sync_interval
+        self.checkpoint_interval = checkpoint_interval
+        self._file = None
+        self._last_sync = 0.0
+        self._last_checkpoint = time.monotonic()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def begin(self, plan, **run):
+        """Start a new journal (replacing any old one) for a run of `plan`"""
+        plan.save(self.plan_path)
+        self._file = open(self.path, 'w')
+        self.record('start', durable=True, created_at=datetime.now().isoformat(), **run)
+
+    def reopen(self):
+        """Continue appending to an existing journal"""
+        self._file = open(self.path, 'a')
+        self._last_checkpoint = time.monotonic()
+
+    def record(self, event, durable=False, **fields):
+        """Append one record; fsync when durable or when the sync interval has passed"""
+        fields['event'] = event
+        self._file.write(json.dumps(fields, sort_keys=True) + '\n')
+        self._file.flush()
+        now = time.monotonic()
+        if durable or now - self._last_sync >= self.sync_interval:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+        if event == 'progress' and durable:
+            self._last_checkpoint = now
+
+    def checkpoint_due(self):
+        """Whether an in-memory backend should make its work durable now"""
+        return time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+
+    def load(self):
+        """Return {'start', 'progress', 'pending', 'plan'} for the journaled run, or None"""
+        if not self.exists():
+            return None
+        start = progress = pending = None
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final line from an interrupted write
+                if record.get('event') == 'start':
+                    start = record
+                elif record.get('event') == 'progress':
+                    progress, pending = record, None
+                elif record.get('event') == 'pending':
+                    pending = record
+        if start is None:
+            return None
+        plan = CommitPlan.load(self.plan_path) if os.path.exists(self.plan_path) else None
+        return {'start': start, 'progress': progress, 'pending': pending, 'plan': plan}
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def discard(self):
+        """Remove the journal and its plan once the run is complete or undone"""
+        if self._file and not self._file.closed:
+            self._file.close()
+        for path in (self.path, self.plan_path):
+            if os.path.exists(path):
+                os.remove(path)
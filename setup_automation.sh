@@ -24,12 +24,17 @@ fi
 # Get the directory where this script is located
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
+# Support modules imported by the automation scripts
+SUPPORT_MODULES="fast_import.py git_plumbing.py pack_writer.py commit_plan.py content_strategy.py batch_runner.py async_runner.py run_journal.py automation_ledger.py file_discovery.py markers.py history_rewrite.py instrumentation.py maintenance.py large_repo.py automation_api.py push_pipeline.py content_generator.py history_scan.py repo_lock.py job_queue.py estimator.py activity_histogram.py"
+
 # Check if automation scripts exist
-if [ ! -f "$SCRIPT_DIR/create_commits.py" ] || [ ! -f "$SCRIPT_DIR/remove_commits.py" ]; then
-    echo -e "${RED}❌ Error: Automation scripts not found!${NC}"
-    echo "Please make sure create_commits.py and remove_commits.py are in the same directory as this script."
-    exit 1
-fi
+for script in create_commits.py remove_commits.py $SUPPORT_MODULES; do
+    if [ ! -f "$SCRIPT_DIR/$script" ]; then
+        echo -e "${RED}❌ Error: Automation scripts not found!${NC}"
+        echo "Please make sure $script is in the same directory as this script."
+        exit 1
+    fi
+done
 
 # Current repository path
 REPO_PATH=$(pwd)
@@ -40,6 +45,9 @@ echo -e "${YELLOW}📋 Copying automation scripts...${NC}"
 
 cp "$SCRIPT_DIR/create_commits.py" ./
 cp "$SCRIPT_DIR/remove_commits.py" ./
+for module in $SUPPORT_MODULES; do
+    cp "$SCRIPT_DIR/$module" ./
+done
 
 # Make scripts executable
 chmod +x create_commits.py remove_commits.py
@@ -0,0 +1,70 @@
+"""Shared fixtures: throwaway git repositories with a fixed identity and dates"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Fixed dates for the commits the tests make themselves, so two repositories
+# built the same way start from the same commit
+FIXED_DATE = '2020-01-01T00:00:00 +0000'
+
+
+def git(repo, *args, check=True):
+    """Run git in `repo`; returns its stripped stdout"""
+    env = dict(os.environ, GIT_AUTHOR_DATE=FIXED_DATE, GIT_COMMITTER_DATE=FIXED_DATE)
+    result = subprocess.run(['git', *args], cwd=repo, env=env, capture_output=True, text=True)
+    if check and result.returncode != 0:
+        raise AssertionError(f"git {' '.join(args)} failed: {result.stderr}")
+    return result.stdout.strip()
+
+
+def commit_file(repo, path, content, message):
+    """Write a file and commit it"""
+    with open(os.path.join(repo, path), 'w') as f:
+        f.write(content)
+    git(repo, 'add', '--', path)
+    git(repo, 'commit', '-q', '-m', message)
+
+
+def interrupt_after(monkeypatch, cls, name, calls, before=False):
+    """Make cls.name raise KeyboardInterrupt on its `calls`-th call, before or after running"""
+    original = getattr(cls, name)
+    seen = [0]
+
+    def interrupted(self, *args, **kwargs):
+        seen[0] += 1
+        if seen[0] == calls and before:
+            raise KeyboardInterrupt
+        result = original(self, *args, **kwargs)
+        if seen[0] == calls:
+            raise KeyboardInterrupt
+        return result
+    monkeypatch.setattr(cls, name, interrupted)
+
+
+@pytest.fixture
+def make_repo(tmp_path):
+    """Factory for repositories holding one committed notes.txt"""
+    count = [0]
+
+    def make(content='# Notes\n'):
+        count[0] += 1
+        repo = str(tmp_path / f"repo{count[0]}")
+        os.makedirs(repo)
+        git(repo, 'init', '-q')
+        git(repo, 'symbolic-ref', 'HEAD', 'refs/heads/main')
+        git(repo, 'config', 'user.name', 'Test User')
+        git(repo, 'config', 'user.email', 'test@example.com')
+        git(repo, 'config', 'commit.gpgsign', 'false')
+        commit_file(repo, 'notes.txt', content, 'Initial commit')
+        return repo
+    return make
+
+
+@pytest.fixture
+def repo(make_repo):
+    return make_repo()
@@ -0,0 +1,102 @@
+"""Per-day activity histogram, its cache, and the deficit planner"""
+
+import os
+import subprocess
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from activity_histogram import ActivityHistogram
+from automation_api import CreateConfig
+from commit_plan import build_plan
+from create_commits import create
+from git_plumbing import GitExecutor
+from conftest import git
+
+AUTHOR = 'test@example.com'
+
+
+def commit_on(repo, date, count=1, email=AUTHOR):
+    """Empty commits at noon on a day, by `email`"""
+    env = dict(os.environ, GIT_AUTHOR_DATE=f"{date}T12:00:00",
+               GIT_COMMITTER_DATE=f"{date}T12:00:00", GIT_AUTHOR_EMAIL=email)
+    for number in range(count):
+        subprocess.run(['git', 'commit', '-q', '--allow-empty', '-m', f"Work {date} {number}"],
+                       cwd=repo, env=env, check=True)
+
+
+def wall_day(date):
+    return datetime.strptime(date, '%Y-%m-%d').toordinal() - datetime(1970, 1, 1).toordinal()
+
+
+def histogram(repo):
+    return ActivityHistogram(GitExecutor(repo))
+
+
+def test_counts_only_the_configured_author(repo):
+    commit_on(repo, '2024-02-01', 3)
+    commit_on(repo, '2024-02-01', 2, email='someone@else.org')
+    commit_on(repo, '2024-02-03')
+    counts = histogram(repo).counts()
+    assert counts[wall_day('2024-02-01')] == 3
+    assert counts[wall_day('2024-02-03')] == 1
+
+
+def test_cache_is_reused_extended_and_rebuilt(repo):
+    commit_on(repo, '2024-02-01', 3)
+    first = histogram(repo)
+    counts = first.counts()
+    assert first.mode == 'full'
+
+    cached = histogram(repo)
+    assert cached.counts() == counts and cached.mode == 'cached' and cached.read == 0
+
+    # HEAD moves forward: only the new commits are read
+    commit_on(repo, '2024-02-02', 2)
+    extended = histogram(repo)
+    counts = extended.counts()
+    assert extended.mode == 'incremental' and extended.read == 2
+    assert counts[wall_day('2024-02-02')] == 2
+
+    # A rewrite that is not a fast-forward counts everything again
+    git(repo, 'reset', '-q', '--hard', 'HEAD~3')
+    commit_on(repo, '2024-02-05')
+    rebuilt = histogram(repo)
+    counts = rebuilt.counts()
+    assert rebuilt.mode == 'full'
+    assert counts[wall_day('2024-02-01')] == 2
+    assert wall_day('2024-02-02') not in counts
+    assert counts[wall_day('2024-02-05')] == 1
+
+
+def test_read_only_histogram_leaves_no_cache(repo):
+    git_dir = git(repo, 'rev-parse', '--absolute-git-dir')
+    counter = ActivityHistogram(GitExecutor(repo), read_only=True)
+    counter.counts()
+    assert not os.path.exists(counter.path)
+    assert counter.path.startswith(git_dir)
+
+
+@pytest.mark.parametrize('backend', ['worktree', 'fast-import'])
+def test_deficit_planner_adds_only_what_each_day_is_missing(make_repo, backend):
+    repo = make_repo()
+    start, end = datetime(2024, 3, 4), datetime(2024, 3, 10)
+    plan = build_plan(start, end, seed=21)
+    target = Counter(datetime.utcfromtimestamp(timestamp // 86400 * 86400).strftime('%Y-%m-%d')
+                     for timestamp in plan.timestamps)
+    busy, light = sorted(target)[:2]
+    commit_on(repo, busy, target[busy] + 2)             # already more than planned
+    commit_on(repo, light, 1)
+    commit_on(repo, light, 5, email='someone@else.org')  # not the configured author
+    before = Counter(git(repo, 'log', f"--author=<{AUTHOR}>", '--format=%ad',
+                         '--date=short').splitlines())
+
+    result = create(CreateConfig(repo, 'notes.txt', plan=plan, backend=backend,
+                                 planner='deficit'))
+    assert result.success, result.error
+    after = Counter(git(repo, 'log', f"--author=<{AUTHOR}>", '--format=%ad',
+                        '--date=short').splitlines())
+    for day, count in target.items():
+        assert after[day] == max(count, before[day]), day
+    assert result.commits == sum(max(0, count - before[day]) for day, count in target.items())
@@ -0,0 +1,63 @@
+"""Running jobs for several repositories on one event loop"""
+
+import json
+import asyncio
+import threading
+
+import async_runner
+from async_runner import run_repository
+from batch_runner import load_jobs
+from conftest import git
+
+
+def jobs_for(tmp_path, repos):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps([{'repo': repo, 'target_file': 'notes.txt',
+                                 'start_date': '2024-02-01', 'end_date': '2024-02-10',
+                                 'seed': 9, 'maintenance': 'never'} for repo in repos]))
+    return load_jobs(str(path))
+
+
+def test_two_repositories_run_at_once(make_repo, tmp_path, monkeypatch):
+    repos = [make_repo(), make_repo()]
+    jobs = jobs_for(tmp_path, repos)
+    loop_threads, probe_threads = [], []
+    original = async_runner.repository_at
+
+    def repository_at(path):
+        probe_threads.append(threading.get_ident())
+        return original(path)
+    monkeypatch.setattr(async_runner, 'repository_at', repository_at)
+
+    async def run_both():
+        loop_threads.append(threading.get_ident())
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(*(run_repository(repo, [job], semaphore)
+                                      for repo, job in zip(repos, jobs)))
+
+    results = asyncio.run(run_both())
+    assert [len(group) for group in results] == [1, 1]
+    for repo, (result,) in zip(repos, results):
+        assert result['success'], result.get('error')
+        assert result['total_commits'] > 0
+        assert int(git(repo, 'rev-list', '--count', 'HEAD')) == result['total_commits'] + 1
+        git(repo, 'fsck', '--strict', '--no-dangling')
+    # The same seeded plan gives both repositories the same history
+    assert git(repos[0], 'rev-parse', 'HEAD') == git(repos[1], 'rev-parse', 'HEAD')
+    # The repository probe ran in the executor, not on the loop
+    assert len(probe_threads) == 2 and loop_threads[0] not in probe_threads
+
+
+def test_missing_repository_fails_its_jobs_only(make_repo, tmp_path):
+    repo = make_repo()
+    missing = str(tmp_path / 'missing')
+    jobs = jobs_for(tmp_path, [repo, missing])
+
+    async def run_both():
+        semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(run_repository(repo, [jobs[0]], semaphore),
+                                    run_repository(missing, [jobs[1]], semaphore))
+
+    (ok,), (failed,) = asyncio.run(run_both())
+    assert ok['success']
+    assert not failed['success'] and failed['error'] == 'not a git repository'
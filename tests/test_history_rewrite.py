@@ -0,0 +1,62 @@
+"""Surgical removal: dropping automation commits while keeping everything else"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from automation_api import CreateConfig, RemoveConfig
+from automation_ledger import INDEX_FILE, LEDGER_FILE
+from create_commits import create
+from history_rewrite import BACKUP_REF
+from remove_commits import remove
+from conftest import commit_file, git
+
+ORIGINAL = "# Notes\n"
+
+
+def subjects(repo):
+    return git(repo, 'log', '--reverse', '--format=%s').splitlines()
+
+
+@pytest.fixture
+def mixed_repo(make_repo):
+    """Manual commits before and after one automation run"""
+    repo = make_repo(ORIGINAL)
+    commit_file(repo, 'other.txt', 'one\n', 'Manual change one')
+    result = create(CreateConfig(repo, 'notes.txt', datetime(2024, 6, 1), datetime(2024, 6, 8),
+                                 backend='fast-import', seed=5))
+    assert result.success, result.error
+    commit_file(repo, 'other.txt', 'one\ntwo\n', 'Manual change two')
+    commit_file(repo, 'README', 'readme\n', 'Add readme')
+    return repo, result.commits
+
+
+@pytest.mark.parametrize('match', ['ledger', 'signature'])
+def test_surgical_removal_keeps_other_commits(mixed_repo, match):
+    repo, created = mixed_repo
+    git_dir = git(repo, 'rev-parse', '--absolute-git-dir')
+    if match == 'signature':
+        for name in (LEDGER_FILE, INDEX_FILE):
+            os.remove(os.path.join(git_dir, name))
+    old_head = git(repo, 'rev-parse', 'HEAD')
+
+    result = remove(RemoveConfig(repo, mode='surgical', maintenance='never'))
+
+    assert result.success, result.error
+    assert (result.removed, result.replayed) == (created, 2)
+    assert subjects(repo) == ['Initial commit', 'Manual change one', 'Manual change two',
+                              'Add readme']
+    assert git(repo, 'show', 'HEAD:notes.txt') + '\n' == ORIGINAL
+    assert git(repo, 'show', 'HEAD:other.txt') == 'one\ntwo'
+    assert git(repo, 'rev-parse', BACKUP_REF) == old_head
+    assert git(repo, 'status', '--porcelain', '--untracked-files=no') == ''
+    git(repo, 'fsck', '--strict', '--no-dangling')
+
+
+def test_surgical_removal_keeps_commits_before_the_run(mixed_repo):
+    repo, _ = mixed_repo
+    before = git(repo, 'rev-parse', ':/Manual change one')
+    assert remove(RemoveConfig(repo, mode='surgical', maintenance='never')).success
+    # Commits older than the run keep their names; only later ones are replayed
+    assert git(repo, 'rev-parse', 'HEAD~2') == before
@@ -0,0 +1,82 @@
+"""Rebuilding ledger runs from the branch history"""
+
+import os
+from datetime import datetime
+
+from automation_api import CreateConfig, RemoveConfig
+from automation_ledger import AutomationLedger, INDEX_FILE, LEDGER_FILE
+from create_commits import create
+from git_plumbing import GitExecutor
+from history_scan import HistoryScanner
+from remove_commits import remove
+from conftest import commit_file, git
+
+
+def forget_runs(repo):
+    """Drop every record of the runs, leaving only the history"""
+    git_dir = git(repo, 'rev-parse', '--absolute-git-dir')
+    for path in (os.path.join(repo, '.commit_automation_log.json'),
+                 os.path.join(git_dir, LEDGER_FILE), os.path.join(git_dir, INDEX_FILE)):
+        if os.path.exists(path):
+            os.remove(path)
+    return git_dir
+
+
+def generate(repo):
+    """Two runs split by a hand-written commit; returns their (start, end) commits"""
+    runs = []
+    for start, end in ((datetime(2024, 1, 1), datetime(2024, 1, 5)),
+                       (datetime(2024, 2, 1), datetime(2024, 2, 5))):
+        before = git(repo, 'rev-parse', 'HEAD')
+        result = create(CreateConfig(repo, 'notes.txt', start, end, backend='fast-import',
+                                     seed=5))
+        assert result.success, result.error
+        runs.append((before, result.end_commit, result.commits))
+        commit_file(repo, 'README.md', f"Notes after {end:%B}\n", 'Update README')
+    return runs
+
+
+def test_scan_rebuilds_runs_without_an_automation_log(repo):
+    created = generate(repo)
+    git_dir = forget_runs(repo)
+
+    scanner = HistoryScanner(GitExecutor(repo))
+    try:
+        found = scanner.scan()
+        assert [(run['start_commit'], run['end_commit'], run['total_commits'])
+                for run in found] == created
+        for (start, end, count), run in zip(created, found):
+            days = git(repo, 'log', '--format=%ad', '--date=short', f"{start}..{end}").split()
+            assert run['date_range'] == f"{min(days)} to {max(days)}"
+        assert all(run['target_file'] == 'notes.txt' for run in found)
+        ledger = AutomationLedger(git_dir)
+        assert scanner.record(ledger, found) == [1, 2]
+        # A second scan finds nothing new to record
+        assert scanner.record(ledger, scanner.scan()) == []
+    finally:
+        scanner.close()
+
+    first = git(repo, 'rev-list', '--reverse', f"{created[0][0]}..{created[0][1]}").splitlines()
+    assert ledger.lookup(first[0])[0] == 1
+    assert len(ledger.run_commits(2)) == created[1][2]
+
+
+def test_remove_a_scanned_run(repo):
+    created = generate(repo)
+    forget_runs(repo)
+    kept = git(repo, 'log', '--format=%H %s', created[1][0]).splitlines()
+
+    # Run #2 is the February run; the README commit after it is replayed
+    result = remove(RemoveConfig(repo, mode='surgical', run_id=2, scan=True,
+                                 maintenance='never'))
+    assert result.success, result.error
+    assert (result.removed, result.replayed) == (created[1][2], 1)
+
+    subjects = git(repo, 'log', '--format=%H %s').splitlines()
+    assert subjects[1:] == kept
+    assert subjects[0].endswith('Update README')
+    days = git(repo, 'log', '--format=%ad', '--date=short').split()
+    assert not [day for day in days if day.startswith('2024-02')]
+    ledger = AutomationLedger(git(repo, 'rev-parse', '--absolute-git-dir'))
+    assert [run['run_id'] for run in ledger.runs()] == [1]
+    assert git(repo, 'fsck', '--strict', '--no-dangling', check=False) == ''
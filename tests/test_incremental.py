@@ -0,0 +1,72 @@
+"""Incremental runs top up to a day and are a no-op once there"""
+
+import os
+from datetime import datetime, timedelta
+
+from automation_api import CreateConfig
+from automation_ledger import LEDGER_FILE
+from create_commits import create, parse_args, top_up
+from run_journal import JOURNAL_FILE
+from conftest import git
+
+FIRST_END = datetime(2024, 4, 10)
+
+
+def snapshot(repo):
+    """HEAD, the ledger's bytes and whether a journal exists"""
+    git_dir = git(repo, 'rev-parse', '--absolute-git-dir')
+    with open(os.path.join(git_dir, LEDGER_FILE), 'rb') as f:
+        ledger = f.read()
+    return git(repo, 'rev-parse', 'HEAD'), ledger, os.path.exists(os.path.join(git_dir, JOURNAL_FILE))
+
+
+def commit_days(repo):
+    days = git(repo, 'log', '--format=%ad', '--date=short', 'HEAD').splitlines()
+    return sorted(set(days) - {'2020-01-01'})
+
+
+def test_incremental_runs_are_idempotent(repo):
+    first = create(CreateConfig(repo, 'notes.txt', datetime(2024, 4, 1), FIRST_END,
+                                backend='fast-import', seed=2))
+    assert first.success, first.error
+    end = FIRST_END + timedelta(days=6)
+
+    topped = create(CreateConfig(repo, end_date=end, incremental=True, seed=3))
+    assert topped.success, topped.error
+    assert topped.commits > 0
+    before = snapshot(repo)
+    assert not before[2]
+
+    again = create(CreateConfig(repo, end_date=end, incremental=True, seed=4))
+    assert again.success, again.error
+    assert again.commits == 0
+    assert again.end_commit == before[0]
+    assert snapshot(repo) == before
+
+
+def test_later_end_date_adds_only_the_new_days(repo):
+    assert create(CreateConfig(repo, 'notes.txt', datetime(2024, 4, 1), FIRST_END,
+                               backend='fast-import', seed=2)).success
+    days = commit_days(repo)
+    head = git(repo, 'rev-parse', 'HEAD')
+    later = create(CreateConfig(repo, end_date=FIRST_END + timedelta(days=10),
+                                incremental=True, seed=3))
+    assert later.success, later.error
+    new_days = sorted(set(commit_days(repo)) - set(days))
+    assert new_days and new_days[0] > FIRST_END.strftime('%Y-%m-%d')
+    assert new_days[-1] <= (FIRST_END + timedelta(days=10)).strftime('%Y-%m-%d')
+    # Every new commit sits on top of the first run
+    assert int(git(repo, 'rev-list', '--count', f"{head}..HEAD")) == later.commits
+    # The new run kept the first run's target file and backend
+    assert later.automation_log['target_file'] == 'notes.txt'
+
+
+def test_cli_top_up_twice_is_a_no_op(repo):
+    start = datetime.now() - timedelta(days=12)
+    assert create(CreateConfig(repo, 'notes.txt', start, start + timedelta(days=5),
+                               backend='fast-import', seed=2)).success
+    args = parse_args(['--incremental', '--seed', '5'])
+    assert top_up(repo, args)
+    before = snapshot(repo)
+    assert top_up(repo, args)
+    assert snapshot(repo) == before
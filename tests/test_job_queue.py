@@ -0,0 +1,119 @@
+"""Merging, trimming and recovering queued jobs"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from job_queue import JobQueue, coalesce, subtract
+from run_journal import JOURNAL_FILE
+
+
+def job(start, end, **fields):
+    return dict({'repo': '/repo', 'target_file': 'notes.txt', 'start_date': start,
+                 'end_date': end}, **fields)
+
+
+def day(date):
+    return datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+
+def dates(job):
+    return job['start_date'], job['end_date']
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path))
+
+
+def test_coalesce_merges_overlapping_and_touching_ranges():
+    merged = coalesce([('a', job('2024-01-01', '2024-01-10')),
+                       ('b', job('2024-01-11', '2024-01-15')),
+                       ('c', job('2024-01-05', '2024-01-20'))])
+    assert len(merged) == 1
+    members, combined = merged[0]
+    assert [job_id for job_id, _ in members] == ['a', 'b', 'c']
+    assert dates(combined) == ('2024-01-01', '2024-01-20')
+
+
+def test_coalesce_stops_at_a_gap_another_key_or_a_remove():
+    merged = coalesce([('a', job('2024-01-01', '2024-01-10')),
+                       ('b', job('2024-01-12', '2024-01-15')),
+                       ('c', job('2024-01-13', '2024-01-20', target_file='other.txt')),
+                       ('d', {'repo': '/repo', 'action': 'remove'}),
+                       ('e', job('2024-01-16', '2024-01-25', target_file='other.txt'))])
+    assert [[job_id for job_id, _ in members] for members, _ in merged] == \
+        [['a'], ['b'], ['c'], ['d'], ['e']]
+
+
+def test_subtract_splits_around_covered_days():
+    covered = [(day('2024-01-05'), day('2024-01-08')), (day('2024-01-12'), day('2024-01-13'))]
+    parts = subtract(day('2024-01-01'), day('2024-01-20'), covered)
+    assert parts == [(day('2024-01-01'), day('2024-01-04')), (day('2024-01-09'), day('2024-01-11')),
+                     (day('2024-01-14'), day('2024-01-20'))]
+    assert subtract(day('2024-01-06'), day('2024-01-07'), covered) == []
+
+
+def test_next_job_trims_filled_days_and_finish_combines_the_parts(queue):
+    first = queue.submit([job('2024-01-05', '2024-01-08')])[0]
+    members, running = queue.next_job()
+    assert dates(running) == ('2024-01-05', '2024-01-08')
+    queue.finish(members, running, {'repo': '/repo', 'success': True, 'total_commits': 10,
+                                    'date_range': '2024-01-05 to 2024-01-08'})
+    # Queued while the first ran: only the days around it are still missing
+    second = queue.submit([job('2024-01-01', '2024-01-12')])[0]
+    parts = []
+    entry = queue.next_job()
+    while entry is not None:
+        members, part = entry
+        parts.append(dates(part))
+        queue.finish(members, part, {'repo': '/repo', 'success': True,
+                                     'total_commits': len(parts),
+                                     'date_range': '{} to {}'.format(*dates(part))})
+        entry = queue.next_job()
+    assert parts == [('2024-01-01', '2024-01-04'), ('2024-01-09', '2024-01-12')]
+    assert queue.results[first]['total_commits'] == 10
+    assert queue.results[second]['total_commits'] == 3
+    assert queue.results[second]['success']
+
+
+def test_failed_split_part_fails_the_job(queue):
+    queue.submit([job('2024-01-03', '2024-01-04')])
+    members, running = queue.next_job()
+    queue.finish(members, running, {'success': True, 'total_commits': 4})
+    job_id = queue.submit([job('2024-01-01', '2024-01-06')])[0]
+    members, part = queue.next_job()
+    assert not members and dates(part) == ('2024-01-01', '2024-01-02')
+    queue.finish(members, part, {'success': False, 'error': 'disk full'})
+    members, part = queue.next_job()
+    assert members and dates(part) == ('2024-01-05', '2024-01-06')
+    queue.finish(members, part, {'success': True, 'total_commits': 3})
+    assert queue.next_job() is None
+    result = queue.results[job_id]
+    assert not result['success'] and result['error'] == 'disk full'
+    assert result['total_commits'] == 3
+
+
+def test_fully_covered_job_is_finished_without_running(queue):
+    queue.submit([job('2024-01-01', '2024-01-10')])
+    members, running = queue.next_job()
+    queue.finish(members, running, {'success': True, 'total_commits': 5})
+    job_id = queue.submit([job('2024-01-03', '2024-01-04')])[0]
+    assert queue.next_job() is None
+    assert queue.results[job_id]['note'] == 'every day was already created'
+
+
+@pytest.mark.parametrize('journaled', [False, True])
+def test_recover_hints_resume_only_with_a_journal(tmp_path, journaled):
+    queue = JobQueue(str(tmp_path))
+    other = JobQueue(str(tmp_path))
+    job_id = other.submit([job('2024-01-01', '2024-01-02')])[0]
+    other.take()                        # claimed by a runner that then died
+    if journaled:
+        (tmp_path / JOURNAL_FILE).write_text('{"event": "start"}\n')
+    queue.recover()
+    result = other.collect([job_id])[job_id]
+    assert not result['success']
+    assert ('--resume' in result['error']) == journaled
+    assert not os.path.exists(os.path.join(queue.path, f"{job_id}.running"))
@@ -0,0 +1,75 @@
+"""The automation ledger and its hash index"""
+
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from automation_ledger import AutomationLedger, COMMITS_PER_RECORD
+
+
+def sha(n):
+    return f"{n:040x}"
+
+
+def commits(first, count, timestamp=1_700_000_000):
+    return [[sha(n), timestamp + n] for n in range(first, first + count)]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return AutomationLedger(str(tmp_path))
+
+
+def test_lookup_finds_each_runs_commits(ledger):
+    first = ledger.add_run({'target_file': 'a.txt'}, commits(1, 10))
+    second = ledger.add_run({'target_file': 'b.txt'}, iter(commits(100, 2500)))
+    assert (first, second) == (1, 2)
+    assert ledger.lookup(sha(5)) == (1, 1_700_000_005)
+    assert ledger.lookup(sha(2599)) == (2, 1_700_002_599)
+    assert ledger.lookup(sha(50)) is None
+    assert len(ledger.run_commits(second)) == 2500 > COMMITS_PER_RECORD
+
+
+def test_index_is_grown_and_rebuilt(ledger):
+    ledger.add_run({}, commits(1, 10))
+    # Past half of the minimum table: the in-place insert rebuilds a bigger one
+    ledger.add_run({}, commits(1000, 1500))
+    found = ledger.lookup_many([sha(n) for n in range(1, 11)] + [sha(n) for n in range(1000, 2500)])
+    assert len(found) == 1510
+    os.remove(ledger.index_path)
+    assert ledger.is_automated(sha(2499))
+
+
+def test_removed_runs_stop_matching(ledger):
+    first = ledger.add_run({}, commits(1, 5))
+    ledger.add_run({}, commits(10, 5))
+    ledger.mark_removed([first])
+    assert not ledger.is_automated(sha(1))
+    assert ledger.is_automated(sha(10))
+    assert [run['run_id'] for run in ledger.runs()] == [2]
+    ledger.compact()
+    assert [run['run_id'] for run in ledger.runs(include_removed=True)] == [2]
+    assert ledger.next_run_id() == 3
+
+
+def test_torn_line_is_skipped_and_terminated(ledger):
+    ledger.add_run({'target_file': 'a.txt'}, commits(1, 3))
+    with open(ledger.path, 'a') as f:
+        f.write('{"type": "run", "run_id": 7, "target_fi')
+    second = ledger.add_run({'target_file': 'b.txt'}, commits(10, 3))
+    third = ledger.add_run({'target_file': 'c.txt'}, iter(commits(20, 3)))
+    assert [run['target_file'] for run in ledger.runs()] == ['a.txt', 'b.txt', 'c.txt']
+    assert (second, third) == (2, 3)
+    assert ledger.lookup(sha(21)) == (3, 1_700_000_021)
+    with open(ledger.path) as f:
+        assert f.read().count('\n') == len(ledger.runs()) * 2 + 1
+
+
+def test_commits_between_prunes_by_run_span(ledger):
+    ledger.add_run({}, commits(1, 5, timestamp=1_600_000_000))
+    ledger.add_run({}, commits(10, 5, timestamp=1_700_000_000))
+    start = datetime.fromtimestamp(1_700_000_000, timezone.utc)
+    end = datetime.fromtimestamp(1_700_000_012, timezone.utc)
+    assert [commit[0] for commit in ledger.commits_between(start, end)] == [sha(10), sha(11),
+                                                                            sha(12)]
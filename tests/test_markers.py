@@ -0,0 +1,127 @@
+"""Cleaning automation lines out of a target file"""
+
+import os
+import json
+import shutil
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+from automation_api import CreateConfig, RemoveConfig
+from create_commits import create
+from markers import generic_line, is_marker_line, strip_marker_lines
+from remove_commits import GitCommitRemover, remove
+from conftest import commit_file, git
+
+ORIGINAL = "# Notes\nkeep this line\n\n# Modified by hand on a Tuesday\n"
+START, END = datetime(2024, 5, 1), datetime(2024, 5, 10)
+
+
+def read(repo, path='notes.txt'):
+    with open(os.path.join(repo, path)) as f:
+        return f.read()
+
+
+def generate(repo, **options):
+    result = create(CreateConfig(repo, 'notes.txt', START, END, backend='fast-import', seed=3,
+                                 **options))
+    assert result.success, result.error
+    return result
+
+
+def clean(repo):
+    result = remove(RemoveConfig(repo, mode='clean', maintenance='never'))
+    assert result.success, result.error
+    return result
+
+
+@pytest.mark.parametrize('chunk_size', [5, 64, 1 << 20])
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_strip_marker_lines_restores_the_file(make_repo, tmp_path, chunk_size, use_mmap):
+    repo = make_repo(ORIGINAL)
+    generate(repo)
+    os.makedirs(tmp_path / 'copy')
+    path = str(tmp_path / 'copy' / 'notes.txt')
+    shutil.copy(os.path.join(repo, 'notes.txt'), path)
+    os.chmod(path, 0o640)
+    # Every generic line in the copy was added by the run
+    with open(path, 'rb') as f:
+        written = Counter(filter(None, (generic_line(line) for line in f)))
+    assert strip_marker_lines(path, chunk_size=chunk_size, use_mmap=use_mmap,
+                              written=written) > 0
+    with open(path) as f:
+        assert f.read() == ORIGINAL
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path / 'copy') == ['notes.txt']
+
+
+def test_marker_registry_leaves_user_lines_alone():
+    assert is_marker_line('# Update: refactor')
+    assert is_marker_line('// Automation commit 42')
+    assert not is_marker_line('# Update: the installer')
+    assert not is_marker_line('# Modified by hand on a Tuesday')
+
+
+def test_clean_mode_removes_the_lines(make_repo):
+    repo = make_repo(ORIGINAL)
+    generate(repo)
+    assert read(repo) != ORIGINAL
+    result = clean(repo)
+    assert read(repo) == ORIGINAL
+    assert result.marker_lines_removed > 0
+
+
+def test_clean_mode_uses_the_runs_template_pack(make_repo, tmp_path):
+    pack = tmp_path / 'pack.json'
+    pack.write_text(json.dumps({'name': 'release', 'templates': ['{prefix} Release train {build}'],
+                                'messages': ['Release train']}))
+    repo = make_repo(ORIGINAL)
+    generate(repo, template_pack=str(pack))
+    assert 'Release train' in read(repo)
+    clean(repo)
+    assert read(repo) == ORIGINAL
+
+
+def test_clean_mode_removes_the_ring_region(make_repo):
+    repo = make_repo(ORIGINAL)
+    os.chmod(os.path.join(repo, 'notes.txt'), 0o600)
+    generate(repo, content_strategy='ring')
+    assert 'automation ring' in read(repo)
+    clean(repo)
+    assert read(repo) == ORIGINAL
+    assert os.stat(os.path.join(repo, 'notes.txt')).st_mode & 0o777 == 0o600
+    assert not [name for name in os.listdir(repo) if name.startswith('.automation-clean-')]
+    git(repo, 'fsck', '--strict', '--no-dangling')
+
+
+def test_generic_lines_need_the_run_to_have_added_them(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes(b"# Version: 1.2\n\n# Version: 1.2\n\n# Modified on 2024-05-01\n")
+    assert strip_marker_lines(str(path)) == 1
+    assert path.read_bytes() == b"# Version: 1.2\n\n# Version: 1.2\n"
+    # The first copy was there before the run; the run added the second
+    assert strip_marker_lines(str(path), written=Counter([b'# Version: 1.2']),
+                              existing=Counter([b'# Version: 1.2'])) == 1
+    assert path.read_bytes() == b"# Version: 1.2\n"
+
+
+def test_clean_keeps_hand_written_comments(make_repo):
+    original = "# Notes\n# Version: 1.2\n# Update: refactor\n# Build: 2024\n"
+    repo = make_repo(original)
+    generate(repo)
+    # A hand-written line after the run that reads like an automation line
+    with open(os.path.join(repo, 'notes.txt'), 'a') as f:
+        f.write("# Feature: bugfix\n")
+    commit_file(repo, 'other.txt', 'x\n', 'Manual change')
+    clean(repo)
+    assert read(repo) == original + "# Feature: bugfix\n"
+
+
+def test_clean_matches_only_the_recorded_comment_syntax(make_repo):
+    repo = make_repo(ORIGINAL)
+    generate(repo)
+    log_data = GitCommitRemover(repo).load_automation_log()
+    pattern = GitCommitRemover(repo).recorded_pattern([log_data])
+    assert is_marker_line('# Modified on 2024-05-01', pattern)
+    assert not is_marker_line('// Modified on 2024-05-01', pattern)
@@ -0,0 +1,113 @@
+"""Pushing a run in chunks while it is generated"""
+
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+import push_pipeline
+from automation_api import CreateConfig
+from create_commits import create
+from fast_import import FastImportBackend
+from git_plumbing import GitExecutor
+from push_pipeline import PushPipeline
+from run_journal import RunJournal
+from conftest import commit_file, git, interrupt_after
+
+START, END = datetime(2024, 1, 1), datetime(2024, 3, 31)
+
+
+@pytest.fixture
+def remote(repo):
+    """A bare clone of `repo`, added to it as origin"""
+    path = os.path.join(os.path.dirname(repo), 'remote.git')
+    git(os.path.dirname(repo), 'clone', '-q', '--bare', repo, path)
+    git(repo, 'remote', 'add', 'origin', path)
+    return path
+
+
+def failing_pushes(git_executor, failures, attempted=None):
+    """Make the executor's next `failures` pushes fail"""
+    original = git_executor.run
+
+    def run(args, date_str=None, quiet=False):
+        if args[0] == 'push':
+            if attempted:
+                attempted.set()
+            if failures[0]:
+                failures[0] -= 1
+                return False, 'fatal: the remote end hung up unexpectedly\n'
+        return original(args, date_str, quiet)
+    git_executor.run = run
+
+
+@pytest.mark.parametrize('backend, end, push_chunk', [
+    ('worktree', datetime(2024, 1, 12), 10),    # a commit per process: keep it short
+    ('fast-import', END, 'month'),
+    ('fast-import', END, 25),
+])
+def test_pipelined_push_ends_at_the_local_head(repo, remote, backend, end, push_chunk):
+    result = create(CreateConfig(repo, 'notes.txt', START, end, backend=backend, seed=8,
+                                 push=True, push_mode='pipelined', push_chunk=push_chunk,
+                                 maintenance='never'))
+    assert result.success, result.error
+    assert result.pushed
+    assert git(remote, 'rev-parse', 'main') == git(repo, 'rev-parse', 'HEAD') == result.end_commit
+    assert result.metrics['counters']['pushes'] > 1
+    git(remote, 'fsck', '--strict', '--no-dangling')
+
+
+def test_failed_chunk_push_is_retried(repo, remote):
+    executor = GitExecutor(repo)
+    failing_pushes(executor, [2])
+    head = git(repo, 'rev-parse', 'HEAD')
+    commit_file(repo, 'notes.txt', '# Notes\nmore\n', 'More notes')
+    pipeline = PushPipeline(executor, 'origin', 'main', backoff=0)
+    assert pipeline.finish(git(repo, 'rev-parse', 'HEAD'))
+    assert git(remote, 'rev-parse', 'main') == git(repo, 'rev-parse', 'HEAD') != head
+    assert executor.metrics.counters['push_retries'] == 2
+    assert pipeline.chunks == 1
+
+
+def test_failed_chunk_is_made_up_by_the_next(repo, remote):
+    executor = GitExecutor(repo)
+    attempted = threading.Event()
+    failing_pushes(executor, [1], attempted)
+    first = git(repo, 'rev-parse', 'HEAD')
+    commit_file(repo, 'notes.txt', '# Notes\nmore\n', 'More notes')
+    pipeline = PushPipeline(executor, 'origin', 'main', retries=0, backoff=0)
+    pipeline.submit(first)
+    assert attempted.wait(10)
+    assert pipeline.finish(git(repo, 'rev-parse', 'HEAD'))
+    assert executor.metrics.counters['push_failures'] == 1
+    assert git(remote, 'rev-parse', 'main') == git(repo, 'rev-parse', 'HEAD')
+
+
+def test_close_after_an_interrupt_stays_at_the_journaled_tip(repo, remote, monkeypatch):
+    pushed = []
+    original = push_pipeline.push_commit
+
+    def push_commit(git_executor, remote_name, branch, commit, **options):
+        success = original(git_executor, remote_name, branch, commit, **options)
+        if success:
+            pushed.append(commit)
+        return success
+    monkeypatch.setattr(push_pipeline, 'push_commit', push_commit)
+    interrupt_after(monkeypatch, FastImportBackend, 'add_commit', 60)
+    with pytest.raises(KeyboardInterrupt):
+        create(CreateConfig(repo, 'notes.txt', START, END, backend='fast-import', seed=8,
+                            push=True, push_mode='pipelined', push_chunk=10,
+                            maintenance='never'))
+    monkeypatch.undo()
+
+    assert not [thread for thread in threading.enumerate() if thread.name == 'push-pipeline']
+    assert pushed
+    assert git(remote, 'rev-parse', 'main') == pushed[-1]
+    journaled = RunJournal(git(repo, 'rev-parse', '--absolute-git-dir')).load()['progress']
+    for commit in pushed:
+        git(repo, 'merge-base', '--is-ancestor', commit, journaled['commit'])
+    # The run still resumes from the journal
+    result = create(CreateConfig(repo, resume=True))
+    assert result.success, result.error
+    assert git(repo, 'rev-parse', 'HEAD') == result.end_commit
@@ -0,0 +1,111 @@
+"""Repository lock: stale holders, and nesting for the holder only"""
+
+import os
+import sys
+import json
+import socket
+import asyncio
+import subprocess
+import threading
+
+import pytest
+
+import repo_lock
+from repo_lock import LOCK_FILE, RepositoryLock
+
+
+@pytest.fixture
+def git_dir(tmp_path):
+    return str(tmp_path)
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_holder(git_dir, **holder):
+    with open(os.path.join(git_dir, LOCK_FILE), 'w') as f:
+        json.dump(holder, f)
+
+
+def test_lock_is_exclusive_and_released(git_dir):
+    lock = RepositoryLock(git_dir, 'create_commits')
+    assert lock.acquire()
+    assert json.load(open(lock.path))['pid'] == os.getpid()
+    lock.release()
+    assert not os.path.exists(lock.path)
+
+
+def test_lock_of_a_dead_process_is_broken(git_dir):
+    write_holder(git_dir, pid=dead_pid(), host=socket.gethostname(), operation='remove_commits')
+    lock = RepositoryLock(git_dir, 'create_commits')
+    assert lock.acquire()
+    assert lock.broken['operation'] == 'remove_commits'
+    lock.release()
+
+
+def test_lock_of_a_live_process_is_kept(git_dir):
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        write_holder(git_dir, pid=process.pid, host=socket.gethostname(), operation='other')
+        lock = RepositoryLock(git_dir, 'create_commits')
+        assert not lock.acquire()
+        assert 'other' in lock.busy_message()
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_lock_nests_in_the_holding_thread(git_dir):
+    outer = RepositoryLock(git_dir, 'batch_runner')
+    inner = RepositoryLock(git_dir, 'create_commits')
+    assert outer.acquire()
+    assert inner.acquire()
+    inner.release()
+    # The outer hold survives the inner release
+    assert os.path.exists(outer.path)
+    outer.release()
+    assert not os.path.exists(outer.path)
+    assert not repo_lock._held
+
+
+def test_lock_does_not_nest_for_another_thread(git_dir):
+    outer = RepositoryLock(git_dir, 'batch_runner')
+    assert outer.acquire()
+    taken = []
+    thread = threading.Thread(target=lambda: taken.append(
+        RepositoryLock(git_dir, 'create_commits').acquire()))
+    thread.start()
+    thread.join()
+    assert taken == [False]
+    outer.release()
+
+
+def test_lock_does_not_nest_for_another_task(git_dir):
+    async def main():
+        outer_held = asyncio.Event()
+        release = asyncio.Event()
+
+        async def holder():
+            lock = RepositoryLock(git_dir, 'async_runner')
+            assert lock.acquire()
+            nested = RepositoryLock(git_dir, 'nested')
+            assert nested.acquire()         # the same task nests
+            outer_held.set()
+            await release.wait()
+            nested.release()
+            lock.release()
+
+        async def other():
+            await outer_held.wait()
+            taken = RepositoryLock(git_dir, 'other').acquire()
+            release.set()
+            return taken
+
+        _, taken = await asyncio.gather(holder(), other())
+        return taken
+
+    assert asyncio.run(main()) is False
+    assert not repo_lock._held
@@ -0,0 +1,96 @@
+"""Resuming interrupted runs from the run journal"""
+
+from datetime import datetime
+
+import pytest
+
+from automation_api import CreateConfig
+from create_commits import GitCommitCreator, create
+from fast_import import FastImportBackend
+from git_plumbing import GitExecutor, PlumbingBackend
+from run_journal import RunJournal
+from conftest import commit_file, git, interrupt_after
+
+START, END = datetime(2024, 3, 1), datetime(2024, 3, 5)
+
+
+def run(repo, backend='worktree', **options):
+    return create(CreateConfig(repo, 'notes.txt', START, END, backend=backend, seed=11,
+                               **options))
+
+
+def history(repo):
+    """(subject, author date) of every commit, oldest first"""
+    return git(repo, 'log', '--reverse', '--format=%s|%ad').splitlines()
+
+
+def resume(repo):
+    result = create(CreateConfig(repo, resume=True))
+    assert result.success, result.error
+    assert not RunJournal(git(repo, 'rev-parse', '--absolute-git-dir')).exists()
+    return result
+
+
+@pytest.fixture
+def reference(make_repo):
+    repo = make_repo()
+    assert run(repo).success
+    return repo
+
+
+@pytest.mark.parametrize('before', [False, True])
+def test_worktree_resume_around_a_commit(make_repo, monkeypatch, reference, before):
+    # Interrupted just after a commit (before its progress record) or just before it
+    repo = make_repo()
+    interrupt_after(monkeypatch, GitCommitCreator, 'commit_index', 4, before=before)
+    with pytest.raises(KeyboardInterrupt):
+        run(repo)
+    monkeypatch.undo()
+    assert len(history(repo)) == (4 if before else 5)
+    resume(repo)
+    assert history(repo) == history(reference)
+    git(repo, 'fsck', '--strict', '--no-dangling')
+
+
+def test_in_memory_backend_resume_is_byte_identical(make_repo, monkeypatch, reference):
+    repo = make_repo()
+    expected = make_repo()
+    assert run(expected, backend='fast-import').success
+    # Checkpoint after every day, then stop part way through a later day
+    monkeypatch.setattr(RunJournal, 'checkpoint_due', lambda self: True)
+    interrupt_after(monkeypatch, FastImportBackend, 'add_commit', 6)
+    with pytest.raises(KeyboardInterrupt):
+        run(repo, backend='fast-import')
+    monkeypatch.undo()
+    resume(repo)
+    assert git(repo, 'rev-parse', 'HEAD') == git(expected, 'rev-parse', 'HEAD')
+    assert history(repo) == history(reference)
+
+
+def test_resume_refuses_a_moved_branch(repo, monkeypatch):
+    interrupt_after(monkeypatch, GitCommitCreator, 'commit_index', 3)
+    with pytest.raises(KeyboardInterrupt):
+        run(repo)
+    monkeypatch.undo()
+    git(repo, 'reset', '-q', '--hard', 'HEAD~2')
+    commit_file(repo, 'other.txt', 'manual\n', 'Manual change')
+    result = create(CreateConfig(repo, resume=True))
+    assert not result.success
+    assert 'moved' in result.error
+
+
+def test_interrupt_stops_the_batch_workers(repo, monkeypatch):
+    workers, messages = [], []
+    original = GitExecutor.close
+
+    def close(self):
+        workers.extend(self._workers.values())
+        original(self)
+    monkeypatch.setattr(GitExecutor, 'close', close)
+    interrupt_after(monkeypatch, PlumbingBackend, 'add_commit', 3)
+    with pytest.raises(KeyboardInterrupt):
+        create(CreateConfig(repo, 'notes.txt', START, END, backend='plumbing', seed=11),
+               progress=lambda event: messages.append(event.message or ''))
+    assert workers
+    assert all(worker.process.poll() is not None for worker in workers)
+    assert any('--resume' in message for message in messages)